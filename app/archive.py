@@ -0,0 +1,148 @@
+"""完了済みTODO項目のアーカイブ.
+
+完了から ``ARCHIVE_AFTER_DAYS`` 日以上更新されていない項目を, ``ARCHIVE_BATCH_SIZE`` 件ずつ
+``todo_items`` から ``todo_items_archive`` へ移す. 1バッチが1トランザクションなので,
+途中で止まっても移動済みのバッチだけが反映される.
+
+``ARCHIVE_INTERVAL_SECONDS`` を指定するとアプリの起動中にバックグラウンドで定期実行する.
+cronなどから1回だけ実行する場合は ``python -m app.archive`` を使う.
+"""
+
+import argparse
+import collections
+import datetime
+import logging
+import threading
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import const, events, sharding
+from app.const import TodoItemStatusCode
+from app.database import SessionLocal
+from app.models.archive_model import ArchivedItemModel
+from app.models.item_model import ItemModel
+from app.models.list_model import ListModel
+
+logger = logging.getLogger(__name__)
+
+items_table = ItemModel.__table__
+archive_table = ArchivedItemModel.__table__
+lists_table = ListModel.__table__
+
+# アーカイブテーブルと共通の列
+ITEM_COLUMNS = [column.name for column in items_table.columns]
+
+_is_archivable = (
+    (items_table.c.status_code == TodoItemStatusCode.COMPLETED.value)
+    & (items_table.c.updated_at < bindparam("cutoff"))
+)
+_in_batch = items_table.c.id.in_(bindparam("ids", expanding=True))
+
+SELECT_ARCHIVABLE = (
+    select(items_table.c.id, items_table.c.todo_list_id)
+    .where(_is_archivable)
+    .order_by(items_table.c.updated_at)
+    .limit(bindparam("limit"))
+)
+COPY_TO_ARCHIVE = insert(archive_table).from_select(
+    ITEM_COLUMNS,
+    select(*[items_table.c[name] for name in ITEM_COLUMNS]).where(_in_batch & _is_archivable),
+)
+# 候補のうち実際にアーカイブへコピーした項目(検索後に更新された項目は含まない)
+SELECT_ARCHIVED = select(archive_table.c.id, archive_table.c.todo_list_id).where(archive_table.c.id.in_(bindparam("ids", expanding=True)))
+DELETE_ARCHIVED = delete(items_table).where(_in_batch & _is_archivable)
+# 項目数の減算. 更新日時は変えない
+DECREMENT_ITEM_COUNT = (
+    update(lists_table)
+    .where(lists_table.c.id == bindparam("list_id"))
+    .values(item_count=lists_table.c.item_count - bindparam("moved"), updated_at=lists_table.c.updated_at)
+)
+
+
+def archive_batch(db: Session, cutoff: datetime.datetime, batch_size: int) -> int:
+    """完了済みでcutoffより古い項目を最大batch_size件アーカイブし, 移した件数を返す."""
+    # 移す際にも同じ条件を付ける(MySQLでは検索後に他の接続から更新された項目は移さない)
+    candidates = db.execute(SELECT_ARCHIVABLE, {"cutoff": cutoff, "limit": batch_size}).all()
+    if not candidates:
+        db.rollback()
+        return 0
+
+    params = {"ids": [row.id for row in candidates], "cutoff": cutoff}
+    try:
+        db.execute(COPY_TO_ARCHIVE, params)
+        archived = db.execute(SELECT_ARCHIVED, {"ids": params["ids"]}).all()
+        # コピーした項目だけを削除する
+        db.execute(DELETE_ARCHIVED, {"ids": [row.id for row in archived], "cutoff": cutoff})
+        moved = collections.Counter(row.todo_list_id for row in archived)
+        for todo_list_id, count in moved.items():
+            db.execute(DECREMENT_ITEM_COUNT, {"list_id": todo_list_id, "moved": count})
+        db.commit()
+    except IntegrityError:
+        # 同じIDの行が既にアーカイブにある. 飛ばすと以降のバッチも同じ項目で止まるので, 呼び出し元へ知らせる
+        db.rollback()
+        logger.error("archive conflict: some of items %s are already in todo_items_archive", params["ids"])
+        raise
+
+    for row in archived:
+        events.publish(row.todo_list_id, "item.archived", todo_item_id=row.id)
+    return len(archived)
+
+
+def archive_completed_items(
+    older_than_days: int = const.ARCHIVE_AFTER_DAYS,
+    batch_size: int = const.ARCHIVE_BATCH_SIZE,
+    stop: threading.Event | None = None,
+) -> int:
+    """対象が無くなるまでバッチ単位でアーカイブし, 移した件数の合計を返す. シャードごとに順に処理する."""
+    cutoff = datetime.datetime.now(datetime.UTC).replace(tzinfo=None) - datetime.timedelta(days=older_than_days)
+    total = 0
+    for engine in sharding.engines():
+        with SessionLocal.session_factory(bind=engine) as db:
+            while stop is None or not stop.is_set():
+                moved = archive_batch(db, cutoff, batch_size)
+                total += moved
+                if moved == 0:
+                    break
+    return total
+
+
+class Archiver:
+    """一定間隔でアーカイブを実行するバックグラウンドスレッド."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                moved = archive_completed_items(stop=self._stop)
+            except Exception:
+                logger.exception("archive failed")
+                continue
+            if moved:
+                logger.info("archived %d completed items", moved)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="完了済みTODO項目をアーカイブする")
+    parser.add_argument("--days", type=int, default=const.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=const.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    print(archive_completed_items(args.days, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
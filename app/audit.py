@@ -0,0 +1,151 @@
+"""リストと項目の変更履歴.
+
+CRUD処理は書き込みと同じトランザクションで :func:`record` を呼び, 送信待ちテーブル(``change_outbox``)に
+変更した値だけを持つ1行を追加する. 書き込みに加わるのはインデックスの無いテーブルへのINSERT 1回だけで,
+変更履歴テーブルのインデックスやパーティションの更新は書き込みの応答時間に含まれない.
+
+:class:`AuditFlusher` がバックグラウンドで ``AUDIT_FLUSH_SECONDS`` 秒ごとに, 送信待ちの行を ``AUDIT_BATCH_SIZE`` 件ずつ
+変更履歴テーブル(``change_history``)へ移す. 書き込みがロールバックされた変更は送信待ちにも残らない.
+変更履歴に反映されるのは移した後なので, 直前の変更が履歴に現れるまで最大でこの間隔だけ遅れる.
+
+変更履歴のidは送信待ちのidを引き継ぐ. シャーディング時は送信待ちのidがシャードごとの連番なので,
+移す時にシャード0の ``id_blocks`` から払い出し, シャードをまたいで一意にする(バケットの移動で履歴ごと移せるように).
+"""
+
+import json
+import logging
+import threading
+
+from sqlalchemy import bindparam, delete, insert, select
+from sqlalchemy.orm import Session
+
+from app import const, sharding
+from app.crud.common import normalize_page
+from app.database import SessionLocal
+from app.models.history_model import HistoryModel, OutboxModel
+
+logger = logging.getLogger(__name__)
+
+outbox_table = OutboxModel.__table__
+history_table = HistoryModel.__table__
+
+HISTORY_COLUMNS = [column.name for column in history_table.columns]
+
+INSERT_OUTBOX = insert(outbox_table)
+SELECT_PENDING = select(outbox_table.c.id).order_by(outbox_table.c.id).limit(bindparam("limit"))
+_in_batch = outbox_table.c.id.in_(bindparam("ids", expanding=True))
+# 移す行をロックして読む. 別のプロセスが同時に移していれば, そのコミットを待つ(移された行は返らない)
+SELECT_FLUSHING = select(outbox_table).where(_in_batch).order_by(outbox_table.c.id).with_for_update()
+# 既に変更履歴にある行は飛ばす
+INSERT_HISTORY = insert(history_table).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+DELETE_FLUSHED = delete(outbox_table).where(_in_batch)
+# リストの変更履歴を新しい順に. 主キー(todo_list_id, id)の範囲を逆順に読む
+SELECT_HISTORY_PAGE = (
+    select(history_table)
+    .where(history_table.c.todo_list_id == bindparam("todo_list_id"))
+    .order_by(history_table.c.id.desc())
+    .offset(bindparam("offset"))
+    .limit(bindparam("limit"))
+)
+
+
+def record(
+    db: Session, todo_list_id: int, entity: str, entity_id: int | None, action: str,
+    version: int | None = None, changes: dict | None = None,
+) -> None:
+    """変更を送信待ちテーブルに追加する(コミットはしない). 書き込みと同じトランザクションで呼ぶ."""
+    if not const.AUDIT:
+        return
+    db.execute(INSERT_OUTBOX, {
+        "todo_list_id": todo_list_id,
+        "entity": entity,
+        "entity_id": entity_id,
+        "action": action,
+        "version": version,
+        "changes": None if not changes else json.dumps(changes, separators=(",", ":"), ensure_ascii=False, default=str),
+    })
+
+
+def flush_batch(db: Session, batch_size: int = const.AUDIT_BATCH_SIZE) -> int:
+    """送信待ちの変更を古い順にbatch_size件まで変更履歴へ移し, 送信待ちから取り除いた件数を返す.
+
+    別のプロセスが先に変更履歴へ入れていた行は飛ばし, 警告を記録する.
+    """
+    ids = db.execute(SELECT_PENDING, {"limit": batch_size}).scalars().all()
+    if not ids:
+        db.rollback()
+        return 0
+    first_id = None
+    if sharding.enabled():
+        # 採番はシャード0への別の接続で行うので, 先にトランザクションを終える
+        db.rollback()
+        first_id = sharding.get_router().reserve_ids("change_history", len(ids))
+    rows = db.execute(SELECT_FLUSHING, {"ids": ids}).mappings().all()
+    if not rows:
+        db.rollback()
+        return 0
+    history = [{name: row[name] for name in HISTORY_COLUMNS} for row in rows]
+    if first_id is not None:
+        for n, values in enumerate(history):
+            values["id"] = first_id + n
+    copied = db.execute(INSERT_HISTORY, history).rowcount
+    db.execute(DELETE_FLUSHED, {"ids": [row["id"] for row in rows]})
+    db.commit()
+    if copied < len(rows):
+        logger.warning("%d of %d outbox records were already in change_history and were skipped", len(rows) - copied, len(rows))
+    return len(rows)
+
+
+def flush(batch_size: int = const.AUDIT_BATCH_SIZE, stop: threading.Event | None = None) -> int:
+    """送信待ちが無くなるまで移し, 移した件数の合計を返す. シャードごとに順に処理する."""
+    total = 0
+    for engine in sharding.engines():
+        with SessionLocal.session_factory(bind=engine) as db:
+            while stop is None or not stop.is_set():
+                flushed = flush_batch(db, batch_size)
+                total += flushed
+                if flushed < batch_size:
+                    break
+    return total
+
+
+def get_history(db: Session, todo_list_id: int, page: int, per_page: int):
+    """リストの変更履歴を新しい順に取得する."""
+    page, per_page = normalize_page(page, per_page)
+    params = {"todo_list_id": todo_list_id, "offset": (page - 1) * per_page, "limit": per_page}
+    return db.execute(SELECT_HISTORY_PAGE, params).all()
+
+
+class AuditFlusher:
+    """一定間隔で送信待ちの変更を変更履歴へ移すバックグラウンドスレッド."""
+
+    def __init__(self, interval: float = const.AUDIT_FLUSH_SECONDS) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        # 停止前の変更も履歴に残す
+        try:
+            flush()
+        except Exception:
+            logger.exception("audit flush failed")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                flush(stop=self._stop)
+            except Exception:
+                logger.exception("audit flush failed")
+
+
+flusher = AuditFlusher()
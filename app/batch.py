@@ -0,0 +1,170 @@
+"""バッチAPI: 複数の作成・更新・削除を1リクエスト, 1トランザクションで実行する.
+
+各操作は通常のAPIと同じCRUD処理で実行する. CRUD処理内のコミットがSAVEPOINTの解放,
+ロールバックがSAVEPOINTまでの巻き戻しになるセッションを使うので, 操作ごとの失敗は
+その操作だけを取り消し, 最後に外側のトランザクションを1回だけコミットする.
+
+- ``all_or_nothing``: どれか1つでも失敗すれば全体をロールバックし, 以降の操作は実行しない(424)
+- ``best_effort``: 失敗した操作だけを取り消し, 成功した操作はコミットする
+
+``ref`` を付けた操作の結果は, 後の操作のパスやボディから ``@{ref.id}`` のように参照できる.
+変更イベントはコミット後にまとめて発行する.
+"""
+
+import re
+import time
+from collections.abc import Callable
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import events, group_commit
+from app.crud import item_crud, list_crud
+from app.crud.errors import VersionMismatchError
+from app.schemas.batch_schema import BatchOperation, BatchRequest, BatchResult
+from app.schemas.item_schema import MoveTodoItem, NewTodoItem, ResponseTodoItem, UpdateTodoItem
+from app.schemas.list_schema import NewTodoList, ResponseTodoList, UpdateTodoList
+
+REFERENCE = re.compile(r"@\{(\w+)\.(\w+)\}")
+# 失敗した操作より後で, 実行しなかった操作のステータス
+FAILED_DEPENDENCY = 424
+
+
+class BatchOperationError(Exception):
+    """操作の失敗. status_codeは単独のAPIで返すステータス."""
+
+    def __init__(self, status_code: int, detail: object) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _response(model: type[BaseModel], result: object) -> dict:
+    if result is None:
+        raise BatchOperationError(404, "result not found")
+    return model.model_validate(result, from_attributes=True).model_dump(mode="json")
+
+
+def _updated(model: type[BaseModel], update: Callable[[], object]) -> dict:
+    try:
+        return _response(model, update())
+    except VersionMismatchError:
+        raise BatchOperationError(412, "version mismatch") from None
+
+
+def _deleted(result: object) -> dict:
+    if result is None:
+        raise BatchOperationError(404, "result not found")
+    return result
+
+
+# (メソッド, パス) -> 処理. パスの{}はIDとして整数に変換して渡す
+ROUTES = {
+    ("POST", "/lists"): lambda db, ids, body, version: _response(
+        ResponseTodoList, list_crud.post_todo_list(db, NewTodoList.model_validate(body)),
+    ),
+    ("PUT", "/lists/{todo_list_id}"): lambda db, ids, body, version: _updated(
+        ResponseTodoList, lambda: list_crud.put_todo_list(db, *ids, UpdateTodoList.model_validate(body), version),
+    ),
+    ("DELETE", "/lists/{todo_list_id}"): lambda db, ids, body, version: _deleted(
+        list_crud.delete_todo_list(db, *ids),
+    ),
+    ("POST", "/lists/{todo_list_id}/items"): lambda db, ids, body, version: _response(
+        ResponseTodoItem, item_crud.post_todo_item(db, *ids, NewTodoItem.model_validate(body)),
+    ),
+    ("PUT", "/lists/{todo_list_id}/items/{todo_item_id}"): lambda db, ids, body, version: _updated(
+        ResponseTodoItem, lambda: item_crud.put_todo_item(db, *ids, UpdateTodoItem.model_validate(body), version),
+    ),
+    ("DELETE", "/lists/{todo_list_id}/items/{todo_item_id}"): lambda db, ids, body, version: _deleted(
+        item_crud.delete_todo_item(db, *ids),
+    ),
+    ("POST", "/lists/{todo_list_id}/items/{todo_item_id}/move"): lambda db, ids, body, version: _updated(
+        ResponseTodoItem, lambda: item_crud.move_todo_item(db, *ids, MoveTodoItem.model_validate(body).after_id, version),
+    ),
+}
+_PATTERNS = [
+    (method, re.compile("^" + re.sub(r"\{\w+\}", r"(\\d+)", path) + "/?$"), handler)
+    for (method, path), handler in ROUTES.items()
+]
+
+
+def _lookup(refs: dict[str, dict], name: str, field: str) -> object:
+    if field not in refs.get(name, {}):
+        raise BatchOperationError(400, f"unknown reference @{{{name}.{field}}}")
+    return refs[name][field]
+
+
+def resolve(value: object, refs: dict[str, dict]) -> object:
+    """値の中の ``@{ref.field}`` を, 先に実行した操作の結果で置き換える.
+
+    文字列全体が参照の場合は元の型(整数など)のまま, 文字列の一部の場合は文字列として埋め込む.
+    """
+    if isinstance(value, str):
+        match = REFERENCE.fullmatch(value)
+        if match:
+            return _lookup(refs, *match.groups())
+        return REFERENCE.sub(lambda m: str(_lookup(refs, *m.groups())), value)
+    if isinstance(value, dict):
+        return {key: resolve(item, refs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, refs) for item in value]
+    return value
+
+
+def _run_operation(db: Session, operation: BatchOperation, refs: dict[str, dict]) -> object:
+    path = resolve(operation.path, refs)
+    body = resolve(operation.body or {}, refs)
+    for method, pattern, handler in _PATTERNS:
+        match = pattern.match(path)
+        if match and method == operation.method:
+            return handler(db, [int(x) for x in match.groups()], body, operation.if_match)
+    raise BatchOperationError(404, f"unsupported operation {operation.method} {path}")
+
+
+def run_batch(db: Session, request: BatchRequest) -> dict:
+    """バッチを実行し, 操作ごとの結果とコミットしたかどうかを返す."""
+    start = time.perf_counter()
+    # CRUD処理のcommit/rollbackをSAVEPOINTの解放/巻き戻しにするため, 外側の接続を共有するセッションで実行する
+    batch_db = Session(bind=db.connection(), autoflush=False, expire_on_commit=False, join_transaction_mode="create_savepoint")
+    refs: dict[str, dict] = {}
+    results = []
+    failed = False
+    with events.deferred() as pending, group_commit.suspended():
+        for operation in request.operations:
+            op_start = time.perf_counter()
+            if failed and request.mode == "all_or_nothing":
+                status_code, body = FAILED_DEPENDENCY, {"detail": "a previous operation failed"}
+            else:
+                try:
+                    status_code, body = 200, _run_operation(batch_db, operation, refs)
+                except BatchOperationError as exc:
+                    status_code, body = exc.status_code, {"detail": exc.detail}
+                except ValidationError as exc:
+                    status_code, body = 422, {"detail": exc.errors(include_url=False, include_context=False)}
+                except IntegrityError as exc:
+                    status_code, body = 409, {"detail": str(exc.orig)}
+                if status_code >= 400:  # noqa: PLR2004
+                    # CRUD処理が途中で失敗した場合も, この操作の分だけを取り消す
+                    batch_db.rollback()
+                    failed = True
+                elif operation.ref:
+                    refs[operation.ref] = body
+            results.append(BatchResult(
+                ref=operation.ref, status=status_code, body=body, elapsed_ms=(time.perf_counter() - op_start) * 1000,
+            ))
+
+        committed = not (failed and request.mode == "all_or_nothing")
+        batch_db.close()
+        if committed:
+            db.commit()
+        else:
+            db.rollback()
+            pending.clear()
+
+    return {
+        "mode": request.mode,
+        "committed": committed,
+        "results": results,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
@@ -0,0 +1,230 @@
+"""レスポンス圧縮モジュール.
+
+``Accept-Encoding`` を見て zstd / br / gzip のうちクライアントが受け付けるものを選び,
+一定サイズ以上のレスポンスを圧縮する. brotli と zstandard は任意依存で,
+インストールされていなければその形式は候補から外れる.
+
+キャッシュ層は :class:`PrecompressedBody` を保持しておけば,
+同じペイロードを形式ごとに一度だけ圧縮し, 以降は圧縮済みのバイト列をそのまま返せる.
+"""
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import const
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# 圧縮しても効果の薄いContent-Typeは対象外にする
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+# 逐次届ける必要があるため圧縮しないContent-Type(圧縮器がバッファしてしまう)
+STREAMING_TYPES = ("text/event-stream",)
+
+
+class _GzipStream:
+    def __init__(self, level: int) -> None:
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int) -> None:
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level: int) -> None:
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+def _available_encoders() -> dict:
+    """サーバの優先順に並べた {形式名: ストリーム生成関数}."""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = lambda: _ZstdStream(const.ZSTD_LEVEL)
+    if brotli is not None:
+        encoders["br"] = lambda: _BrotliStream(const.BROTLI_QUALITY)
+    encoders["gzip"] = lambda: _GzipStream(const.GZIP_LEVEL)
+    return encoders
+
+
+ENCODERS = _available_encoders()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """バイト列を指定形式で一括圧縮する."""
+    stream = ENCODERS[encoding]()
+    return stream.compress(data) + stream.flush()
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """``Accept-Encoding`` からサーバ優先順で使用する形式を選ぶ. 該当なしはNone."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    for encoding in ENCODERS:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class PrecompressedBody:
+    """圧縮済みの形で保持するレスポンスボディ.
+
+    形式ごとの圧縮結果は初回要求時に作成して保持する.
+    """
+
+    __slots__ = ("_encoded", "media_type", "raw")
+
+    def __init__(self, raw: bytes, media_type: str = "application/json") -> None:
+        self.raw = raw
+        self.media_type = media_type
+        self._encoded: dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        if encoding not in self._encoded:
+            self._encoded[encoding] = compress(self.raw, encoding)
+        return self._encoded[encoding]
+
+    @property
+    def nbytes(self) -> int:
+        """保持しているバイト数の合計."""
+        return len(self.raw) + sum(len(x) for x in self._encoded.values())
+
+    def to_response(self, request: Request, headers: dict | None = None) -> Response:
+        """リクエストに合った形式のレスポンスを返す. 圧縮は既存の結果を再利用する."""
+        response_headers = {"vary": "Accept-Encoding", **(headers or {})}
+        encoding = negotiate(request.headers.get("accept-encoding", ""))
+        if encoding is None or len(self.raw) < const.COMPRESSION_MINIMUM_SIZE:
+            return Response(self.raw, media_type=self.media_type, headers=response_headers)
+        response_headers["content-encoding"] = encoding
+        return Response(self.encoded(encoding), media_type=self.media_type, headers=response_headers)
+
+
+class CompressionMiddleware:
+    """レスポンスを交渉した形式で圧縮するASGIミドルウェア.
+
+    既に ``Content-Encoding`` が付いているレスポンス(キャッシュ層の圧縮済みレスポンスなど)は
+    そのまま通す.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressingResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message: Message | None = None
+        self.stream = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # ボディの最初の塊を見るまで送信を保留する
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or content_type.startswith(STREAMING_TYPES)
+            )
+            return
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            if self.start_message is not None:
+                await self.send(self.start_message)
+                self.start_message = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            self.stream = ENCODERS[self.encoding]()
+            if more_body:
+                del headers["content-length"]
+            else:
+                body = self.stream.compress(body) + self.stream.flush()
+                headers["content-length"] = str(len(body))
+                await self.send(start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(start_message)
+
+        chunk = self.stream.compress(body)
+        if not more_body:
+            chunk += self.stream.flush()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -3,11 +3,155 @@
 import os
 from enum import Enum
 
+DEBUG = os.getenv("DEBUG", "") == "true"
+
 DB_HOST = os.getenv("DB_HOST")
 DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASS = os.getenv("DB_PASS")
 
+# 使用するDB. "mysql" または "sqlite"
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+# SQLite使用時のDBファイル
+SQLITE_PATH = os.getenv("SQLITE_PATH", "python_be_syokyu.sqlite3")
+# SQLiteでロック待ちをする最大時間(ミリ秒)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# DBドライバの読み込みタイムアウト(秒). 締め切りを無視する文に対する最後の安全網
+DB_READ_TIMEOUT = int(os.getenv("DB_READ_TIMEOUT", "30"))
+# 接続プールで保持する接続数と, 一時的に追加で開ける接続数(エンジンごと)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+# 起動時に前もって開いておく接続数(エンジンごと, 上限はDB_POOL_SIZE). 0の場合はウォームアップしない
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", str(DB_POOL_SIZE)))
+# ウォームアップに失敗した場合に再試行するまでの秒数
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "1"))
+
+# リクエスト全体のデフォルト締め切り(秒)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "10"))
+# 一覧取得APIの締め切り(秒)
+LIST_DEADLINE_SECONDS = float(os.getenv("LIST_DEADLINE_SECONDS", "3"))
+# 一覧取得APIで1ページに返す件数の上限
+MAX_PER_PAGE = int(os.getenv("MAX_PER_PAGE", "100"))
+
+# この大きさ(バイト)未満のレスポンスは圧縮しない
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+# 形式ごとの圧縮レベル
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+# 本番サーバ(app.server)の設定
+APP_HOST = os.getenv("APP_HOST", "0.0.0.0")  # noqa: S104
+APP_PORT = int(os.getenv("APP_PORT", "18008"))
+# ワーカー数. 未指定の場合は使用可能なCPU数から決める
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "16"))
+# ロードバランサのアイドルタイムアウトより長くする
+KEEPALIVE_SECONDS = int(os.getenv("KEEPALIVE_SECONDS", "75"))
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+# メモリ増加を抑えるため, この件数を処理したワーカーを順次再起動する(0で無効)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30"))
+
+# 変更通知(SSE / WebSocket)の購読者ごとのバッファ件数. 溢れた場合はresyncを通知する
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "64"))
+# 変更が無い間に送るハートビートの間隔(秒)
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+# ワーカー間でイベントを配るトランスポート("module:Class"). 空の場合はプロセス内のみ
+EVENT_TRANSPORT = os.getenv("EVENT_TRANSPORT", "")
+
+# グループコミット. 並行する項目の作成・更新をまとめて1つのトランザクションでコミットする
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "") == "true"
+# 最初の書き込みから, まとめる書き込みを待つ時間(ミリ秒)
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+# 1回にまとめる書き込みの上限
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "100"))
+
+# 完了後この日数を過ぎたTODO項目をアーカイブテーブルへ移す
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+# アーカイブ時に1トランザクションで移す件数
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# バックグラウンドでアーカイブを実行する間隔(秒). 0の場合は実行しない
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+
+# リストの複製, 項目の一括移動で1トランザクションに処理する項目数
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+# 分析用エクスポート(python -m app.export, exportジョブ)の書き出し先ディレクトリ
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+# エクスポートの形式(parquet, ndjson). 空の場合はpyarrowがあればparquet, 無ければndjson
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "")
+# エクスポートで1回に読む行数. Parquetではこれが1つの行グループになる
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "50000"))
+# Parquetの圧縮形式(zstd, snappy, gzip, none)
+EXPORT_PARQUET_COMPRESSION = os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd")
+# 差分エクスポートの境界を現在時刻から戻す秒数. 境界の直前に始まった書き込みのコミットを待つ
+EXPORT_LAG_SECONDS = float(os.getenv("EXPORT_LAG_SECONDS", "5"))
+
+# 一覧ページ(GET /lists/, GET /lists/{id}/items)のキャッシュに使うメモリの上限(バイト, プロセスごと). 0の場合はキャッシュしない
+# 無効化は変更イベントで行うため, 複数プロセスで使う場合はEVENT_TRANSPORTで全プロセスにイベントを配ること
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", "0"))
+# 世代を保持するリスト数の上限. 超えた場合は全ての世代を進め, キャッシュ全体を無効にする
+PAGE_CACHE_MAX_GENERATIONS = int(os.getenv("PAGE_CACHE_MAX_GENERATIONS", "100000"))
+
+# バッチAPI(POST /batch)で1リクエストに含められる操作の数
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "100"))
+
+# バックグラウンドジョブを実行するスレッドの数(プロセスごと). 0の場合はこのプロセスでは実行しない
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# 実行待ちのジョブを確認する間隔(秒)
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+# 実行中のジョブの生存確認がこの秒数途絶えたら, 実行待ちに戻して再実行する
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+# 再実行を含めた1つのジョブの実行回数の上限
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# 期限が来た未完了のTODO項目にリマインド(item.dueイベント)を送る
+REMINDERS = os.getenv("REMINDERS", "false") == "true"
+# リマインドを送る時刻の精度(秒)
+REMINDER_TICK_SECONDS = float(os.getenv("REMINDER_TICK_SECONDS", "1"))
+# 期限がこの秒数以内に来る項目を前もってメモリに読み込んでおく
+REMINDER_HORIZON_SECONDS = float(os.getenv("REMINDER_HORIZON_SECONDS", "300"))
+# 起動時, この秒数前までに期限が来ていてまだ送っていないリマインドも送る
+REMINDER_CATCHUP_SECONDS = float(os.getenv("REMINDER_CATCHUP_SECONDS", "3600"))
+
+# リストと項目の変更履歴を記録する
+AUDIT = os.getenv("AUDIT", "true") == "true"
+# 送信待ちの変更を変更履歴へ移す間隔(秒). 0の場合はこのプロセスでは移さない
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+# 1トランザクションで変更履歴へ移す件数
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "1000"))
+
+# シャーディング. 既定のDBをシャード0とし, 追加するシャードの接続URLをカンマ区切りで指定する
+SHARD_URLS = [x.strip() for x in os.getenv("SHARD_URLS", "").split(",") if x.strip()]
+# todo_list_idを振り分けるバケット数(変更不可). バケット単位でシャード間を移動する
+SHARD_BUCKETS = int(os.getenv("SHARD_BUCKETS", "1024"))
+# バケットとシャードの対応を保存するJSONファイル. 無ければ全バケットがシャード0
+SHARD_MAP_PATH = os.getenv("SHARD_MAP_PATH", "shard_map.json")
+# シャーディング時, プロセスごとにまとめて予約するIDの数
+SHARD_ID_BLOCK_SIZE = int(os.getenv("SHARD_ID_BLOCK_SIZE", "100"))
+
+# 管理用API(/admin)のトークン. X-Admin-Tokenヘッダで渡す. 空の場合は管理用APIを無効にする
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# プロファイルを取るリクエストの割合(0から1). X-Profileヘッダに管理用トークンを付けたリクエストは常に取る
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# プロファイルのサンプリング間隔(ミリ秒)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# 保持しておくプロファイルの数
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+# ワーカー全体のプロファイルを取る秒数の上限
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+# この時間(ミリ秒)を超えたSQL文をスロークエリとして記録する. 0の場合は記録しない
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# 保持しておくスロークエリの件数
+SLOW_QUERY_KEEP = int(os.getenv("SLOW_QUERY_KEEP", "100"))
+# スロークエリのEXPLAINを取るかどうか
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true") == "true"
+
 
 class TodoItemStatusCode(Enum):
     """TODO項目のステータス."""
@@ -0,0 +1,37 @@
+"""CRUD処理で共通して使う関数."""
+
+from functools import lru_cache
+
+from sqlalchemy import Select, Update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app import const
+
+
+def normalize_page(page: int, per_page: int) -> tuple[int, int]:
+    """ページ番号と1ページの件数を補正する. ページは1以上, 件数は1以上MAX_PER_PAGE以下にする."""
+    return max(page, 1), max(1, min(per_page, const.MAX_PER_PAGE))
+
+
+def execute_update(db: Session, stmt: Update, select_stmt: Select, params: dict) -> Row | None:
+    """UPDATE文を実行し, 更新後の行を返す. 対象の行が無ければNone.
+
+    RETURNINGに対応したDBでは1往復で済ませ, 対応していないDB(MySQL)では
+    更新できた場合のみselect_stmtで読み直す.
+    """
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(*select_stmt.selected_columns)).one_or_none()
+
+    if db.execute(stmt).rowcount == 0:
+        return None
+    return db.execute(select_stmt, params).one_or_none()
+
+
+@lru_cache(maxsize=256)
+def with_columns(stmt: Select, columns: tuple[str, ...]) -> Select:
+    """組み立て済みのSELECT文の列をcolumnsだけに絞った文を返す.
+
+    列の組ごとに一度だけ組み立てて使い回すので, SQLAlchemyのコンパイル結果のキャッシュも効く.
+    """
+    return stmt.with_only_columns(*[stmt.selected_columns[name] for name in columns])
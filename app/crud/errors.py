@@ -0,0 +1,9 @@
+"""CRUD処理で使う例外."""
+
+
+class VersionMismatchError(Exception):
+    """If-Matchで指定されたバージョンが現在のバージョンと一致しないことを示す例外."""
+
+
+class CrossShardError(Exception):
+    """シャーディング時, 別々のシャードにあるリストをまたいだ操作を要求されたことを示す例外."""
@@ -1,30 +1,225 @@
+import datetime
+import heapq
+import itertools
+from functools import lru_cache
+
 from sqlalchemy.orm import Session
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, and_, or_, bindparam, func, literal_column, union_all
+from app.models.archive_model import ArchivedItemModel
 from app.models.item_model import ItemModel
 from app.models.list_model import ListModel
+from app import audit, const, events, group_commit, reminders, sharding
 from app.const import TodoItemStatusCode
+from app.crud.common import execute_update, normalize_page, with_columns
+from app.crud.errors import CrossShardError, VersionMismatchError
 from app.schemas.item_schema import NewTodoItem, UpdateTodoItem
 
-def get_todo_item(db: Session, todo_list_id: int, todo_item_id: int):
-    """Todo項目を取得するAPI"""
+# よく使うSQL文はモジュール読み込み時に一度だけ組み立て, 値はバインドパラメータで渡す.
+# 読み込み専用の文はORMを通さずテーブルに対して発行し, 行(Row)をそのまま返す
+items_table = ItemModel.__table__
+lists_table = ListModel.__table__
+archive_table = ArchivedItemModel.__table__
+
+SELECT_ITEM = select(items_table).where(
+    and_(items_table.c.id == bindparam("todo_item_id"), items_table.c.todo_list_id == bindparam("todo_list_id"))
+)
+SELECT_ITEM_FOR_UPDATE = select(ItemModel).where(
+    and_(ItemModel.id == bindparam("todo_item_id"), ItemModel.todo_list_id == bindparam("todo_list_id"))
+)
+SELECT_LIST_EXISTS = select(lists_table.c.id).where(lists_table.c.id == bindparam("todo_list_id"))
+# リストの項目数の増減. 更新日時は変えない
+INCREMENT_ITEM_COUNT = (
+    update(lists_table)
+    .where(lists_table.c.id == bindparam("todo_list_id"))
+    .values(item_count=lists_table.c.item_count + 1, updated_at=lists_table.c.updated_at)
+)
+DECREMENT_ITEM_COUNT = (
+    update(lists_table)
+    .where(lists_table.c.id == bindparam("todo_list_id"))
+    .values(item_count=lists_table.c.item_count - 1, updated_at=lists_table.c.updated_at)
+)
+SELECT_ITEM_COUNT = select(lists_table.c.item_count).where(lists_table.c.id == bindparam("todo_list_id"))
+COUNT_ITEMS = select(func.count()).select_from(items_table).where(items_table.c.todo_list_id == bindparam("todo_list_id"))
+SELECT_LIST_ITEMS = select(items_table).where(items_table.c.todo_list_id == bindparam("todo_list_id"))
+SELECT_ITEMS_PAGE = (
+    SELECT_LIST_ITEMS
+    .order_by(items_table.c.position, items_table.c.id)   # (todo_list_id, position)のインデックスの順
+    .offset(bindparam("offset"))
+    .limit(bindparam("limit"))
+)
+
+# アーカイブ済みの項目も含める場合の読み込み. 列は通常の項目と揃える
+_item_columns = [column.name for column in items_table.columns]
+SELECT_ARCHIVED_ITEM = select(*[archive_table.c[name] for name in _item_columns]).where(
+    and_(archive_table.c.id == bindparam("todo_item_id"), archive_table.c.todo_list_id == bindparam("todo_list_id"))
+)
+SELECT_ARCHIVED_ITEMS = select(*[archive_table.c[name] for name in _item_columns]).where(
+    archive_table.c.todo_list_id == bindparam("todo_list_id")
+)
+
+@lru_cache(maxsize=64)
+def _select_items_with_archive_page(columns: tuple[str, ...]):
+    """アーカイブ済みの項目も含めたページの読み込み. 並べ替えに使うid, positionは常に含める."""
+    columns = (*columns, *[name for name in ("id", "position") if name not in columns])
+    return (
+        union_all(
+            with_columns(SELECT_LIST_ITEMS, columns),
+            with_columns(SELECT_ARCHIVED_ITEMS, columns),
+        )
+        .order_by(literal_column("position"), literal_column("id"))
+        .offset(bindparam("offset"))
+        .limit(bindparam("limit"))
+    )
+
+SELECT_ITEMS_WITH_ARCHIVE_PAGE = _select_items_with_archive_page(tuple(_item_columns))
+COUNT_ARCHIVED_ITEMS = select(func.count()).select_from(archive_table).where(archive_table.c.todo_list_id == bindparam("todo_list_id"))
+
+# 期限が範囲内の未完了の項目. (status_code, due_at)のインデックスの範囲検索になる
+SELECT_DUE_ITEMS = (
+    select(items_table)
+    .where(
+        items_table.c.status_code == TodoItemStatusCode.NOT_COMPLETED.value,
+        items_table.c.due_at >= bindparam("due_from"),
+        items_table.c.due_at <= bindparam("due_until"),
+    )
+    .order_by(items_table.c.due_at, items_table.c.id)
+    .offset(bindparam("offset"))
+    .limit(bindparam("limit"))
+)
 
-    # SQL文の作成
-    stmt = select(ItemModel).where(
-        and_(ItemModel.id == todo_item_id, ItemModel.todo_list_id == todo_list_id)
+# 並び順(position)は間隔を空けて振り, 移動では前後の項目の中間の値にする.
+# 間隔が足りない場合のみ, 後ろの項目を最大REBALANCE_WINDOW件ずつ広げて振り直す
+# 窓はMAX_REBALANCE_WINDOW件まで広げ, それでも足りなければ窓より後ろの項目をまとめてずらす
+POSITION_GAP = 65536
+REBALANCE_WINDOW = 64
+MAX_REBALANCE_WINDOW = 4096
+SELECT_LAST_POSITION = select(func.max(items_table.c.position)).where(items_table.c.todo_list_id == bindparam("todo_list_id"))
+SELECT_POSITION = select(items_table.c.position).where(
+    and_(items_table.c.id == bindparam("todo_item_id"), items_table.c.todo_list_id == bindparam("todo_list_id"))
+)
+# (position, id)の順で, 指定した項目より後ろの項目. 移動する項目自身は除く
+SELECT_FOLLOWING = (
+    select(items_table.c.id, items_table.c.position)
+    .where(
+        items_table.c.todo_list_id == bindparam("todo_list_id"),
+        items_table.c.id != bindparam("todo_item_id"),
+        or_(
+            items_table.c.position > bindparam("after_position"),
+            and_(items_table.c.position == bindparam("after_position"), items_table.c.id > bindparam("after_id")),
+        ),
     )
-    result = db.execute(stmt)   # DBに問い合わせ
-    return result.scalar_one_or_none()   # 単一の結果を取得
+    .order_by(items_table.c.position, items_table.c.id)
+    .limit(bindparam("limit"))
+)
+SELECT_FIRST = (
+    select(items_table.c.id, items_table.c.position)
+    .where(items_table.c.todo_list_id == bindparam("todo_list_id"), items_table.c.id != bindparam("todo_item_id"))
+    .order_by(items_table.c.position, items_table.c.id)
+    .limit(1)
+)
+# 振り直しは並び順だけを変え, バージョンと更新日時は変えない
+SET_POSITION = (
+    update(items_table)
+    .where(items_table.c.id == bindparam("b_id"))
+    .values(position=bindparam("b_position"), updated_at=items_table.c.updated_at)
+)
+# (position, id)が指定した項目以降の項目をshiftだけ後ろへずらす. 移動する項目自身は除く
+SHIFT_FOLLOWING = (
+    update(items_table)
+    .where(
+        items_table.c.todo_list_id == bindparam("b_todo_list_id"),
+        items_table.c.id != bindparam("b_todo_item_id"),
+        or_(
+            items_table.c.position > bindparam("from_position"),
+            and_(items_table.c.position == bindparam("from_position"), items_table.c.id >= bindparam("from_id")),
+        ),
+    )
+    .values(position=items_table.c.position + bindparam("shift"), updated_at=items_table.c.updated_at)
+)
+# 一括移動. 移動元に残っている先頭の項目から順にチャンク単位で移し, 移動先の末尾に並べる
+ADD_ITEM_COUNT = (
+    update(lists_table)
+    .where(lists_table.c.id == bindparam("todo_list_id"))
+    .values(item_count=lists_table.c.item_count + bindparam("count"), updated_at=lists_table.c.updated_at)
+)
+_move_source = items_table.c.todo_list_id == bindparam("todo_list_id")
+_move_selected = items_table.c.id.in_(bindparam("item_ids", expanding=True))
+_up_to_boundary = or_(
+    items_table.c.position < bindparam("last_position"),
+    and_(items_table.c.position == bindparam("last_position"), items_table.c.id <= bindparam("last_id")),
+)
+SELECT_MOVE_CHUNK = {
+    # (指定した項目だけか, 何件目か) -> その位置の項目
+    selected: select(items_table.c.id, items_table.c.position)
+    .where(_move_source, *([_move_selected] if selected else []))
+    .order_by(items_table.c.position, items_table.c.id)
+    .offset(bindparam("offset"))
+    .limit(1)
+    for selected in (False, True)
+}
+MOVE_ITEMS = {
+    # (指定した項目だけか, チャンクの末尾で区切るか) -> UPDATE文
+    (selected, bounded): update(items_table)
+    .where(_move_source, *([_move_selected] if selected else []), *([_up_to_boundary] if bounded else []))
+    .values(
+        todo_list_id=bindparam("target_list_id"),
+        position=items_table.c.position + bindparam("shift"),
+        version=items_table.c.version + 1,
+    )
+    for selected in (False, True)
+    for bounded in (False, True)
+}
+
+def get_todo_item(db: Session, todo_list_id: int, todo_item_id: int, include_archived: bool = False, columns: tuple[str, ...] | None = None):
+    """Todo項目を取得するAPI
+
+    columnsを指定した場合はその列だけを読み込む.
+    """
+
+    params = {"todo_item_id": todo_item_id, "todo_list_id": todo_list_id}
+    stmt = SELECT_ITEM if columns is None else with_columns(SELECT_ITEM, columns)
+    result = db.execute(stmt, params).one_or_none()   # DBに問い合わせ, 単一の結果を取得
+    if result is None and include_archived:
+        stmt = SELECT_ARCHIVED_ITEM if columns is None else with_columns(SELECT_ARCHIVED_ITEM, columns)
+        result = db.execute(stmt, params).one_or_none()
+    return result
 
 def post_todo_item(db: Session, todo_list_id: int, todo_item_list: NewTodoItem):
     """Todo項目を作成するAPI"""
 
-    stmt = select(ListModel).where(ListModel.id == todo_list_id)
-    result = db.execute(stmt).scalar_one_or_none()
+    # シャーディング時はシャードをまたいで一意なIDを使う. 採番は別のトランザクションで書き込むので先に行う
+    todo_item_id = sharding.get_router().next_id("todo_items") if sharding.enabled() else None
+    if group_commit.enabled():
+        # 他の書き込みとまとめてコミットする
+        new_list = group_commit.submit(db, _insert_todo_item, todo_list_id, todo_item_list, todo_item_id)
+    else:
+        new_list = _insert_todo_item(db, todo_list_id, todo_item_list, todo_item_id)
+        if new_list is not None:
+            db.commit()
+            db.refresh(new_list)
+    if new_list is None:
+        return None
+
+    events.publish(todo_list_id, "item.created", todo_item_id=new_list.id, version=new_list.version)
+    if new_list.due_at is not None:
+        reminders.scheduler.schedule(new_list.id, todo_list_id, new_list.due_at)
+
+    return new_list
+
+def _insert_todo_item(db: Session, todo_list_id: int, todo_item_list: NewTodoItem, todo_item_id: int | None = None):
+    """Todo項目を追加する(コミットはしない). リストが無ければNone. todo_item_idがNoneならDBで採番する."""
+
+    result = db.execute(SELECT_LIST_EXISTS, {"todo_list_id": todo_list_id}).scalar_one_or_none()
     if result is None:
         return None
 
+    # 末尾に追加する
+    last_position = db.execute(SELECT_LAST_POSITION, {"todo_list_id": todo_list_id}).scalar_one_or_none()
+
     new_list = ItemModel(
+        id = todo_item_id,
         todo_list_id = todo_list_id,
+        position = (last_position or 0) + POSITION_GAP,
         title = todo_item_list.title,
         description = todo_item_list.description,
         due_at = todo_item_list.due_at,
@@ -32,65 +227,281 @@ def post_todo_item(db: Session, todo_list_id: int, todo_item_list: NewTodoItem):
     )
 
     db.add(new_list)
-    db.commit()
-    db.refresh(new_list)
+    db.execute(INCREMENT_ITEM_COUNT, {"todo_list_id": todo_list_id})
+    # 変更履歴にIDを残すため, コミットを待たずにINSERTしておく
+    db.flush()
+    audit.record(db, todo_list_id, "item", new_list.id, "created", 1, todo_item_list.model_dump(mode="json", exclude_none=True))
+    if group_commit.enabled():
+        # まとめてコミットした後も値を返せるよう, トランザクション内で読み直しておく
+        db.refresh(new_list)
 
     return new_list
 
-def put_todo_item(db: Session, todo_list_id: int, todo_item_id: int, update_data: UpdateTodoItem):
-    """Todo項目を更新するAPI"""
+def put_todo_item(db: Session, todo_list_id: int, todo_item_id: int, update_data: UpdateTodoItem, expected_version: int | None = None):
+    """Todo項目を更新するAPI
 
-    stmt = select(ItemModel).where(
-        and_(ItemModel.id == todo_item_id, ItemModel.todo_list_id == todo_list_id)
-    )
-    result = db.execute(stmt)
-    db_item = result.scalar_one_or_none()
+    事前に読み込まず, 1回のUPDATE文で更新してバージョンを1増やす.
+    expected_versionを指定した場合はそのバージョンの時だけ更新し, 一致しなければVersionMismatchErrorを送出する.
+    """
 
+    if group_commit.enabled():
+        # 他の書き込みとまとめてコミットする
+        db_item = group_commit.submit(db, _update_todo_item, todo_list_id, todo_item_id, update_data, expected_version)
+    else:
+        try:
+            db_item = _update_todo_item(db, todo_list_id, todo_item_id, update_data, expected_version)
+        except VersionMismatchError:
+            db.rollback()
+            raise
+        if db_item is None:
+            db.rollback()
+        else:
+            db.commit()
     if db_item is None:
-        return
-    
+        return None
+
+    events.publish(todo_list_id, "item.updated", todo_item_id=todo_item_id, version=db_item.version)
+    # 期限を変えた項目と, 未完了に戻した項目はリマインドの予定に載せ直す
+    if update_data.due_at is not None or update_data.complete is False:
+        reminders.scheduler.schedule(todo_item_id, todo_list_id, db_item.due_at)
+    return db_item
+
+def _update_todo_item(db: Session, todo_list_id: int, todo_item_id: int, update_data: UpdateTodoItem, expected_version: int | None):
+    """Todo項目を更新する(コミットはしない). 対象が無ければNone."""
+
+    values = {"version": items_table.c.version + 1}
     if update_data.title is not None:
-        db_item.title = update_data.title
+        values["title"] = update_data.title
     if update_data.description is not None:
-        db_item.description = update_data.description
+        values["description"] = update_data.description
     if update_data.due_at is not None:
-        db_item.due_at = update_data.due_at
+        values["due_at"] = update_data.due_at
+        values["reminded_at"] = None    # 新しい期限で改めてリマインドする
     if update_data.complete is not None:
         if update_data.complete:
-            db_item.status_code = TodoItemStatusCode.COMPLETED.value
+            values["status_code"] = TodoItemStatusCode.COMPLETED.value
         else:
-            db_item.status_code = TodoItemStatusCode.NOT_COMPLETED.value
+            values["status_code"] = TodoItemStatusCode.NOT_COMPLETED.value
 
+    conditions = [items_table.c.id == todo_item_id, items_table.c.todo_list_id == todo_list_id]
+    if expected_version is not None:
+        conditions.append(items_table.c.version == expected_version)
+    stmt = update(items_table).where(and_(*conditions)).values(values)
+
+    db_item = execute_update(db, stmt, SELECT_ITEM, {"todo_item_id": todo_item_id, "todo_list_id": todo_list_id})
+    # 更新できなかった場合のみ, 存在しないのかバージョン違いなのかを確認する
+    if db_item is None and expected_version is not None and get_todo_item(db, todo_list_id, todo_item_id) is not None:
+        raise VersionMismatchError
+    if db_item is not None:
+        audit.record(db, todo_list_id, "item", todo_item_id, "updated", db_item.version, update_data.model_dump(mode="json", exclude_none=True))
+    return db_item
+
+def move_todo_item(db: Session, todo_list_id: int, todo_item_id: int, after_id: int | None, expected_version: int | None = None):
+    """Todo項目の並び順を変えるAPI
+
+    after_idの項目の直後に移す. after_idがNoneの場合は先頭に移す.
+    通常は移動する項目の1行だけを更新する. 項目またはafter_idの項目が無ければNone.
+    """
+
+    try:
+        position = _move_position(db, todo_list_id, todo_item_id, after_id)
+        if position is None:
+            db.rollback()
+            return None
+        conditions = [items_table.c.id == todo_item_id, items_table.c.todo_list_id == todo_list_id]
+        if expected_version is not None:
+            conditions.append(items_table.c.version == expected_version)
+        stmt = update(items_table).where(and_(*conditions)).values(position=position, version=items_table.c.version + 1)
+        db_item = execute_update(db, stmt, SELECT_ITEM, {"todo_item_id": todo_item_id, "todo_list_id": todo_list_id})
+        if db_item is None:
+            # 移動する項目の存在は確認済みなので, バージョン違い
+            raise VersionMismatchError
+        audit.record(db, todo_list_id, "item", todo_item_id, "moved", db_item.version, {"after_id": after_id})
+    except VersionMismatchError:
+        db.rollback()
+        raise
     db.commit()
-    db.refresh(db_item)
 
+    events.publish(todo_list_id, "item.moved", todo_item_id=todo_item_id, after_id=after_id, version=db_item.version)
     return db_item
 
+def _move_position(db: Session, todo_list_id: int, todo_item_id: int, after_id: int | None) -> int | None:
+    """移動先のpositionを返す. 間隔が足りなければ後ろの項目を振り直す."""
+
+    params = {"todo_list_id": todo_list_id, "todo_item_id": todo_item_id}
+    current = db.execute(SELECT_POSITION, params).scalar_one_or_none()
+    if current is None or after_id == todo_item_id:
+        # 自分自身の後ろ = 今の位置のまま
+        return current
+
+    if after_id is None:
+        first = db.execute(SELECT_FIRST, params).one_or_none()
+        return POSITION_GAP if first is None else first.position - POSITION_GAP
+
+    after_position = db.execute(SELECT_POSITION, {"todo_list_id": todo_list_id, "todo_item_id": after_id}).scalar_one_or_none()
+    if after_position is None:
+        return None
+    following = {**params, "after_position": after_position, "after_id": after_id}
+    next_item = db.execute(SELECT_FOLLOWING, {**following, "limit": 1}).one_or_none()
+    if next_item is None:
+        return after_position + POSITION_GAP
+    if next_item.position - after_position >= 2:  # noqa: PLR2004
+        return (after_position + next_item.position) // 2
+    return _rebalance(db, after_position, following)
+
+def _rebalance(db: Session, after_position: int, following: dict) -> int:
+    """after_positionの直後の項目を振り直して間隔を作り, 移動する項目のpositionを返す.
+
+    後ろの項目をREBALANCE_WINDOW件取り, その次の項目との間に均等に並べ直す.
+    十分な間隔が取れなければ件数を倍にして取り直す(末尾まで達すればPOSITION_GAPごとに並べる).
+    MAX_REBALANCE_WINDOW件でも足りなければ, 窓内をPOSITION_GAPごとに並べ, 窓より後ろの項目は1文でまとめてずらす.
+    """
+
+    window = REBALANCE_WINDOW
+    while True:
+        rows = db.execute(SELECT_FOLLOWING, {**following, "limit": window + 1}).all()
+        if len(rows) <= window:
+            spacing = POSITION_GAP
+            break
+        # 窓の次の項目の手前までに, 移動する項目と窓内の項目を並べる
+        spacing = (rows[window].position - after_position) // (window + 2)
+        if spacing >= POSITION_GAP // 64:
+            rows = rows[:window]
+            break
+        if window >= MAX_REBALANCE_WINDOW:
+            spacing = POSITION_GAP
+            rest = rows.pop()
+            db.execute(SHIFT_FOLLOWING, {
+                "b_todo_list_id": following["todo_list_id"],
+                "b_todo_item_id": following["todo_item_id"],
+                "from_position": rest.position,
+                "from_id": rest.id,
+                "shift": after_position + spacing * (window + 2) - rest.position,
+            })
+            break
+        window = min(window * 2, MAX_REBALANCE_WINDOW)
+
+    db.execute(SET_POSITION, [
+        {"b_id": row.id, "b_position": after_position + spacing * (n + 2)} for n, row in enumerate(rows)
+    ])
+    return after_position + spacing
+
+def move_todo_items(db: Session, todo_list_id: int, target_list_id: int, item_ids: list[int] | None = None, chunk_size: int = const.BULK_CHUNK_SIZE):
+    """Todo項目を別のリストへ一括で移動するAPI
+
+    項目を読み込まずにUPDATE文でリストを付け替え, 移動先の末尾に元の順序のまま並べる.
+    item_idsがNoneの場合はリストの全項目を移す. chunk_size件ごとにコミットする.
+    移した件数を返す. どちらかのリストが無ければNone.
+    """
+
+    if sharding.enabled():
+        router = sharding.get_router()
+        if router.shard_for(todo_list_id) != router.shard_for(target_list_id):
+            raise CrossShardError
+    for list_id in (todo_list_id, target_list_id):
+        if db.execute(SELECT_LIST_EXISTS, {"todo_list_id": list_id}).scalar_one_or_none() is None:
+            db.rollback()
+            return None
+    if todo_list_id == target_list_id or item_ids == []:
+        db.rollback()
+        return 0
+
+    selected = item_ids is not None
+    params = {"todo_list_id": todo_list_id, "target_list_id": target_list_id}
+    if selected:
+        params["item_ids"] = item_ids
+    moved = 0
+    while True:
+        first = db.execute(SELECT_MOVE_CHUNK[selected], {**params, "offset": 0}).one_or_none()
+        if first is None:
+            db.rollback()
+            break
+        last = db.execute(SELECT_MOVE_CHUNK[selected], {**params, "offset": chunk_size - 1}).one_or_none()
+        last_position = db.execute(SELECT_LAST_POSITION, {"todo_list_id": target_list_id}).scalar_one_or_none()
+        shift = (last_position or 0) + POSITION_GAP - first.position
+        bounds = {} if last is None else {"last_position": last.position, "last_id": last.id}
+        count = db.execute(MOVE_ITEMS[selected, last is not None], {**params, **bounds, "shift": shift}).rowcount
+        db.execute(ADD_ITEM_COUNT, {"todo_list_id": todo_list_id, "count": -count})
+        db.execute(ADD_ITEM_COUNT, {"todo_list_id": target_list_id, "count": count})
+        audit.record(db, todo_list_id, "item", None, "moved_out", None, {"to_list_id": target_list_id, "count": count})
+        audit.record(db, target_list_id, "item", None, "moved_in", None, {"from_list_id": todo_list_id, "count": count})
+        db.commit()
+        moved += count
+        if last is None:
+            break
+
+    if moved:
+        for list_id in (todo_list_id, target_list_id):
+            events.publish(list_id, "items.moved", from_list_id=todo_list_id, to_list_id=target_list_id, count=moved)
+        reminders.scheduler.schedule_list(target_list_id)
+    return moved
+
 def delete_todo_item(db: Session, todo_list_id: int, todo_item_id: int):
     """Todo項目を削除するAPI"""
 
-    stmt = select(ItemModel).where(
-        and_(ItemModel.id == todo_item_id, ItemModel.todo_list_id == todo_list_id)
-    )
-    result = db.execute(stmt)
+    result = db.execute(SELECT_ITEM_FOR_UPDATE, {"todo_item_id": todo_item_id, "todo_list_id": todo_list_id})
     db_item = result.scalar_one_or_none()
 
     if db_item is None:
         return
     
     db.delete(db_item)
+    db.execute(DECREMENT_ITEM_COUNT, {"todo_list_id": todo_list_id})
+    audit.record(db, todo_list_id, "item", todo_item_id, "deleted", db_item.version)
     db.commit()
+    events.publish(todo_list_id, "item.deleted", todo_item_id=todo_item_id)
 
     return {}
 
-def get_todo_items(db: Session, todo_list_id: int, page: int, per_page: int):
-    """Todo項目一覧を取得するAPI"""
+def get_todo_items(
+    db: Session, todo_list_id: int, page: int, per_page: int, include_archived: bool = False, columns: tuple[str, ...] | None = None,
+):
+    """Todo項目一覧を取得するAPI
+
+    columnsを指定した場合はその列だけを読み込む.
+    """
 
-    page = max(page, 1)
+    page, per_page = normalize_page(page, per_page)   # 1ページの件数はサーバ側で上限を設ける
     offset = (page - 1) * per_page
 
-    stmt = select(ItemModel).offset(offset).limit(per_page).where(
-        and_(ItemModel.todo_list_id == todo_list_id)
-    )
-    result = db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+    if columns is None:
+        stmt = SELECT_ITEMS_WITH_ARCHIVE_PAGE if include_archived else SELECT_ITEMS_PAGE
+    elif include_archived:
+        stmt = _select_items_with_archive_page(columns)
+    else:
+        stmt = with_columns(SELECT_ITEMS_PAGE, columns)
+    result = db.execute(stmt, {"todo_list_id": todo_list_id, "offset": offset, "limit": per_page})
+    return result.all()
+
+def get_due_items(db: Session, due_from: datetime.datetime, due_until: datetime.datetime, page: int, per_page: int):
+    """期限がdue_fromからdue_untilまでの未完了のTodo項目を, 期限の近い順に取得するAPI"""
+
+    page, per_page = normalize_page(page, per_page)
+    offset = (page - 1) * per_page
+    params = {"due_from": due_from, "due_until": due_until}
+
+    if sharding.enabled():
+        # 各シャードから先頭のoffset+per_page件を取得し, 期限の順にマージしてからページを切り出す
+        heads = sharding.get_router().scatter(
+            lambda shard_db: shard_db.execute(SELECT_DUE_ITEMS, {**params, "offset": 0, "limit": offset + per_page}).all()
+        )
+        merged = heapq.merge(*heads, key=lambda row: (row.due_at, row.id))
+        return list(itertools.islice(merged, offset, offset + per_page))
+
+    return db.execute(SELECT_DUE_ITEMS, {**params, "offset": offset, "limit": per_page}).all()
+
+def count_todo_items(db: Session, todo_list_id: int, exact: bool = False, include_archived: bool = False) -> int:
+    """Todo項目の総件数を返す.
+
+    通常はリストに保持している項目数を読むだけで済ませ, exact=Trueの場合のみCOUNT(*)で数える.
+    アーカイブ済みの項目はinclude_archived=Trueの場合のみ数える(保持している項目数には含まない).
+    """
+
+    params = {"todo_list_id": todo_list_id}
+    if exact:
+        count = db.execute(COUNT_ITEMS, params).scalar_one()
+    else:
+        count = db.execute(SELECT_ITEM_COUNT, params).scalar_one_or_none() or 0
+    if include_archived:
+        count += db.execute(COUNT_ARCHIVED_ITEMS, params).scalar_one()
+    return count
@@ -1,49 +1,173 @@
+import heapq
+import itertools
+
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import Integer, select, insert, update, bindparam, func, text
+from app import audit, const, events, reminders, sharding
+from app.crud import item_crud
+from app.crud.common import execute_update, normalize_page, with_columns
+from app.crud.errors import VersionMismatchError
+from app.models.item_model import ItemModel
 from app.models.list_model import ListModel
-from app.schemas.list_schema import NewTodoList, UpdateTodoList
-
-def get_todo_list( db: Session, todo_list_id: int):
-    """Todoリストを取得するAPI"""
-
-    stmt = select(ListModel).where(ListModel.id == todo_list_id)
-    result = db.execute(stmt)
-    return result.scalar_one_or_none()
-
-def post_todo_list(db: Session, todo_list: NewTodoList):  
+from app.schemas.list_schema import DuplicateTodoList, NewTodoList, UpdateTodoList
+
+# よく使う読み込み専用のSQL文は一度だけ組み立てて使い回す(値はバインドパラメータで渡す)
+lists_table = ListModel.__table__
+
+SELECT_LIST = select(lists_table).where(lists_table.c.id == bindparam("todo_list_id"))
+SELECT_LISTS_PAGE = select(lists_table).offset(bindparam("offset")).limit(bindparam("limit"))
+COUNT_LISTS = select(func.count()).select_from(lists_table)
+# 総件数の概算. MySQLはテーブル統計の行数を使う(SQLiteには統計が無いのでCOUNT(*)で数える)
+ESTIMATE_LISTS_MYSQL = text(
+    "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'todo_lists'"
+)
+# シャーディング時に各シャードから先頭の行を集めるSQL文(ID順にマージする)
+SELECT_LISTS_HEAD = select(lists_table).order_by(lists_table.c.id).limit(bindparam("limit"))
+
+# リストの複製. 項目はID順にチャンクに分け, 1チャンクを1回のINSERT ... SELECTでコピーする
+items_table = ItemModel.__table__
+COPIED_COLUMNS = ["title", "description", "status_code", "due_at", "position"]
+SELECT_COPY_CHUNK = (
+    select(items_table.c.id)
+    .where(items_table.c.todo_list_id == bindparam("todo_list_id"), items_table.c.id > bindparam("after_id"))
+    .order_by(items_table.c.id)
+    .limit(bindparam("limit"))
+)
+_copy_chunk = (
+    (items_table.c.todo_list_id == bindparam("todo_list_id"))
+    & (items_table.c.id > bindparam("after_id"))
+    & (items_table.c.id <= bindparam("last_id"))
+)
+COPY_ITEMS = insert(items_table).from_select(
+    ["todo_list_id", *COPIED_COLUMNS],
+    select(bindparam("new_list_id", type_=Integer), *[items_table.c[name] for name in COPIED_COLUMNS]).where(_copy_chunk),
+)
+# シャーディング時は予約した連続するIDを振る
+COPY_ITEMS_WITH_IDS = insert(items_table).from_select(
+    ["id", "todo_list_id", *COPIED_COLUMNS],
+    select(
+        bindparam("first_id", type_=Integer) + func.row_number().over(order_by=items_table.c.id) - 1,
+        bindparam("new_list_id", type_=Integer),
+        *[items_table.c[name] for name in COPIED_COLUMNS],
+    ).where(_copy_chunk),
+)
+
+def get_todo_list( db: Session, todo_list_id: int, columns: tuple[str, ...] | None = None):
+    """Todoリストを取得するAPI
+
+    columnsを指定した場合はその列だけを読み込む.
+    """
+
+    stmt = SELECT_LIST if columns is None else with_columns(SELECT_LIST, columns)
+    result = db.execute(stmt, {"todo_list_id": todo_list_id})
+    return result.one_or_none()
+
+def post_todo_list(db: Session, todo_list: NewTodoList):
     """新しいTODOリストを作成するAPI"""
 
+    if sharding.enabled():
+        # シャーディング時は先にIDを払い出し, そのIDのシャードに作成する
+        router = sharding.get_router()
+        todo_list_id = router.next_id("todo_lists")
+        with router.session_for(todo_list_id) as shard_db:
+            return _create_todo_list(shard_db, todo_list, todo_list_id)
+    return _create_todo_list(db, todo_list)
+
+def _create_todo_list(db: Session, todo_list: NewTodoList, todo_list_id: int | None = None):
     # 新しいリストを作成。ListModelインスタンスを生成
     new_list = ListModel(
+        id=todo_list_id,
         title=todo_list.title,
         description=todo_list.description
     )
 
     db.add(new_list)    # 追加
+    db.flush()      # 変更履歴にIDを残すため, 先にINSERTしておく
+    audit.record(db, new_list.id, "list", None, "created", 1, todo_list.model_dump(mode="json", exclude_none=True))
     db.commit()     # 保存
     db.refresh(new_list)    # 保存後に最新のデータを取得
+    events.publish(new_list.id, "list.created", version=new_list.version)
 
     # 作成したnew_listをレスポンスとして返す
     # response_model=NewTodoListのため、FastAPIは自動でJSONに変換する
     return new_list
 
-def put_todo_list(db: Session, todo_list_id: int, update_data: UpdateTodoList):
-    """Todoリストを更新するAPI"""
+def duplicate_todo_list(db: Session, todo_list_id: int, data: DuplicateTodoList, chunk_size: int = const.BULK_CHUNK_SIZE):
+    """Todoリストを項目ごと複製するAPI
+
+    項目はアプリに読み込まずINSERT ... SELECTでコピーする(アーカイブ済みの項目はコピーしない).
+    chunk_size件ごとにコミットするので, 大きなリストでも1つのトランザクションが長くならない.
+    元のリストが無ければNone.
+    """
+
+    new_list_id = None
+    if sharding.enabled():
+        # INSERT ... SELECTで済むよう, 元のリストと同じシャードになるIDを使う.
+        # 採番は別のトランザクションで書き込むので, このセッションのトランザクションを始める前に行う
+        router = sharding.get_router()
+        new_list_id = router.next_id_on("todo_lists", router.shard_for(todo_list_id))
+    source = get_todo_list(db, todo_list_id)
+    if source is None:
+        db.rollback()
+        return None
+    new_list = _create_todo_list(
+        db, NewTodoList(title=data.title or source.title, description=source.description), new_list_id,
+    )
 
-    # 指定されたtodo_list_idのリストを取得
-    todo_list = db.get(ListModel, todo_list_id)
-    if todo_list is None:
-        return
+    params = {"todo_list_id": todo_list_id, "new_list_id": new_list.id, "after_id": 0}
+    while True:
+        # 採番はチャンクのトランザクションを始める前に行う(最後のチャンクでは余ったIDを使わない)
+        first_id = router.reserve_ids("todo_items", chunk_size) if sharding.enabled() else None
+        ids = db.execute(SELECT_COPY_CHUNK, {**params, "limit": chunk_size}).scalars().all()
+        if not ids:
+            db.rollback()
+            break
+        if sharding.enabled():
+            db.execute(COPY_ITEMS_WITH_IDS, {**params, "last_id": ids[-1], "first_id": first_id})
+        else:
+            db.execute(COPY_ITEMS, {**params, "last_id": ids[-1]})
+        db.execute(item_crud.ADD_ITEM_COUNT, {"todo_list_id": new_list.id, "count": len(ids)})
+        audit.record(db, new_list.id, "item", None, "copied", None, {"from_list_id": todo_list_id, "count": len(ids)})
+        db.commit()
+        # コピー中に読まれた複製先のページ(キャッシュ)を無効にするため, チャンクごとに通知する
+        events.publish(new_list.id, "items.copied", from_list_id=todo_list_id, count=len(ids))
+        params["after_id"] = ids[-1]
+        if len(ids) < chunk_size:
+            break
+
+    reminders.scheduler.schedule_list(params["new_list_id"])
+    return get_todo_list(db, params["new_list_id"])
+
+def put_todo_list(db: Session, todo_list_id: int, update_data: UpdateTodoList, expected_version: int | None = None):
+    """Todoリストを更新するAPI
+
+    事前に読み込まず, 1回のUPDATE文で更新してバージョンを1増やす.
+    expected_versionを指定した場合はそのバージョンの時だけ更新し, 一致しなければVersionMismatchErrorを送出する.
+    """
 
     # update_dataに新しい値があれば更新
+    values = {"version": lists_table.c.version + 1}
     if update_data.title is not None:
-        todo_list.title = update_data.title
+        values["title"] = update_data.title
     if update_data.description is not None:
-        todo_list.description = update_data.description
+        values["description"] = update_data.description
 
-    db.commit()
-    db.refresh(todo_list)
+    conditions = [lists_table.c.id == todo_list_id]
+    if expected_version is not None:
+        conditions.append(lists_table.c.version == expected_version)
+    stmt = update(lists_table).where(*conditions).values(values)
 
+    todo_list = execute_update(db, stmt, SELECT_LIST, {"todo_list_id": todo_list_id})
+    if todo_list is None:
+        db.rollback()
+        # 更新できなかった場合のみ, 存在しないのかバージョン違いなのかを確認する
+        if expected_version is not None and get_todo_list(db, todo_list_id) is not None:
+            raise VersionMismatchError
+        return None
+
+    audit.record(db, todo_list_id, "list", None, "updated", todo_list.version, update_data.model_dump(mode="json", exclude_none=True))
+    db.commit()
+    events.publish(todo_list_id, "list.updated", version=todo_list.version)
     return todo_list
 
 def delete_todo_list(db: Session, todo_list_id: int):
@@ -55,16 +179,49 @@ def delete_todo_list(db: Session, todo_list_id: int):
         return
 
     db.delete(todo_list)
+    audit.record(db, todo_list_id, "list", None, "deleted", todo_list.version)
     db.commit()
+    events.publish(todo_list_id, "list.deleted")
 
     return {}
 
-def get_todo_lists(db: Session, page: int, per_page: int):
-    """Todoリスト一覧を取得するAPI"""
+def get_todo_lists(db: Session, page: int, per_page: int, columns: tuple[str, ...] | None = None):
+    """Todoリスト一覧を取得するAPI
+
+    columnsを指定した場合はその列だけを読み込む.
+    """
 
-    page = max(page, 1) # 1未満の場合は1に
+    page, per_page = normalize_page(page, per_page)    # 範囲外の場合は1または上限に
     offset = (page - 1) * per_page
 
-    stmt = select(ListModel).offset(offset).limit(per_page)
-    result = db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+    if sharding.enabled():
+        # 各シャードから先頭のoffset+per_page件を取得し, ID順にマージしてからページを切り出す
+        # マージに使うidは常に読み込む
+        stmt = SELECT_LISTS_HEAD if columns is None else with_columns(SELECT_LISTS_HEAD, ("id", *[x for x in columns if x != "id"]))
+        heads = sharding.get_router().scatter(
+            lambda shard_db: shard_db.execute(stmt, {"limit": offset + per_page}).all()
+        )
+        return list(itertools.islice(heapq.merge(*heads, key=lambda row: row.id), offset, offset + per_page))
+
+    stmt = SELECT_LISTS_PAGE if columns is None else with_columns(SELECT_LISTS_PAGE, columns)
+    result = db.execute(stmt, {"offset": offset, "limit": per_page})
+    return result.all()
+
+def count_todo_lists(db: Session, exact: bool = False) -> int:
+    """Todoリストの総件数を返す.
+
+    MySQLでは通常はテーブル全体を数えずにテーブル統計の概算を返し, exact=Trueの場合のみCOUNT(*)で数える.
+    SQLiteには行数の統計が無いので常にCOUNT(*)で数える.
+    """
+
+    if not sharding.enabled():
+        return _count_todo_lists(db, exact)
+    return sum(sharding.get_router().scatter(lambda shard_db: _count_todo_lists(shard_db, exact)))
+
+def _count_todo_lists(db: Session, exact: bool) -> int:
+    if exact or not _uses_table_statistics(db):
+        return db.execute(COUNT_LISTS).scalar_one()
+    return db.execute(ESTIMATE_LISTS_MYSQL).scalar_one_or_none() or 0
+
+def _uses_table_statistics(db: Session) -> bool:
+    return db.get_bind().dialect.name == "mysql"
@@ -1,31 +1,112 @@
-"""SQLAlchemy用."""
+"""SQLAlchemy用.
+
+起動を速くするため, エンジン(とDBドライバ)は最初にDBへアクセスした時点で作成する.
+``from app.database import engine`` でも従来どおり取得できる.
+"""
+
+import threading
 
-from debug_toolbar.panels.sqlalchemy import SQLAlchemyPanel as BasePanel
-from fastapi import Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, declarative_base, scoped_session, sessionmaker
 
-from app import const
+from app import const, deadline, slow_query, sqlite
 
-DATABASE_URL = f"mysql+pymysql://{const.DB_USER}:{const.DB_PASS}@{const.DB_HOST}/{const.DB_NAME}?charset=utf8"
+if const.DB_BACKEND == "sqlite":
+    DATABASE_URL = f"sqlite:///{const.SQLITE_PATH}"
+else:
+    DATABASE_URL = f"mysql+pymysql://{const.DB_USER}:{const.DB_PASS}@{const.DB_HOST}/{const.DB_NAME}?charset=utf8"
+
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+# エンジンごとの, 読み込み専用のトランザクションを開始するエンジン(実行オプションを付けたもの)
+_read_only_engines: dict[Engine, Engine] = {}
+
+
+def _create_engine(url: str = DATABASE_URL) -> Engine:
+    if url.startswith("sqlite"):
+        new_engine = create_engine(
+            url,
+            echo=False,
+            pool_size=const.DB_POOL_SIZE,
+            max_overflow=const.DB_MAX_OVERFLOW,
+            connect_args={"check_same_thread": False},
+        )
+        sqlite.configure_engine(new_engine, const.SQLITE_BUSY_TIMEOUT_MS)
+    else:
+        new_engine = create_engine(
+            url,
+            echo=False,
+            pool_size=const.DB_POOL_SIZE,
+            max_overflow=const.DB_MAX_OVERFLOW,
+            connect_args={"read_timeout": const.DB_READ_TIMEOUT},
+        )
+    deadline.register_engine_events(new_engine)
+    if slow_query.enabled():
+        slow_query.register_engine_events(new_engine)
+    return new_engine
+
+
+def get_engine() -> Engine:
+    """エンジンを返す. 未作成なら作成する."""
+    global _engine  # noqa: PLW0603
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine()
+    return _engine
+
+
+def engine_created() -> bool:
+    return _engine is not None
+
+
+def read_only_engine(bind: Engine) -> Engine:
+    """bindと接続プールを共有し, トランザクションを読み込み専用で開始するエンジンを返す."""
+    if bind not in _read_only_engines:
+        _read_only_engines[bind] = bind.execution_options(**{sqlite.READ_ONLY: True})
+    return _read_only_engines[bind]
+
+
+class LazyEngineSession(Session):
+    """接続先が未指定の場合, 最初の問い合わせ時にエンジンを作成して使うセッション.
+
+    ``info`` に ``sqlite.READ_ONLY`` が設定されていれば, 読み込み専用のトランザクションで接続する.
+    """
+
+    def get_bind(self, *args, **kwargs):  # noqa: ANN002, ANN003, ANN201
+        if self.bind is None:
+            self.bind = get_engine()
+        bind = super().get_bind(*args, **kwargs)
+        if self.info.get(sqlite.READ_ONLY) and isinstance(bind, Engine):
+            return read_only_engine(bind)
+        return bind
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-)
 
 SessionLocal = scoped_session(
     sessionmaker(
+        class_=LazyEngineSession,
         autocommit=False,
         autoflush=False,
-        bind=engine,
     ),
 )
 
 Base = declarative_base()
 
 
-class SQLAlchemyPanel(BasePanel):
-    """FastAPI Debug BarにSQLAlchemyクエリ実行結果表示パネルを追加するための記述."""
-    async def add_engines(self, _: Request) -> None:  # noqa: D102
-        self.engines.add(engine)
+def __getattr__(name: str):  # noqa: ANN202
+    if name == "engine":
+        return get_engine()
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
+
+
+if const.DEBUG:
+    # デバッグツールバーは開発時のみ読み込む
+    from debug_toolbar.panels.sqlalchemy import SQLAlchemyPanel as BasePanel
+    from fastapi import Request
+
+    class SQLAlchemyPanel(BasePanel):
+        """FastAPI Debug BarにSQLAlchemyクエリ実行結果表示パネルを追加するための記述."""
+        async def add_engines(self, _: Request) -> None:  # noqa: D102
+            self.engines.add(get_engine())
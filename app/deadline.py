@@ -0,0 +1,156 @@
+"""リクエストの締め切りをDBの文実行まで伝搬させるモジュール.
+
+ミドルウェアがリクエストごとに締め切りを設定し, SQLAlchemyのエンジンイベントが
+各SQL文の実行前に残り時間を確認する. MySQLではSELECT文に
+``MAX_EXECUTION_TIME`` ヒントを付けてサーバ側でも打ち切らせる.
+締め切りのあるリクエストでの接続の ``read_timeout`` 切れ(PyMySQLでは接続断のエラーになる)も締め切り超過として扱う.
+"""
+
+import math
+import time
+from contextvars import ContextVar
+
+import anyio
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# MySQLの「最大実行時間を超えたため文が中断された」エラー
+ER_QUERY_TIMEOUT = 3024
+# 「問い合わせ中にMySQLサーバとの接続が切れた」エラー. read_timeoutで応答を待ちきれなかった場合もこれになる
+CR_SERVER_LOST = 2013
+
+
+class DeadlineExceededError(Exception):
+    """締め切り超過またはクライアント切断で処理を打ち切ったことを示す例外."""
+
+
+class Deadline:
+    """1リクエスト分の締め切り."""
+
+    def __init__(self, seconds: float) -> None:
+        self.expires_at = time.monotonic() + seconds
+        self.cancelled = False
+
+    def tighten(self, seconds: float) -> None:
+        """締め切りを現在時刻から ``seconds`` 秒後まで短縮する(延長はしない)."""
+        self.expires_at = min(self.expires_at, time.monotonic() + seconds)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def check(self) -> None:
+        """打ち切るべき状態なら例外を送出する."""
+        if self.cancelled:
+            msg = "client disconnected"
+            raise DeadlineExceededError(msg)
+        if self.remaining() <= 0:
+            msg = "deadline exceeded"
+            raise DeadlineExceededError(msg)
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Deadline | None:
+    return _current_deadline.get()
+
+
+def route_deadline(seconds: float):
+    """ルート単位で締め切りを短縮する依存関係を返す.
+
+    ``dependencies=[Depends(route_deadline(3))]`` のように使う.
+    """
+    async def _tighten() -> None:
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.tighten(seconds)
+
+    return _tighten
+
+
+class DeadlineMiddleware:
+    """リクエストに締め切りを設定し, クライアント切断を検知するASGIミドルウェア.
+
+    受信メッセージは監視タスクが一手に読み取り, アプリへはキュー経由で渡す.
+    ``http.disconnect`` を受け取った時点で締め切りを取り消し状態にする.
+    """
+
+    def __init__(self, app: ASGIApp, timeout: float) -> None:
+        self.app = app
+        self.timeout = timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(self.timeout)
+        token = _current_deadline.set(deadline)
+        send_stream, receive_stream = anyio.create_memory_object_stream[Message](max_buffer_size=math.inf)
+
+        async def watch_disconnect() -> None:
+            while True:
+                message = await receive()
+                await send_stream.send(message)
+                if message["type"] == "http.disconnect":
+                    deadline.cancel()
+                    return
+
+        async def queued_receive() -> Message:
+            if deadline.cancelled and receive_stream.statistics().current_buffer_used == 0:
+                return {"type": "http.disconnect"}
+            return await receive_stream.receive()
+
+        error = None
+        try:
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(watch_disconnect)
+                try:
+                    await self.app(scope, queued_receive, send)
+                except Exception as exc:  # noqa: BLE001 タスクグループのExceptionGroupに包ませないため退避する
+                    error = exc
+                tg.cancel_scope.cancel()
+        finally:
+            _current_deadline.reset(token)
+            send_stream.close()
+            receive_stream.close()
+        if error is not None:
+            raise error
+
+
+async def deadline_exceeded_handler(_: Request, exc: DeadlineExceededError) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": str(exc)})
+
+
+def register_engine_events(engine: Engine) -> None:
+    """締め切りを確認するイベントをエンジンに登録する."""
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001, ANN202, ARG001, PLR0913, PLR0917
+        deadline = current_deadline()
+        if deadline is None:
+            return statement, parameters
+        deadline.check()
+        if conn.dialect.name == "mysql" and statement.lstrip()[:6].upper() == "SELECT":
+            # ヒントはミリ秒単位. SELECT文にのみ効く
+            millis = max(int(deadline.remaining() * 1000), 1)
+            head, _, tail = statement.lstrip().partition(" ")
+            statement = f"{head} /*+ MAX_EXECUTION_TIME({millis}) */ {tail}"
+        return statement, parameters
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context) -> None:  # noqa: ANN001
+        error = context.original_exception
+        if not isinstance(context.sqlalchemy_exception, OperationalError) or not error.args:
+            return
+        if error.args[0] == ER_QUERY_TIMEOUT or (error.args[0] == CR_SERVER_LOST and current_deadline() is not None):
+            # 接続断の場合もSQLAlchemyは接続を無効にしてから, この例外を送出する
+            msg = "deadline exceeded"
+            raise DeadlineExceededError(msg) from error
@@ -1,9 +1,64 @@
+import hmac
+from collections.abc import Callable
+
+from fastapi import Header, HTTPException, Query, status
+from pydantic import BaseModel
+from starlette.requests import HTTPConnection
+
+from . import const, sharding, sqlite
 from .database import SessionLocal
+from .schemas import fieldset
 
 
-def get_db():
-    db = SessionLocal()
+def get_db(connection: HTTPConnection):
+    # scoped_sessionはスレッド単位でセッションを共有するため,
+    # 同じスレッドプールのスレッドで並行するリクエスト同士が混ざらないよう毎回新しいセッションを作る
+    todo_list_id = connection.path_params.get("todo_list_id", "")
+    if sharding.enabled() and todo_list_id.isdigit():
+        # シャーディング時はパスのtodo_list_idのシャードに接続する
+        db = sharding.get_router().session_for(int(todo_list_id))
+    else:
+        db = SessionLocal.session_factory()
+    if connection.scope["type"] == "websocket" or connection.scope["method"] in {"GET", "HEAD"}:
+        # 読み込みだけのリクエストはSQLiteの書き込みキューを待たない
+        db.info[sqlite.READ_ONLY] = True
     try:
         yield db
     finally:
         db.close()
+
+
+def if_match_version(if_match: str | None = Header(default=None)) -> int | None:
+    """If-Matchヘッダのバージョン番号を返す. 未指定または ``*`` の場合はNone."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip().removeprefix("W/").strip('"')
+    if not tag.isdigit():
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="invalid If-Match")
+    return int(tag)
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    """管理用APIの認可. トークン未設定の場合はAPI自体が無いものとして404を返す."""
+    if not const.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, const.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="forbidden")
+
+
+def sparse_fields(model: type[BaseModel]) -> Callable[..., tuple[str, ...] | None]:
+    """``fields`` クエリパラメータ(カンマ区切り)を検証し, 返す項目名を返す依存関係. 未指定ならNone."""
+
+    def dependency(fields: str | None = Query(default=None, description="Comma separated fields to return")) -> tuple[str, ...] | None:
+        if fields is None:
+            return None
+        try:
+            return fieldset.parse(model, fields)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from None
+
+    return dependency
@@ -0,0 +1,173 @@
+"""TODOリスト単位の変更通知(SSE / WebSocket)用のプロセス内ブローカー.
+
+CRUD処理はコミット後に :func:`publish` を呼ぶ. イベントはトランスポートを経由して
+各ワーカーのブローカーに届き, そのリストを購読している接続へ配られる.
+
+購読者ごとのバッファは ``EVENT_QUEUE_SIZE`` 件までで, 溢れた場合はバッファを捨てて
+``resync`` を1回だけ通知する(クライアントは一覧を取得し直す). 待機中の購読者は
+dequeとEventを1つずつ持つだけなので, アイドル接続が多数あってもメモリは一定に収まる.
+
+:meth:`Broker.add_listener` で登録した関数には, 購読者の有無に関わらず全てのイベントを
+トランスポートのスレッドで渡す(一覧ページのキャッシュの無効化などに使う).
+"""
+
+import asyncio
+import contextvars
+import importlib
+import json
+import threading
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from app import const
+
+# バッファが溢れたことを示す特別なペイロード
+RESYNC = object()
+
+
+class Subscription:
+    """1接続分の購読."""
+
+    __slots__ = ("_buffer", "_ready", "channel", "loop", "maxsize", "overflowed")
+
+    def __init__(self, channel: int, loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self.channel = channel
+        self.loop = loop
+        self.maxsize = maxsize
+        self.overflowed = False
+        self._buffer: deque[str] = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, payload: str) -> None:
+        """イベントを積む. 購読者のイベントループ上で呼ぶこと."""
+        if self.overflowed:
+            return
+        if len(self._buffer) >= self.maxsize:
+            self._buffer.clear()
+            self.overflowed = True
+        else:
+            self._buffer.append(payload)
+        self._ready.set()
+
+    async def get(self, timeout: float) -> str | object | None:
+        """次のイベントを返す. timeout秒以内に無ければNone, 溢れていればRESYNC."""
+        if not self._buffer and not self.overflowed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except TimeoutError:
+                return None
+        if self.overflowed:
+            self.overflowed = False
+            return RESYNC
+        return self._buffer.popleft()
+
+
+class LocalTransport:
+    """同じプロセス内のブローカーにだけ届けるトランスポート(既定).
+
+    複数ワーカーへ配るには ``publish`` で外部のメッセージ基盤へ送り,
+    受信したイベントを ``deliver`` に渡すクラスを ``EVENT_TRANSPORT`` に指定する.
+    """
+
+    def __init__(self, deliver) -> None:  # noqa: ANN001
+        self.deliver = deliver
+
+    def publish(self, channel: int, payload: str) -> None:
+        self.deliver(channel, payload)
+
+
+class Broker:
+    """リストIDをチャネルとして購読者へイベントを配るブローカー."""
+
+    def __init__(self, queue_size: int, transport_class=LocalTransport) -> None:  # noqa: ANN001
+        self.queue_size = queue_size
+        self._channels: dict[int, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._listeners: list = []
+        self.transport = transport_class(self.deliver)
+
+    def add_listener(self, listener) -> None:  # noqa: ANN001
+        """全てのイベントを受け取る関数 listener(channel, payload) を登録する. 処理は軽くすること."""
+        self._listeners.append(listener)
+
+    def subscribe(self, channel: int) -> Subscription:
+        subscription = Subscription(channel, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def subscriber_count(self, channel: int | None = None) -> int:
+        if channel is not None:
+            return len(self._channels.get(channel, ()))
+        return sum(len(x) for x in self._channels.values())
+
+    def publish(self, channel: int, event: dict) -> None:
+        """イベントを発行する. どのスレッドから呼んでもよい."""
+        self.transport.publish(channel, json.dumps(event, separators=(",", ":")))
+
+    def deliver(self, channel: int, payload: str) -> None:
+        """トランスポートから受け取ったイベントを, 購読者のイベントループ上で配る."""
+        for listener in self._listeners:
+            listener(channel, payload)
+        with self._lock:
+            subscribers = self._channels.get(channel)
+            if not subscribers:
+                return
+            loops = {subscription.loop for subscription in subscribers}
+        for loop in loops:
+            loop.call_soon_threadsafe(self._fanout, channel, payload, loop)
+
+    def _fanout(self, channel: int, payload: str, loop: asyncio.AbstractEventLoop) -> None:
+        with self._lock:
+            subscribers = [x for x in self._channels.get(channel, ()) if x.loop is loop]
+        for subscription in subscribers:
+            subscription.push(payload)
+
+
+def _transport_class():  # noqa: ANN202
+    if not const.EVENT_TRANSPORT:
+        return LocalTransport
+    module_name, _, class_name = const.EVENT_TRANSPORT.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+broker = Broker(const.EVENT_QUEUE_SIZE, _transport_class())
+
+
+_deferred: contextvars.ContextVar[list | None] = contextvars.ContextVar("deferred_events", default=None)
+
+
+def publish(todo_list_id: int, event_type: str, **fields) -> None:  # noqa: ANN003
+    """リストの変更イベントを発行する."""
+    event = {"type": event_type, "todo_list_id": todo_list_id, **fields}
+    pending = _deferred.get()
+    if pending is not None:
+        pending.append((todo_list_id, event))
+        return
+    broker.publish(todo_list_id, event)
+
+
+@contextmanager
+def deferred() -> Iterator[list]:
+    """ブロック内で発行したイベントを溜め, ブロックを正常に抜けた時にまとめて発行する.
+
+    外側のトランザクションをロールバックした場合は, 返したリストを空にすれば発行しない.
+    """
+    pending: list = []
+    token = _deferred.set(pending)
+    try:
+        yield pending
+    finally:
+        _deferred.reset(token)
+    for todo_list_id, event in pending:
+        broker.publish(todo_list_id, event)
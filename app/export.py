@@ -0,0 +1,258 @@
+"""分析用のエクスポート.
+
+``todo_lists`` と ``todo_items`` を主キー順に ``EXPORT_CHUNK_SIZE`` 行ずつ読み, Parquet(既定)またはNDJSONのファイルに書く.
+Parquetでは1チャンクをArrowのRecordBatchにしてそのまま1つの行グループとして書くので,
+メモリに載るのは常に1チャンク分だけで, テーブル全体の大きさには依存しない.
+pyarrowは任意依存で, インストールされていなければNDJSONだけを使える. 読み込みに時間が掛かるので,
+起動時間に含めないようParquetを書く時に初めて読み込む.
+
+``since`` を指定すると, 更新日時が ``since`` 以上の行だけを書き出す(差分エクスポート).
+結果の ``until`` はエクスポート開始時のDBの時刻から ``EXPORT_LAG_SECONDS`` 秒戻した時刻で, 更新日時がこれより前の行だけを書き出す.
+次回はこれを ``since`` に渡せば取りこぼしも重複も無い(境界の直前に始まってまだコミットされていない書き込みは次回に含まれる).
+削除された行は差分に現れないので, 削除の反映には変更履歴(``GET /lists/{id}/history``)を使う.
+更新日時を変えずに更新される列は書き出さない(差分に現れず, 差分を重ねると値がずれるため).
+リストの ``item_count`` (項目の追加・削除で増減する)と, 項目の ``position`` (移動時の振り直し)と
+``reminded_at`` (リマインドの送信)がこれに当たる. 項目数は書き出した ``todo_items`` から数え, 並び順はAPIで取得する.
+
+``POST /jobs`` に ``{"kind": "export", "params": {"format": "parquet", "since": "..."}}`` を登録するとバックグラウンドで実行する(管理用APIと同じ ``X-Admin-Token`` が必要).
+cronなどから直接実行する場合は ``python -m app.export`` を使う.
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+from collections.abc import Callable, Sequence
+from pathlib import Path
+
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Integer, Table, bindparam, func, select
+from sqlalchemy.orm import Session
+
+from app import const, jobs, sharding, sqlite
+from app.database import SessionLocal
+from app.models.item_model import ItemModel
+from app.models.list_model import ListModel
+
+# pyarrowを読み込まずに, インストールされているかだけを確認する
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+def _pyarrow():  # noqa: ANN202
+    import pyarrow  # noqa: PLC0415
+    import pyarrow.parquet  # noqa: PLC0415
+
+    return pyarrow
+
+TABLES: dict[str, Table] = {
+    ListModel.__tablename__: ListModel.__table__,
+    ItemModel.__tablename__: ItemModel.__table__,
+}
+# 書き出さない列. 更新日時を変えずに更新されるので, 差分エクスポートでは追えない
+EXCLUDED_COLUMNS = {
+    ListModel.__tablename__: {"item_count"},
+    ItemModel.__tablename__: {"position", "reminded_at"},
+}
+# テーブルごとに書き出す列
+COLUMNS: dict[str, list[Column]] = {
+    name: [column for column in table.columns if column.name not in EXCLUDED_COLUMNS.get(name, ())]
+    for name, table in TABLES.items()
+}
+
+SELECT_NOW = select(func.now())
+
+
+def _select_chunk(table: Table, columns: list[Column], *, incremental: bool):
+    """idがafter_idより大きい行を主キー順にlimit行. 差分の場合は更新日時が[since, until)の行に絞る."""
+    condition = table.c.id > bindparam("after_id")
+    if incremental:
+        condition &= table.c.updated_at >= bindparam("since")
+    condition &= table.c.updated_at < bindparam("until")
+    return select(*columns).where(condition).order_by(table.c.id).limit(bindparam("limit"))
+
+
+SELECT_CHUNK = {
+    (name, incremental): _select_chunk(table, COLUMNS[name], incremental=incremental)
+    for name, table in TABLES.items()
+    for incremental in (False, True)
+}
+
+
+def _arrow_type(column_type):  # noqa: ANN001, ANN202
+    pyarrow = _pyarrow()
+    if isinstance(column_type, (Integer, BigInteger)):
+        return pyarrow.int64()
+    if isinstance(column_type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column_type, DateTime):
+        return pyarrow.timestamp("us")
+    return pyarrow.string()
+
+
+def arrow_schema(columns: Sequence[Column]):  # noqa: ANN201
+    pyarrow = _pyarrow()
+    return pyarrow.schema([pyarrow.field(column.name, _arrow_type(column.type), nullable=column.nullable) for column in columns])
+
+
+class _NdjsonWriter:
+    extension = "ndjson"
+
+    def __init__(self, path: Path, columns: Sequence[Column]) -> None:
+        self._file = path.open("wb")
+        self._names = [column.name for column in columns]
+
+    def write(self, rows: Sequence[tuple]) -> None:
+        lines = [json.dumps(dict(zip(self._names, row, strict=True)), ensure_ascii=False, default=str) for row in rows]
+        self._file.write(("\n".join(lines) + "\n").encode())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetWriter:
+    extension = "parquet"
+
+    def __init__(self, path: Path, columns: Sequence[Column]) -> None:
+        self._pyarrow = _pyarrow()
+        self._schema = arrow_schema(columns)
+        self._writer = self._pyarrow.parquet.ParquetWriter(path, self._schema, compression=const.EXPORT_PARQUET_COMPRESSION)
+
+    def write(self, rows: Sequence[tuple]) -> None:
+        # 行のタプルを列ごとに組み替え, 1チャンクを1つのRecordBatch(行グループ)として書く
+        columns = list(zip(*rows, strict=True))
+        arrays = [self._pyarrow.array(values, type=field.type) for values, field in zip(columns, self._schema, strict=True)]
+        self._writer.write_batch(self._pyarrow.record_batch(arrays, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+WRITERS: dict[str, type] = {}
+if PYARROW_AVAILABLE:
+    WRITERS["parquet"] = _ParquetWriter
+WRITERS["ndjson"] = _NdjsonWriter
+# 指定が無ければ, 使えればParquet
+DEFAULT_FORMAT = const.EXPORT_FORMAT or next(iter(WRITERS))
+
+
+def available_formats() -> list[str]:
+    return list(WRITERS)
+
+
+def db_now(db: Session) -> datetime.datetime:
+    """DBの現在時刻. 更新日時はDBの時刻で記録されるので, 差分の境界もDBの時刻で決める."""
+    now = db.execute(SELECT_NOW).scalar_one()
+    db.rollback()
+    return now
+
+
+def export_chunks(
+    db: Session, name: str, until: datetime.datetime, since: datetime.datetime | None = None,
+    chunk_size: int = const.EXPORT_CHUNK_SIZE,
+):
+    """テーブルの行をchunk_size行ずつのリストで返すジェネレータ. チャンクごとに別の短い読み込みで取得する."""
+    statement = SELECT_CHUNK[name, since is not None]
+    params = {"after_id": 0, "since": since, "until": until, "limit": chunk_size}
+    while True:
+        rows = [tuple(row) for row in db.execute(statement, params)]
+        db.rollback()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        params["after_id"] = rows[-1][0]
+
+
+def _writer_class(fmt: str) -> type:
+    if fmt not in WRITERS:
+        msg = f"unsupported export format: {fmt} (available: {', '.join(WRITERS)})"
+        raise ValueError(msg)
+    return WRITERS[fmt]
+
+
+def export_table(  # noqa: PLR0913
+    name: str, path: Path, until: datetime.datetime, since: datetime.datetime | None = None,
+    fmt: str = DEFAULT_FORMAT, chunk_size: int = const.EXPORT_CHUNK_SIZE,
+    progress: Callable[[int], None] | None = None,
+) -> dict:
+    """テーブルを全シャード分1つのファイルに書き出し, 行数とバイト数を返す.
+
+    途中で失敗してもファイルが中途半端に残らないよう, 一時ファイルに書いてから置き換える.
+    """
+    partial = path.with_name(path.name + ".partial")
+    writer = _writer_class(fmt)(partial, COLUMNS[name])
+    rows = 0
+    try:
+        for engine in sharding.engines():
+            with SessionLocal.session_factory(bind=engine, info={sqlite.READ_ONLY: True}) as db:
+                for chunk in export_chunks(db, name, until, since, chunk_size):
+                    writer.write(chunk)
+                    rows += len(chunk)
+                    if progress is not None:
+                        progress(rows)
+    except BaseException:
+        writer.close()
+        partial.unlink(missing_ok=True)
+        raise
+    writer.close()
+    partial.replace(path)
+    return {"table": name, "path": str(path), "rows": rows, "bytes": path.stat().st_size}
+
+
+def export(  # noqa: PLR0913
+    directory: str = const.EXPORT_DIR, fmt: str = DEFAULT_FORMAT, since: datetime.datetime | None = None,
+    tables: Sequence[str] = tuple(TABLES), chunk_size: int = const.EXPORT_CHUNK_SIZE,
+    progress: Callable[[int], None] | None = None,
+) -> dict:
+    """テーブルごとに ``{directory}/{table}-{until}.{拡張子}`` を書き出す."""
+    unknown = [name for name in tables if name not in TABLES]
+    if unknown:
+        msg = f"unknown tables: {', '.join(unknown)}"
+        raise ValueError(msg)
+    extension = _writer_class(fmt).extension
+    with SessionLocal.session_factory(bind=sharding.engines()[0], info={sqlite.READ_ONLY: True}) as db:
+        until = (db_now(db) - datetime.timedelta(seconds=const.EXPORT_LAG_SECONDS)).replace(microsecond=0)
+    out_dir = Path(directory)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    done = 0
+    files = []
+    for name in tables:
+        report = None if progress is None else (lambda rows, base=done: progress(base + rows))
+        files.append(export_table(name, out_dir / f"{name}-{until:%Y%m%dT%H%M%S}.{extension}", until, since, fmt, chunk_size, report))
+        done += files[-1]["rows"]
+    return {
+        "format": fmt,
+        "since": None if since is None else since.isoformat(),
+        "until": until.isoformat(),
+        "files": files,
+    }
+
+
+@jobs.job("export", admin=True)
+def export_job(
+    ctx: jobs.JobContext, format: str = DEFAULT_FORMAT, since: str | None = None,  # noqa: A002
+    tables: list[str] | None = None, chunk_size: int = const.EXPORT_CHUNK_SIZE,
+) -> dict:
+    """エクスポートをジョブとして実行する. sinceはISO 8601の日時(前回の結果のuntil).
+
+    書き出し先はEXPORT_DIRに固定し, チャンクはEXPORT_CHUNK_SIZE行以下にする(メモリに載るのは1チャンク分だけ).
+    """
+    ctx.progress(0)
+    return export(
+        const.EXPORT_DIR, format, None if since is None else datetime.datetime.fromisoformat(since),
+        tables or tuple(TABLES), max(1, min(chunk_size, const.EXPORT_CHUNK_SIZE)), ctx.progress,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="リストと項目を分析用のファイルに書き出す")
+    parser.add_argument("--format", choices=available_formats(), default=DEFAULT_FORMAT)
+    parser.add_argument("--since", type=datetime.datetime.fromisoformat, help="この日時以降に更新された行だけを書き出す")
+    parser.add_argument("--dir", default=const.EXPORT_DIR)
+    parser.add_argument("--chunk-size", type=int, default=const.EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    print(json.dumps(export(args.dir, args.format, args.since, chunk_size=args.chunk_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
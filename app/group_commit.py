@@ -0,0 +1,136 @@
+"""グループコミット: 並行する小さな書き込みを1つのトランザクションにまとめてコミットする.
+
+``GROUP_COMMIT=true`` の場合, CRUD処理は書き込み操作をキューに積んで結果を待つ.
+専用スレッドが最初の操作から ``GROUP_COMMIT_WINDOW_MS`` の間に届いた操作をまとめ,
+操作ごとにSAVEPOINTを張って実行したうえで1回だけコミットする.
+1つの操作が失敗してもそのSAVEPOINTだけを戻すので, 他の呼び出し元には影響しない.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import const
+from app.database import SessionLocal
+
+
+class GroupCommitter:
+    """書き込み操作をまとめて実行するキュー."""
+
+    def __init__(self, window_ms: float, max_batch: int, bind: Engine | None = None) -> None:
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.bind = bind
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+
+    def submit(self, operation: Callable[..., object], *args: object) -> object:
+        """``operation(db, *args)`` をまとめて実行し, コミット後にその結果を返す.
+
+        operation内で送出された例外はそのまま呼び出し元で送出される.
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((operation, args, future))
+        return future.result()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                    self._thread.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                with SessionLocal.session_factory(bind=self.bind, expire_on_commit=False) as db:
+                    self._flush(db, batch)
+            except Exception as exc:  # noqa: BLE001 スレッドを止めず, 待っている呼び出し元へ返す
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _flush(self, db: Session, batch: list) -> None:
+        results = []
+        for operation, args, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with db.begin_nested():
+                    results.append((future, operation(db, *args), None))
+            except Exception as exc:  # noqa: BLE001 呼び出し元へ渡す
+                results.append((future, None, exc))
+
+        try:
+            db.commit()
+        except Exception as exc:  # noqa: BLE001 全員に同じ失敗を返す
+            db.rollback()
+            for future, _, _ in results:
+                future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.operations += len(results)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+committer = GroupCommitter(const.GROUP_COMMIT_WINDOW_MS, const.GROUP_COMMIT_MAX_BATCH)
+# シャーディング時はシャードのエンジンごとにまとめる
+_committers: dict[Engine, GroupCommitter] = {}
+_committers_lock = threading.Lock()
+
+
+_suspended = contextvars.ContextVar("group_commit_suspended", default=False)
+
+
+def enabled() -> bool:
+    return const.GROUP_COMMIT and not _suspended.get()
+
+
+@contextmanager
+def suspended() -> Iterator[None]:
+    """ブロック内の書き込みはまとめず, 呼び出し元のセッションで実行する(バッチAPIなど)."""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def submit(db: Session, operation: Callable[..., object], *args: object) -> object:
+    """dbと同じ接続先で ``operation(db, *args)`` をまとめて実行する."""
+    if db.bind is None:
+        return committer.submit(operation, *args)
+    with _committers_lock:
+        if db.bind not in _committers:
+            _committers[db.bind] = GroupCommitter(const.GROUP_COMMIT_WINDOW_MS, const.GROUP_COMMIT_MAX_BATCH, db.bind)
+    return _committers[db.bind].submit(operation, *args)
@@ -0,0 +1,355 @@
+"""バックグラウンドジョブ.
+
+リクエスト内に収まらない処理(巨大なリストの削除など)を ``jobs`` テーブルに登録し,
+各プロセスの :class:`JobRunner` が ``JOB_WORKERS`` 本までのスレッドで実行する.
+クライアントは ``GET /jobs/{id}`` で状態と進捗を確認し, ``POST /jobs/{id}/cancel`` で取り消せる.
+
+ジョブはDBの条件付きUPDATEで1つのプロセスだけが取得し, 実行中は定期的に生存確認日時を更新する.
+プロセスが落ちて ``JOB_STALE_SECONDS`` 秒以上更新が途絶えたジョブは実行待ちに戻して再実行する
+(少なくとも1回の実行. ジョブは途中から再実行されても問題ないように書くこと).
+
+ジョブの種類は :func:`job` で登録する. ジョブ関数は :class:`JobContext` とパラメータを受け取り,
+``ctx.progress()`` で進捗を報告する(取り消し・停止の要求はここで例外として伝わる).
+"""
+
+import datetime
+import inspect
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.orm import Session
+
+from app import audit, const, database, events, sharding
+from app.database import SessionLocal
+from app.models.archive_model import ArchivedItemModel
+from app.models.item_model import ItemModel
+from app.models.job_model import JobModel
+from app.models.list_model import ListModel
+
+logger = logging.getLogger(__name__)
+
+jobs_table = JobModel.__table__
+items_table = ItemModel.__table__
+archive_table = ArchivedItemModel.__table__
+lists_table = ListModel.__table__
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+SELECT_JOB = select(jobs_table).where(jobs_table.c.id == bindparam("job_id"))
+SELECT_QUEUED = select(jobs_table.c.id).where(jobs_table.c.status == QUEUED).order_by(jobs_table.c.id).limit(bindparam("limit"))
+CLAIM_JOB = (
+    update(jobs_table)
+    .where(jobs_table.c.id == bindparam("job_id"), jobs_table.c.status == QUEUED)
+    .values(status=RUNNING, owner=bindparam("worker"), heartbeat_at=bindparam("now"), attempts=jobs_table.c.attempts + 1)
+)
+HEARTBEAT = (
+    update(jobs_table)
+    .where(jobs_table.c.id.in_(bindparam("job_ids", expanding=True)), jobs_table.c.owner == bindparam("worker"))
+    .values(heartbeat_at=bindparam("now"))
+)
+_stale = (jobs_table.c.status == RUNNING) & (jobs_table.c.heartbeat_at < bindparam("cutoff"))
+REQUEUE_STALE = (
+    update(jobs_table)
+    .where(_stale, jobs_table.c.attempts < bindparam("max_attempts"))
+    .values(status=QUEUED, owner=None)
+)
+ABANDON_STALE = (
+    update(jobs_table)
+    .where(_stale, jobs_table.c.attempts >= bindparam("max_attempts"))
+    .values(status=FAILED, error="abandoned: the worker stopped responding", finished_at=bindparam("now"))
+)
+REPORT_PROGRESS = (
+    update(jobs_table)
+    .where(jobs_table.c.id == bindparam("job_id"), jobs_table.c.owner == bindparam("worker"))
+    .values(
+        progress=bindparam("done"),
+        total=func.coalesce(bindparam("new_total"), jobs_table.c.total),
+        heartbeat_at=bindparam("now"),
+    )
+)
+SELECT_CANCEL_REQUESTED = select(jobs_table.c.cancel_requested).where(jobs_table.c.id == bindparam("job_id"))
+FINISH_JOB = (
+    update(jobs_table)
+    .where(jobs_table.c.id == bindparam("job_id"), jobs_table.c.owner == bindparam("worker"))
+    .values(status=bindparam("new_status"), result=bindparam("job_result"), error=bindparam("job_error"), finished_at=bindparam("now"))
+)
+# 停止するプロセスが実行中のジョブを手放す(次に起動したプロセスがすぐに再開する)
+RELEASE_JOB = (
+    update(jobs_table)
+    .where(jobs_table.c.id == bindparam("job_id"), jobs_table.c.owner == bindparam("worker"))
+    .values(status=QUEUED, owner=None, attempts=jobs_table.c.attempts - 1)
+)
+CANCEL_QUEUED = (
+    update(jobs_table)
+    .where(jobs_table.c.id == bindparam("job_id"), jobs_table.c.status == QUEUED)
+    .values(status=CANCELLED, cancel_requested=True, finished_at=bindparam("now"))
+)
+REQUEST_CANCEL = (
+    update(jobs_table)
+    .where(jobs_table.c.id == bindparam("job_id"), jobs_table.c.status == RUNNING)
+    .values(cancel_requested=True)
+)
+
+JOB_KINDS: dict[str, Callable[..., object]] = {}
+# APIからの登録・参照に管理用のトークンが必要な種類
+ADMIN_JOB_KINDS: set[str] = set()
+
+
+def job(kind: str, admin: bool = False) -> Callable:
+    """ジョブ関数を登録するデコレータ. 関数は ``(ctx, **params)`` で呼ばれ, JSONにできる結果を返す.
+
+    adminをTrueにすると, ``/jobs`` APIでの登録・参照・取り消しに管理用のトークンが必要になる.
+    """
+
+    def register(function: Callable) -> Callable:
+        JOB_KINDS[kind] = function
+        if admin:
+            ADMIN_JOB_KINDS.add(kind)
+        return function
+
+    return register
+
+
+class JobCancelledError(Exception):
+    """ジョブの取り消しが要求された."""
+
+
+class JobInterruptedError(Exception):
+    """プロセスの停止のため, ジョブを中断して実行待ちに戻す."""
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+
+class JobContext:
+    """ジョブ関数に渡す実行中のジョブ."""
+
+    def __init__(self, runner: "JobRunner", job_id: int, params: dict) -> None:
+        self.runner = runner
+        self.job_id = job_id
+        self.params = params
+
+    def session_for(self, todo_list_id: int) -> Session:
+        """todo_list_idのデータがあるDBのセッション."""
+        if sharding.enabled():
+            return sharding.get_router().session_for(todo_list_id)
+        return SessionLocal.session_factory(bind=self.runner.engine)
+
+    def progress(self, done: int, total: int | None = None) -> None:
+        """進捗を記録する. 取り消しまたは停止が要求されていれば例外を送出する."""
+        params = {"job_id": self.job_id, "worker": self.runner.owner, "done": done, "new_total": total, "now": _now()}
+        with self.runner.engine.begin() as conn:
+            conn.execute(REPORT_PROGRESS, params)
+            cancel_requested = conn.execute(SELECT_CANCEL_REQUESTED, params).scalar_one()
+        if cancel_requested:
+            raise JobCancelledError
+        if self.runner.stopping:
+            raise JobInterruptedError
+
+
+class JobRunner:
+    """ジョブを取得して実行するスレッドプール.
+
+    ポーリング用のスレッドが実行待ちのジョブを空きスレッドの数だけ取得し,
+    実行中のジョブの生存確認日時を更新し, 途絶えたジョブを実行待ちに戻す.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        workers: int = const.JOB_WORKERS,
+        poll_interval: float = const.JOB_POLL_SECONDS,
+        stale_seconds: float = const.JOB_STALE_SECONDS,
+        max_attempts: int = const.JOB_MAX_ATTEMPTS,
+        bind: Engine | None = None,
+    ) -> None:
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self.bind = bind
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stopping = False
+        self._running: set[int] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def engine(self) -> Engine:
+        # シャーディング時もjobsテーブルはシャード0(既定のDB)に置く
+        return self.bind if self.bind is not None else database.get_engine()
+
+    def submit(self, kind: str, params: dict) -> dict:
+        """ジョブを登録する. 種類が無いかパラメータが合わなければValueError."""
+        if kind not in JOB_KINDS:
+            msg = f"unknown job kind: {kind}"
+            raise ValueError(msg)
+        try:
+            inspect.signature(JOB_KINDS[kind]).bind(None, **params)
+        except TypeError as exc:
+            raise ValueError(str(exc)) from None
+        with self.engine.begin() as conn:
+            job_id = conn.execute(insert(jobs_table), {"kind": kind, "params": json.dumps(params)}).inserted_primary_key[0]
+            row = conn.execute(SELECT_JOB, {"job_id": job_id}).one()
+        self._wake.set()
+        return _to_dict(row)
+
+    def get(self, job_id: int) -> dict | None:
+        with self.engine.connect() as conn:
+            row = conn.execute(SELECT_JOB, {"job_id": job_id}).one_or_none()
+        return None if row is None else _to_dict(row)
+
+    def cancel(self, job_id: int) -> dict | None:
+        """取り消しを要求する. 実行待ちならすぐに取り消し, 実行中ならジョブが次に進捗を報告した時に止まる."""
+        params = {"job_id": job_id, "now": _now()}
+        with self.engine.begin() as conn:
+            if not conn.execute(CANCEL_QUEUED, params).rowcount:
+                conn.execute(REQUEST_CANCEL, params)
+            row = conn.execute(SELECT_JOB, params).one_or_none()
+        return None if row is None else _to_dict(row)
+
+    def start(self) -> None:
+        self.stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self._poll, name="job-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """新しいジョブの取得をやめ, 実行中のジョブを中断して実行待ちに戻す."""
+        self.stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def poll_once(self) -> list[int]:
+        """途絶えたジョブを戻し, 実行中のジョブの生存を記録し, 空きの数だけジョブを取得して実行する."""
+        now = _now()
+        cutoff = now - datetime.timedelta(seconds=self.stale_seconds)
+        claimed = []
+        with self.engine.begin() as conn:
+            params = {"cutoff": cutoff, "max_attempts": self.max_attempts, "now": now}
+            conn.execute(ABANDON_STALE, params)
+            conn.execute(REQUEUE_STALE, params)
+            with self._lock:
+                running = list(self._running)
+            if running:
+                conn.execute(HEARTBEAT, {"job_ids": running, "worker": self.owner, "now": now})
+        free = self.workers - len(running)
+        if free <= 0 or self.stopping:
+            return claimed
+        with self.engine.connect() as conn:
+            candidates = conn.execute(SELECT_QUEUED, {"limit": free}).scalars().all()
+        for job_id in candidates:
+            with self.engine.begin() as conn:
+                if not conn.execute(CLAIM_JOB, {"job_id": job_id, "worker": self.owner, "now": now}).rowcount:
+                    continue   # 他のプロセスが先に取得した
+            with self._lock:
+                self._running.add(job_id)
+            claimed.append(job_id)
+            self._executor.submit(self._run_job, job_id)
+        return claimed
+
+    def _poll(self) -> None:
+        while not self.stopping:
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("job polling failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _run_job(self, job_id: int) -> None:
+        status, result, error = FAILED, None, None
+        try:
+            row = self.get(job_id)
+            result = JOB_KINDS[row["kind"]](JobContext(self, job_id, row["params"]), **row["params"])
+            status = SUCCEEDED
+        except JobCancelledError:
+            status = CANCELLED
+        except JobInterruptedError:
+            status = None
+        except Exception as exc:
+            logger.exception("job %d failed", job_id)
+            error = f"{type(exc).__name__}: {exc}"[:500]
+        try:
+            with self.engine.begin() as conn:
+                if status is None:
+                    conn.execute(RELEASE_JOB, {"job_id": job_id, "worker": self.owner})
+                else:
+                    conn.execute(FINISH_JOB, {
+                        "job_id": job_id, "worker": self.owner, "new_status": status,
+                        "job_result": json.dumps(result), "job_error": error, "now": _now(),
+                    })
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+            self._wake.set()
+
+
+def _to_dict(row: Row) -> dict:
+    job = dict(row._mapping)  # noqa: SLF001
+    job["params"] = json.loads(job["params"])
+    job["result"] = None if job["result"] is None else json.loads(job["result"])
+    return job
+
+
+runner = JobRunner()
+
+
+# --- ジョブの種類 ---
+
+SELECT_ITEM_IDS = select(items_table.c.id).where(items_table.c.todo_list_id == bindparam("todo_list_id")).limit(bindparam("limit"))
+SELECT_ARCHIVED_IDS = select(archive_table.c.id).where(archive_table.c.todo_list_id == bindparam("todo_list_id")).limit(bindparam("limit"))
+DELETE_ITEMS = delete(items_table).where(items_table.c.id.in_(bindparam("ids", expanding=True)))
+DELETE_ARCHIVED = delete(archive_table).where(archive_table.c.id.in_(bindparam("ids", expanding=True)))
+COUNT_LIST_ITEMS = select(func.count()).select_from(items_table).where(items_table.c.todo_list_id == bindparam("todo_list_id"))
+COUNT_LIST_ARCHIVED = select(func.count()).select_from(archive_table).where(archive_table.c.todo_list_id == bindparam("todo_list_id"))
+# 途中で取り消してもリストの項目数が合うよう, 削除した分だけ減らす. 更新日時は変えない
+SUBTRACT_ITEM_COUNT = (
+    update(lists_table)
+    .where(lists_table.c.id == bindparam("todo_list_id"))
+    .values(item_count=lists_table.c.item_count - bindparam("count"), updated_at=lists_table.c.updated_at)
+)
+DELETE_LIST = delete(lists_table).where(lists_table.c.id == bindparam("todo_list_id"))
+
+
+@job("delete_list")
+def delete_list(ctx: JobContext, todo_list_id: int, chunk_size: int = const.BULK_CHUNK_SIZE) -> dict:
+    """リストを項目ごと削除する. 項目はchunk_size件ずつ削除してコミットする."""
+    params = {"todo_list_id": todo_list_id, "limit": chunk_size}
+    with ctx.session_for(todo_list_id) as db:
+        total = db.execute(COUNT_LIST_ITEMS, params).scalar_one() + db.execute(COUNT_LIST_ARCHIVED, params).scalar_one()
+        # 進捗は別の接続で記録するので, 先にトランザクションを終える
+        db.rollback()
+        done = 0
+        ctx.progress(done, total)
+        for select_ids, delete_ids, counted in ((SELECT_ARCHIVED_IDS, DELETE_ARCHIVED, False), (SELECT_ITEM_IDS, DELETE_ITEMS, True)):
+            while ids := db.execute(select_ids, params).scalars().all():
+                deleted_count = db.execute(delete_ids, {"ids": ids}).rowcount
+                if counted:
+                    db.execute(SUBTRACT_ITEM_COUNT, {"todo_list_id": todo_list_id, "count": deleted_count})
+                db.commit()
+                done += deleted_count
+                ctx.progress(done)
+        deleted = db.execute(DELETE_LIST, params).rowcount > 0
+        if deleted:
+            audit.record(db, todo_list_id, "list", None, "deleted", None, {"items": done})
+        db.commit()
+    if deleted:
+        events.publish(todo_list_id, "list.deleted")
+    return {"deleted": deleted, "items": done}
@@ -1,14 +1,51 @@
-import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from .routers import list_router, item_router
+from . import audit, const, export, jobs, profiling, reminders, slow_query, warmup
+from .compression import CompressionMiddleware
+from .deadline import DeadlineExceededError, DeadlineMiddleware, deadline_exceeded_handler
+from .routers import list_router, item_router, event_router, admin_router, batch_router, job_router, due_router, health_router, history_router
 
 from fastapi.routing import APIRoute
 
-DEBUG = os.environ.get("DEBUG", "") == "true"
+DEBUG = const.DEBUG
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # 接続プールを前もって開く. 終わるまで/readyzは503を返す
+    warmup.warmer.start()
+    # 起動中のみ動かすバックグラウンド処理
+    archiver = None
+    if const.ARCHIVE_INTERVAL_SECONDS > 0:
+        from .archive import Archiver
+
+        archiver = Archiver(const.ARCHIVE_INTERVAL_SECONDS)
+        archiver.start()
+    if const.JOB_WORKERS > 0:
+        jobs.runner.start()
+    if const.REMINDERS:
+        reminders.scheduler.start()
+    if const.AUDIT and const.AUDIT_FLUSH_SECONDS > 0:
+        audit.flusher.start()
+    yield
+    warmup.warmer.stop()
+    if const.REMINDERS:
+        reminders.scheduler.stop()
+    if const.JOB_WORKERS > 0:
+        # 実行中のジョブは中断して実行待ちに戻す(次に起動したプロセスが再開する)
+        jobs.runner.stop()
+    if archiver is not None:
+        archiver.stop()
+    if const.AUDIT and const.AUDIT_FLUSH_SECONDS > 0:
+        # 他のバックグラウンド処理が止まってから, 残った変更を移す
+        audit.flusher.stop()
+
 
 app = FastAPI(
     title="Python Backend Stations",
     debug=DEBUG,
+    lifespan=lifespan,
 )
 
 if DEBUG:
@@ -20,8 +57,36 @@ if DEBUG:
         panels=["app.database.SQLAlchemyPanel"],
     )
 
+# 一定サイズ以上のレスポンスをクライアントが受け付ける形式で圧縮する
+app.add_middleware(CompressionMiddleware, minimum_size=const.COMPRESSION_MINIMUM_SIZE)
+
+# スロークエリの記録に実行中のルートを残す
+if slow_query.enabled():
+    app.add_middleware(slow_query.QueryContextMiddleware)
+
+# リクエストの締め切りをDBの文実行まで伝搬させる
+app.add_middleware(DeadlineMiddleware, timeout=const.REQUEST_DEADLINE_SECONDS)
+app.add_exception_handler(DeadlineExceededError, deadline_exceeded_handler)
+
+# プロファイラは有効な場合のみ登録する(無効時は負荷を掛けない)
+if profiling.enabled():
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        token=const.ADMIN_TOKEN,
+        sample_rate=const.PROFILE_SAMPLE_RATE,
+    )
+
+app.include_router(health_router.router)
 app.include_router(list_router.router)
+app.include_router(due_router.router)
 app.include_router(item_router.router)
+app.include_router(history_router.router)
+app.include_router(event_router.router)
+app.include_router(admin_router.router)
+app.include_router(batch_router.router)
+app.include_router(job_router.router)
 
-for route in app.routes:
-    print(route.path, route.methods)
\ No newline at end of file
+# 起動を静かにするため, ルート一覧の表示は開発時のみ
+if DEBUG:
+    for route in app.routes:
+        print(route.path, route.methods)
\ No newline at end of file
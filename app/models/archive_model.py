@@ -0,0 +1,30 @@
+from typing import ClassVar
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String, func
+
+from app.database import Base
+
+
+class ArchivedItemModel(Base):
+    """アーカイブ済みアイテムモデル.
+
+    完了してから一定期間が過ぎたTODO項目を ``todo_items`` から移したもの.
+    IDは元の項目のIDをそのまま使う.
+    """
+    __tablename__ = "todo_items_archive"
+    __table_args__: ClassVar[dict[str]] = {
+        "comment": "アーカイブ済みアイテムテーブル",
+    }
+
+    id = Column("id", Integer, primary_key=True, autoincrement=False)
+    todo_list_id = Column("todo_list_id", Integer, ForeignKey("todo_lists.id"), nullable=False, index=True)
+    title = Column("title", String(50), nullable=False)
+    description = Column("description", String(200))
+    status_code = Column("status_code", Integer)
+    due_at = Column("due_at", DateTime)
+    reminded_at = Column("reminded_at", DateTime)
+    version = Column("version", Integer, nullable=False)
+    position = Column("position", BigInteger)
+    created_at = Column("created_at", DateTime)
+    updated_at = Column("updated_at", DateTime)
+    archived_at = Column("archived_at", DateTime, server_default=func.now())
@@ -0,0 +1,52 @@
+from typing import ClassVar
+
+from sqlalchemy import Column, DateTime, Integer, String, Text, func
+
+from app.database import Base
+
+
+class OutboxModel(Base):
+    """変更履歴の送信待ちモデル.
+
+    書き込みと同じトランザクションで1行追加し, バックグラウンドで変更履歴テーブルへまとめて移す.
+    書き込みの負荷を抑えるため, 主キー以外のインデックスは持たない.
+    """
+    __tablename__ = "change_outbox"
+    __table_args__: ClassVar[dict[str]] = {
+        "comment": "変更履歴の送信待ちテーブル",
+        # 移した後に空になってもidを再利用しない(変更履歴の主キーに引き継ぐため)
+        "sqlite_autoincrement": True,
+    }
+
+    id = Column("id", Integer, primary_key=True, autoincrement=True)
+    todo_list_id = Column("todo_list_id", Integer, nullable=False)
+    # list または item
+    entity = Column("entity", String(10), nullable=False)
+    # 変更した項目のID. リスト自体や複数の項目をまとめて変更した場合はNULL
+    entity_id = Column("entity_id", Integer)
+    action = Column("action", String(20), nullable=False)
+    version = Column("version", Integer)
+    # 変更した値(JSON)
+    changes = Column("changes", Text)
+    changed_at = Column("changed_at", DateTime, server_default=func.now())
+
+
+class HistoryModel(Base):
+    """変更履歴モデル.
+
+    MySQLではtodo_list_idでパーティションに分ける(リストごとの取得は1つのパーティションだけを読む).
+    そのため主キーは(todo_list_id, id)で, idは送信待ちテーブルのidを引き継ぐ.
+    """
+    __tablename__ = "change_history"
+    __table_args__: ClassVar[dict[str]] = {
+        "comment": "変更履歴テーブル",
+    }
+
+    todo_list_id = Column("todo_list_id", Integer, primary_key=True, autoincrement=False)
+    id = Column("id", Integer, primary_key=True, autoincrement=False)
+    entity = Column("entity", String(10), nullable=False)
+    entity_id = Column("entity_id", Integer)
+    action = Column("action", String(20), nullable=False)
+    version = Column("version", Integer)
+    changes = Column("changes", Text)
+    changed_at = Column("changed_at", DateTime)
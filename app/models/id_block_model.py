@@ -0,0 +1,20 @@
+from typing import ClassVar
+
+from sqlalchemy import BigInteger, Column, String
+
+from app.database import Base
+
+
+class IdBlockModel(Base):
+    """ID採番モデル.
+
+    シャーディング時に, シャードをまたいで一意なIDを払い出すための次の値を保持する.
+    シャード0のものだけを使う.
+    """
+    __tablename__ = "id_blocks"
+    __table_args__: ClassVar[dict[str]] = {
+        "comment": "ID採番テーブル",
+    }
+
+    name = Column("name", String(50), primary_key=True)
+    next_id = Column("next_id", BigInteger, nullable=False)
@@ -1,6 +1,6 @@
 from typing import ClassVar
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func, text
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String, func, text
 
 from app.database import Base
 
@@ -8,9 +8,12 @@ from app.database import Base
 class ItemModel(Base):
     """アイテムモデル."""
     __tablename__ = "todo_items"
-    __table_args__: ClassVar[dict[str]] = {
-        "comment": "アイテムテーブル",
-    }
+    __table_args__: ClassVar[tuple] = (
+        Index("ix_todo_items_todo_list_id_position", "todo_list_id", "position"),
+        Index("ix_todo_items_status_code_due_at", "status_code", "due_at"),
+        # アーカイブした項目とIDが重ならないよう, SQLiteでも削除したIDを再利用しない
+        {"comment": "アイテムテーブル", "sqlite_autoincrement": True},
+    )
 
     id = Column("id", Integer, primary_key=True, autoincrement=True)
     todo_list_id = Column("todo_list_id", Integer, ForeignKey("todo_lists.id"), nullable=False)
@@ -18,5 +21,11 @@ class ItemModel(Base):
     description = Column("description", String(200))
     status_code = Column("status_code", Integer)
     due_at = Column("due_at", DateTime)
+    # 期限のリマインドを送った日時. 期限を変更するとNULLに戻す
+    reminded_at = Column("reminded_at", DateTime)
+    version = Column("version", Integer, nullable=False, server_default=text("1"))
+    # リスト内の並び順. 小さい順に並べる(間隔を空けて振る)
+    position = Column("position", BigInteger, nullable=False, server_default=text("0"))
     created_at = Column("created_at", DateTime, server_default=func.now())
-    updated_at = Column("updated_at", DateTime, server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"))
+    # 更新日時はDBに依存しないようアプリ側(onupdate)で更新する
+    updated_at = Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,36 @@
+from typing import ClassVar
+
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, Text, func, text
+
+from app.database import Base
+
+
+class JobModel(Base):
+    """バックグラウンドジョブモデル.
+
+    リクエスト内に収まらない処理の状態と進捗を保持する. シャーディング時もシャード0のものだけを使う.
+    """
+    __tablename__ = "jobs"
+    __table_args__: ClassVar[tuple] = (
+        Index("ix_jobs_status_heartbeat_at", "status", "heartbeat_at"),
+        {"comment": "バックグラウンドジョブテーブル"},
+    )
+
+    id = Column("id", Integer, primary_key=True, autoincrement=True)
+    kind = Column("kind", String(50), nullable=False)
+    # ジョブの引数と結果(JSON)
+    params = Column("params", Text, nullable=False)
+    result = Column("result", Text)
+    # queued, running, succeeded, failed, cancelled
+    status = Column("status", String(20), nullable=False, server_default=text("'queued'"))
+    progress = Column("progress", Integer, nullable=False, server_default=text("0"))
+    total = Column("total", Integer)
+    error = Column("error", String(500))
+    cancel_requested = Column("cancel_requested", Boolean, nullable=False, server_default=text("0"))
+    attempts = Column("attempts", Integer, nullable=False, server_default=text("0"))
+    # 実行中のプロセスと, その最終生存確認日時. 途絶えたジョブは別のプロセスが再実行する
+    owner = Column("owner", String(100))
+    heartbeat_at = Column("heartbeat_at", DateTime)
+    created_at = Column("created_at", DateTime, server_default=func.now())
+    updated_at = Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now())
+    finished_at = Column("finished_at", DateTime)
@@ -17,6 +17,10 @@ class ListModel(Base):
     id = Column("id", Integer, primary_key=True, autoincrement=True)
     title = Column("title", String(50), nullable=False)
     description = Column("description", String(200))
+    version = Column("version", Integer, nullable=False, server_default=text("1"))
+    # TODO項目数. 項目の作成・削除時に同じトランザクションで増減する
+    item_count = Column("item_count", Integer, nullable=False, server_default=text("0"))
     created_at = Column("created_at", DateTime, server_default=func.now())
-    updated_at = Column("updated_at", DateTime, server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"))
+    # 更新日時はDBに依存しないようアプリ側(onupdate)で更新する
+    updated_at = Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now())
     items = relationship("ItemModel", backref="todo_lists")
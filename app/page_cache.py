@@ -0,0 +1,147 @@
+"""一覧ページのキャッシュ.
+
+``GET /lists/{id}/items`` のページを ``(todo_list_id, 正規化したクエリ, リストの世代)`` を, ``GET /lists/`` のページを
+``(LISTS, 正規化したクエリ, リスト一覧の世代)`` をキーとして, 圧縮済みの形(:class:`PrecompressedBody`)で保持する.
+
+世代はリストごとの整数で, そのリストの変更イベント(項目の作成・更新・削除・移動・コピー・アーカイブなど)を受け取るたびに進める.
+キーに世代を含めるので, 1回の書き込みでそのリストの全ページが定数時間で無効になり, キーを走査する必要はない.
+古い世代のエントリは参照されなくなり, メモリの上限を超えた時にLRUで追い出される.
+
+世代は読み込みの前に取得する. 読み込み中にコミットされた変更は世代が進むので, 読み込んだページが使われることはない.
+変更イベントはコミット後に全プロセスへ配られるので, 無効化が遅れるのはイベントが届くまでの間だけ.
+"""
+
+import itertools
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app import const, events
+from app.compression import PrecompressedBody
+from app.crud import common
+
+# リスト一覧のページの世代を表すチャネル
+LISTS = None
+
+
+def normalize_page(page: int, per_page: int) -> tuple[int, int]:
+    """CRUD処理と同じ補正をしたページ番号と件数. 補正後が同じクエリは同じキーにする."""
+    return common.normalize_page(page, per_page)
+
+
+class _Entry:
+    __slots__ = ("body", "headers", "nbytes")
+
+    def __init__(self, body: PrecompressedBody, headers: dict) -> None:
+        self.body = body
+        self.headers = headers
+        self.nbytes = body.nbytes
+
+
+class PageCache:
+    """世代をキーに含めたLRUキャッシュ. 保持するバイト数(圧縮済みの形を含む)をmax_bytes以下に保つ."""
+
+    def __init__(self, max_bytes: int, max_generations: int = const.PAGE_CACHE_MAX_GENERATIONS) -> None:
+        self.max_bytes = max_bytes
+        self.max_generations = max_generations
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._generations: dict[Hashable, int] = {}
+        # _generationsに無いチャネルの世代
+        self._floor = 0
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def generation(self, channel: Hashable) -> int:
+        return self._generations.get(channel, self._floor)
+
+    def invalidate(self, channel: Hashable) -> None:
+        """チャネルの世代を進め, そのチャネルのキャッシュを全て無効にする."""
+        with self._lock:
+            if len(self._generations) >= self.max_generations:
+                # 世代の表が大きくなり過ぎないよう, 全チャネルの世代をまとめて進める
+                self._generations.clear()
+                self._floor = next(self._counter)
+            self._generations[channel] = next(self._counter)
+
+    def on_event(self, channel: int, payload: str) -> None:
+        """変更イベントを受け取り, リストの世代を進める. リスト自体の変更ではリスト一覧の世代も進める."""
+        self.invalidate(channel)
+        if json.loads(payload)["type"].startswith("list."):
+            self.invalidate(LISTS)
+
+    def response(self, request: Request, channel: Hashable, query: tuple, render: Callable[[], tuple[bytes, dict]]) -> Response:
+        """キャッシュしたページのレスポンスを返す. 無ければrender()でボディとヘッダを作ってキャッシュする."""
+        key = (channel, query, self.generation(channel))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            raw, headers = render()
+            entry = _Entry(PrecompressedBody(raw), headers)
+            if entry.nbytes <= self.max_bytes:
+                with self._lock:
+                    old = self._entries.pop(key, None)
+                    if old is not None:
+                        self.nbytes -= old.nbytes
+                    self._entries[key] = entry
+                    self.nbytes += entry.nbytes
+                    self._evict()
+        response = entry.body.to_response(request, entry.headers)
+        if entry.body.nbytes != entry.nbytes:
+            # 新しい形式で圧縮した分を計上する
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self.nbytes += entry.body.nbytes - entry.nbytes
+                    entry.nbytes = entry.body.nbytes
+                    self._evict()
+        return response
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _evict(self) -> None:
+        while self.nbytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.nbytes -= entry.nbytes
+            self.evictions += 1
+
+
+cache = PageCache(const.PAGE_CACHE_MAX_BYTES)
+
+
+def enabled() -> bool:
+    return cache.max_bytes > 0
+
+
+def _on_event(channel: int, payload: str) -> None:
+    if enabled():
+        cache.on_event(channel, payload)
+
+
+events.broker.add_listener(_on_event)
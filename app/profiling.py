@@ -0,0 +1,215 @@
+"""本番環境向けのサンプリングプロファイラ.
+
+専用スレッドが一定間隔で全スレッドのスタック(``sys._current_frames``)を採取し,
+計測中のプロファイルに集計する. 計測は次の2通り.
+
+- リクエスト単位: ``X-Profile`` ヘッダに管理用トークンを付けたリクエスト,
+  または ``PROFILE_SAMPLE_RATE`` の確率で選ばれたリクエストの実行中
+- ワーカー全体: 管理用APIで指定した秒数の間
+
+リクエスト単位の計測も, その間に動いていたワーカー内の全スレッドを対象とする
+(待機中のスレッドは除く). 結果は管理用APIからcollapsed stacks形式(flamegraph.pl等)
+またはspeedscopeのJSON形式で取得できる.
+
+トークンもサンプリング率も設定しない場合はミドルウェアを登録しないので, 負荷は掛からない.
+"""
+
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import const
+
+# スタックの一番内側がこれらの関数なら, 待機中のスレッドとして集計しない
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+MAX_DEPTH = 128
+
+_ids = itertools.count(1)
+
+
+class Profile:
+    """1回分の計測結果."""
+
+    def __init__(self, kind: str, label: str, interval: float) -> None:
+        self.id = next(_ids)
+        self.kind = kind
+        self.label = label
+        self.interval = interval
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.finished = False
+        self.samples: Counter[tuple] = Counter()
+        self._start = time.perf_counter()
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+        self.finished = True
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "finished": self.finished,
+            "samples": sum(self.samples.values()),
+        }
+
+    def collapsed(self) -> str:
+        """``root;caller;callee 回数`` 形式のテキスト."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            lines.append(";".join(f"{name} ({os.path.basename(file)}:{line})" for name, file, line in stack) + f" {count}")  # noqa: PTH119
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        """speedscope(https://www.speedscope.app/)で読み込めるJSON."""
+        frames: dict[tuple, int] = {}
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.label,
+            "shared": {"frames": [{"name": name, "file": file, "line": line} for name, file, line in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.label,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+def _stack(frame) -> tuple | None:  # noqa: ANN001
+    """外側から内側の順のスタック. 待機中のスレッドはNone."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:  # noqa: PTH119
+        return None
+    stack = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class Profiler:
+    """計測中のプロファイルがある間だけサンプリング用のスレッドを動かす."""
+
+    def __init__(self, interval_ms: float, keep: int) -> None:
+        self.interval = interval_ms / 1000
+        self._active: set[Profile] = set()
+        self._finished: deque[Profile] = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self, kind: str, label: str) -> Profile:
+        profile = Profile(kind, label, self.interval)
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: Profile) -> None:
+        with self._lock:
+            if profile.finished:
+                return
+            # サンプリング用のスレッドはロックを取ってから集計するので, 終了後に結果は変わらない
+            profile.finish()
+            self._active.discard(profile)
+            self._finished.append(profile)
+
+    def start_for(self, seconds: float, kind: str = "worker", label: str = "worker") -> Profile:
+        """seconds秒後に自動で終了する計測を始める."""
+        profile = self.start(kind, label)
+        timer = threading.Timer(seconds, self.stop, args=(profile,))
+        timer.daemon = True
+        timer.start()
+        return profile
+
+    def get(self, profile_id: int) -> Profile | None:
+        with self._lock:
+            for profile in itertools.chain(self._finished, self._active):
+                if profile.id == profile_id:
+                    return profile
+        return None
+
+    def summaries(self) -> list[dict]:
+        # 計測中のプロファイルはサンプリング用のスレッドが更新するので, ロックを取って集計する
+        with self._lock:
+            return [profile.summary() for profile in itertools.chain(self._finished, self._active)]
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            stacks = [_stack(frame) for ident, frame in sys._current_frames().items() if ident != me]  # noqa: SLF001
+            stacks = [x for x in stacks if x is not None]
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                for profile in self._active:
+                    profile.samples.update(stacks)
+            time.sleep(self.interval)
+
+
+profiler = Profiler(const.PROFILE_INTERVAL_MS, const.PROFILE_KEEP)
+
+
+def enabled() -> bool:
+    return bool(const.ADMIN_TOKEN) or const.PROFILE_SAMPLE_RATE > 0
+
+
+class ProfilingMiddleware:
+    """指定されたリクエストの実行中にプロファイルを取り, ``X-Profile-Id`` ヘッダでIDを返すASGIミドルウェア."""
+
+    def __init__(self, app: ASGIApp, token: str, sample_rate: float) -> None:
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+
+    def _should_profile(self, scope: Scope) -> bool:
+        header = Headers(scope=scope).get("x-profile")
+        if self.token and header is not None and hmac.compare_digest(header, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate  # noqa: S311
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.start("request", f"{scope['method']} {scope['path']}")
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["x-profile-id"] = str(profile.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop(profile)
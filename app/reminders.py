@@ -0,0 +1,305 @@
+"""期限のリマインド.
+
+未完了のTODO項目の期限(``due_at``)が来たら, そのリストに ``item.due`` イベントを発行する.
+
+期限が ``REMINDER_HORIZON_SECONDS`` 秒以内に来る項目だけを ``(status_code, due_at)`` の
+インデックスの範囲検索で読み込み, プロセス内のタイマーホイールに載せて期限の時刻に取り出す.
+読み込み済みの範囲は時間の経過に合わせて少しずつ先へ広げるので, テーブル全体を定期的に走査することはない.
+読み込み済みの範囲に後から入った項目(作成・期限の変更・未完了に戻した項目)はCRUD処理から :meth:`ReminderScheduler.schedule` で載せる.
+複製や一括移動で項目がまとめて入ったリストは :meth:`ReminderScheduler.schedule_list` で読み込み済みの範囲を読み直す.
+読み込み済みの範囲は読み込みを始める前に広げておき, 読み込み中に作成・変更された項目も :meth:`ReminderScheduler.schedule` で載せる.
+読み込みで読んだ行は変更前のものかもしれないので, 読み込み中に載せ直した項目は読み込みでは上書きしない.
+
+リマインドを送る時は ``reminded_at`` を条件付きUPDATEで記録し, 記録できた場合だけ発行する.
+複数のプロセスで動かしても同じリマインドは1回だけ送られ, 完了済みや期限を変更した項目には送らない.
+起動時は ``REMINDER_CATCHUP_SECONDS`` 秒前までさかのぼり, 停止中に期限が来た項目にも送る.
+"""
+
+import datetime
+import logging
+import sys
+import threading
+import time
+from collections.abc import Callable, Hashable
+
+from sqlalchemy import and_, bindparam, or_, select, update
+from sqlalchemy.engine import Engine
+
+from app import const, events, sharding, sqlite
+from app.const import TodoItemStatusCode
+from app.database import SessionLocal
+from app.models.item_model import ItemModel
+
+logger = logging.getLogger(__name__)
+
+items_table = ItemModel.__table__
+
+LOAD_CHUNK_SIZE = 1000
+
+# 期限が(after_due, after_id)より後でuntilまでの, リマインド前の未完了の項目
+SELECT_UPCOMING = (
+    select(items_table.c.id, items_table.c.todo_list_id, items_table.c.due_at)
+    .where(
+        items_table.c.status_code == TodoItemStatusCode.NOT_COMPLETED.value,
+        items_table.c.due_at >= bindparam("after_due"),
+        items_table.c.due_at <= bindparam("until"),
+        or_(items_table.c.due_at > bindparam("after_due"), items_table.c.id > bindparam("after_id")),
+        items_table.c.reminded_at.is_(None),
+    )
+    .order_by(items_table.c.due_at, items_table.c.id)
+    .limit(bindparam("limit"))
+)
+# リストの, 期限が読み込み済みの範囲にあるリマインド前の未完了の項目
+SELECT_LIST_UPCOMING = select(items_table.c.id, items_table.c.due_at).where(
+    items_table.c.todo_list_id == bindparam("todo_list_id"),
+    items_table.c.status_code == TodoItemStatusCode.NOT_COMPLETED.value,
+    items_table.c.due_at >= bindparam("after_due"),
+    items_table.c.due_at <= bindparam("until"),
+    items_table.c.reminded_at.is_(None),
+)
+# 項目の今のリスト. 読み込んだ後に別のリストへ移動しているかもしれない
+SELECT_TODO_LIST_ID = select(items_table.c.todo_list_id).where(items_table.c.id == bindparam("todo_item_id"))
+# 期限が読み込んだ時から変わっておらず, 未完了でまだ送っていない場合だけ記録する. 更新日時は変えない
+MARK_REMINDED = (
+    update(items_table)
+    .where(and_(
+        items_table.c.id == bindparam("todo_item_id"),
+        items_table.c.due_at == bindparam("due"),
+        items_table.c.status_code == TodoItemStatusCode.NOT_COMPLETED.value,
+        items_table.c.reminded_at.is_(None),
+    ))
+    .values(reminded_at=bindparam("now"), updated_at=items_table.c.updated_at)
+)
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+
+def _timestamp(value: datetime.datetime) -> float:
+    return value.replace(tzinfo=datetime.UTC).timestamp()
+
+
+class TimerWheel:
+    """tick秒ごとのスロットを環状に並べたタイマーホイール.
+
+    slots個のスロットで tick * slots 秒先までの予定を保持する. 追加・削除・取り出しは予定の数に依らない.
+    取り出しはスロット単位なので, 予定より最大tick秒早く取り出す. 取り出し済みの時刻の予定は次の取り出しで出す.
+    """
+
+    def __init__(self, tick: float, slots: int, now: float) -> None:
+        self.tick = tick
+        self._slots: list[dict] = [{} for _ in range(slots)]
+        self._overdue: dict = {}
+        # key -> 予定のスロット番号. 取り出し済みの時刻の予定はNone
+        self._where: dict[Hashable, int | None] = {}
+        self._current = int(now // tick)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    @property
+    def horizon(self) -> float:
+        """追加できる予定の時刻の上限(この時刻は含まない)."""
+        return (self._current + len(self._slots)) * self.tick
+
+    def add(self, key: Hashable, when: float, value: object) -> bool:
+        """予定を追加する(同じkeyの予定は置き換える). horizon以降の予定は追加せずFalseを返す."""
+        number = int(when // self.tick)
+        if number >= self._current + len(self._slots):
+            return False
+        self.remove(key)
+        if number < self._current:
+            self._overdue[key] = value
+            self._where[key] = None
+        else:
+            self._slots[number % len(self._slots)][key] = value
+            self._where[key] = number
+        return True
+
+    def remove(self, key: Hashable) -> None:
+        if key not in self._where:
+            return
+        number = self._where.pop(key)
+        if number is None:
+            del self._overdue[key]
+        else:
+            del self._slots[number % len(self._slots)][key]
+
+    def advance(self, now: float) -> list:
+        """nowまでのスロットの予定を取り出す."""
+        target = int(now // self.tick)
+        if target - self._current >= len(self._slots):
+            # 1周以上進んだ場合は全スロットを取り出せばよい
+            self._current = target - len(self._slots) + 1
+        expired = list(self._overdue.values())
+        for key in self._overdue:
+            del self._where[key]
+        self._overdue.clear()
+        while self._current <= target:
+            slot = self._slots[self._current % len(self._slots)]
+            for key, value in slot.items():
+                del self._where[key]
+                expired.append(value)
+            slot.clear()
+            self._current += 1
+        return expired
+
+
+class ReminderScheduler:
+    """期限の近い項目を読み込み, 期限が来たらリマインドを送るバックグラウンドスレッド."""
+
+    def __init__(
+        self,
+        tick: float = const.REMINDER_TICK_SECONDS,
+        horizon: float = const.REMINDER_HORIZON_SECONDS,
+        catchup: float = const.REMINDER_CATCHUP_SECONDS,
+        engines: Callable[[], list[Engine | None]] = sharding.engines,
+    ) -> None:
+        self.tick = tick
+        self.horizon = horizon
+        self.catchup = catchup
+        self.engines = engines
+        self.running = False
+        self.fired = 0
+        self.loaded_from: datetime.datetime | None = None
+        self.loaded_until: datetime.datetime | None = None
+        self.wheel: TimerWheel | None = None
+        # 読み込み中にscheduleで載せ直した項目. 読み込み中でなければNone
+        self._rescheduled: set[int] | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def reset(self, now: datetime.datetime) -> None:
+        with self._lock:
+            self.wheel = TimerWheel(self.tick, max(int(self.horizon // self.tick), 1), _timestamp(now))
+            self.loaded_from = self.loaded_until = now - datetime.timedelta(seconds=self.catchup)
+
+    def schedule(self, todo_item_id: int, todo_list_id: int, due_at: datetime.datetime | None) -> None:
+        """作成・更新した項目の期限を反映する. まだ読み込んでいない範囲の期限は後で読み込むので何もしない."""
+        if not self.running:
+            return
+        with self._lock:
+            if self._rescheduled is not None:
+                self._rescheduled.add(todo_item_id)
+            if due_at is None or due_at > self.loaded_until:
+                self.wheel.remove(todo_item_id)
+                return
+            self.wheel.add(todo_item_id, _timestamp(due_at), (self._shard_of(todo_list_id), todo_item_id, due_at))
+
+    def schedule_list(self, todo_list_id: int) -> int:
+        """複製や一括移動で項目が入ったリストの, 期限が読み込み済みの範囲にある項目を載せ, 件数を返す.
+
+        範囲より後の期限は後で読み込む. 呼び出し前にコミットしておくこと.
+        """
+        if not self.running:
+            return 0
+        with self._lock:
+            params = {"todo_list_id": todo_list_id, "after_due": self.loaded_from, "until": self.loaded_until}
+        engine = self.engines()[self._shard_of(todo_list_id)]
+        with SessionLocal.session_factory(bind=engine, info={sqlite.READ_ONLY: True}) as db:
+            rows = db.execute(SELECT_LIST_UPCOMING, params).all()
+        for row in rows:
+            self.schedule(row.id, todo_list_id, row.due_at)
+        return len(rows)
+
+    def load(self, now: datetime.datetime) -> int:
+        """読み込み済みの範囲をnow + horizonの手前(ホイールに載る範囲)まで広げ, 読み込んだ件数を返す.
+
+        範囲は読み込む前に広げるので, 読み込み中に作成・変更された項目はscheduleで載る.
+        """
+        with self._lock:
+            wheel_until = datetime.datetime.fromtimestamp(self.wheel.horizon, datetime.UTC).replace(tzinfo=None)
+            until = min(self._target(now), wheel_until - datetime.timedelta(seconds=self.tick))
+            start = self.loaded_until
+            if until <= start:
+                return 0
+            self.loaded_until = until
+            self._rescheduled = set()
+        loaded = 0
+        try:
+            for shard, engine in enumerate(self.engines()):
+                params = {"after_due": start, "after_id": sys.maxsize, "until": until, "limit": LOAD_CHUNK_SIZE}
+                with SessionLocal.session_factory(bind=engine) as db:
+                    while rows := db.execute(SELECT_UPCOMING, params).all():
+                        with self._lock:
+                            for row in rows:
+                                if row.id not in self._rescheduled:
+                                    self.wheel.add(row.id, _timestamp(row.due_at), (shard, row.id, row.due_at))
+                        loaded += len(rows)
+                        params.update(after_due=rows[-1].due_at, after_id=rows[-1].id)
+        except BaseException:
+            # 読み込めなかった範囲は次回に読み込み直す
+            with self._lock:
+                self.loaded_until = start
+            raise
+        finally:
+            with self._lock:
+                self._rescheduled = None
+        return loaded
+
+    def fire(self, now: datetime.datetime) -> int:
+        """期限が来た項目にリマインドを送り, 送った件数を返す."""
+        with self._lock:
+            expired = self.wheel.advance(_timestamp(now))
+        if not expired:
+            return 0
+        engines = self.engines()
+        fired = []
+        for shard, engine in enumerate(engines):
+            entries = [entry for entry in expired if entry[0] == shard]
+            if not entries:
+                continue
+            with SessionLocal.session_factory(bind=engine) as db:
+                for _, todo_item_id, due_at in entries:
+                    if db.execute(MARK_REMINDED, {"todo_item_id": todo_item_id, "due": due_at, "now": now}).rowcount:
+                        todo_list_id = db.execute(SELECT_TODO_LIST_ID, {"todo_item_id": todo_item_id}).scalar_one()
+                        fired.append((todo_item_id, todo_list_id, due_at))
+                db.commit()
+        for todo_item_id, todo_list_id, due_at in fired:
+            events.publish(todo_list_id, "item.due", todo_item_id=todo_item_id, due_at=due_at.isoformat())
+        self.fired += len(fired)
+        return len(fired)
+
+    def run_once(self, now: datetime.datetime | None = None) -> int:
+        now = now or _utcnow()
+        if self.wheel is None:
+            self.reset(now)
+        # 間隔が空いてホイールが進んでいない場合は, 取り出して進めてから残りを読み込む
+        self.load(now)
+        fired = self.fire(now)
+        if self.loaded_until < self._target(now):
+            self.load(now)
+            fired += self.fire(now)
+        return fired
+
+    def start(self) -> None:
+        self.reset(_utcnow())
+        self.running = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.tick - time.time() % self.tick):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("reminder scheduling failed")
+
+    def _target(self, now: datetime.datetime) -> datetime.datetime:
+        return now + datetime.timedelta(seconds=self.horizon - self.tick)
+
+    def _shard_of(self, todo_list_id: int) -> int:
+        return sharding.get_router().shard_for(todo_list_id) if sharding.enabled() else 0
+
+
+scheduler = ReminderScheduler()
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app import const, page_cache
+from app.dependencies import require_admin
+from app.profiling import profiler
+from app.slow_query import slow_query_log
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["管理"],
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.post("/profiles")
+def start_worker_profile(seconds: float = Query(gt=0, le=const.PROFILE_MAX_SECONDS)):
+    """このワーカー全体のプロファイルをseconds秒間取る."""
+    profile = profiler.start_for(seconds)
+    return {"id": profile.id, "seconds": seconds}
+
+
+@router.get("/profiles")
+def get_profiles():
+    return profiler.summaries()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: int, format: str = Query(default="speedscope", pattern="^(speedscope|collapsed)$")):  # noqa: A002
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="profile not found")
+    if not profile.finished:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="profile is still running")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    return JSONResponse(profile.speedscope())
+
+
+@router.get("/slow-queries")
+def get_slow_queries():
+    """直近のスロークエリ(新しい順)."""
+    return slow_query_log.entries()
+
+
+@router.delete("/slow-queries")
+def clear_slow_queries():
+    slow_query_log.clear()
+    return {}
+
+
+@router.get("/page-cache")
+def get_page_cache_stats():
+    """このワーカーの一覧ページのキャッシュのヒット率と使用量."""
+    return page_cache.cache.stats()
+
+
+@router.delete("/page-cache")
+def clear_page_cache():
+    page_cache.cache.clear()
+    return {}
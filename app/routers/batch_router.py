@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app import batch, sharding
+from app.dependencies import get_db
+from app.schemas.batch_schema import BatchRequest, BatchResponse
+
+router = APIRouter(tags=["バッチ"])
+
+
+@router.post("/batch", response_model=BatchResponse)
+def post_batch(request: BatchRequest, db: Session = Depends(get_db)):
+    """複数の作成・更新・削除を順に1トランザクションで実行する."""
+    if sharding.enabled():
+        # 1つのトランザクションに収まらないため, シャーディング時は使えない
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="batch is not available with sharding")
+    return batch.run_batch(db, request)
@@ -0,0 +1,28 @@
+import datetime
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from ..crud import item_crud
+from ..schemas.item_schema import ResponseTodoItem
+from app import const
+from app.deadline import route_deadline
+from app.dependencies import get_db
+
+router = APIRouter(
+      prefix="/items",
+      tags=["TODO項目"],
+  )
+
+# 全リストを横断して, 期限が近い未完了の項目を期限の近い順に返す
+@router.get("/due", response_model=List[ResponseTodoItem], dependencies=[Depends(route_deadline(const.LIST_DEADLINE_SECONDS))])
+def get_due_items(
+    within: float = Query(gt=0, description="今からこの秒数以内に期限が来る項目を返す"),
+    overdue: bool = False,
+    page: int = 1,
+    per_page: int = const.MAX_PER_PAGE,
+    db: Session = Depends(get_db),
+):
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    # overdue=trueの場合は期限を過ぎた項目も含める
+    due_from = datetime.datetime.min if overdue else now
+    return item_crud.get_due_items(db, due_from, now + datetime.timedelta(seconds=within), page, per_page)
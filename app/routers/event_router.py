@@ -0,0 +1,89 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import const
+from app.crud import list_crud
+from app.dependencies import get_db
+from app.events import RESYNC, broker
+
+router = APIRouter(prefix="/lists", tags=["変更通知"])
+
+
+def _todo_list_exists(db: Session, todo_list_id: int) -> bool:
+    try:
+        return list_crud.get_todo_list(db, todo_list_id) is not None
+    finally:
+        # 接続中ずっとDB接続を握らないよう, 確認が済んだらすぐにセッションを閉じる
+        db.close()
+
+
+@router.get("/{todo_list_id}/events")
+async def stream_events(todo_list_id: int, db: Session = Depends(get_db)):
+    """リストの変更をServer-Sent Eventsで通知する."""
+    if not await run_in_threadpool(_todo_list_exists, db, todo_list_id):
+        raise HTTPException(status_code=404, detail="result not found")
+
+    async def event_stream():
+        # レスポンスが送られずに終わっても購読が残らないよう, 送り始めてから購読する
+        subscription = broker.subscribe(todo_list_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                payload = await subscription.get(const.EVENT_HEARTBEAT_SECONDS)
+                if payload is None:
+                    yield ": ping\n\n"
+                elif payload is RESYNC:
+                    yield "event: resync\ndata: {}\n\n"
+                else:
+                    yield f"event: change\ndata: {payload}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{todo_list_id}/ws")
+async def websocket_events(websocket: WebSocket, todo_list_id: int, db: Session = Depends(get_db)):
+    """リストの変更をWebSocketで通知する."""
+    if not await run_in_threadpool(_todo_list_exists, db, todo_list_id):
+        await websocket.close(code=4404)
+        return
+
+    async def wait_for_disconnect() -> None:
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    # 接続確立の直後に起きた変更も取りこぼさないよう, acceptより先に購読する
+    subscription = broker.subscribe(todo_list_id)
+    receiver = None
+    try:
+        await websocket.accept()
+        receiver = asyncio.create_task(wait_for_disconnect())
+        while True:
+            getter = asyncio.create_task(subscription.get(const.EVENT_HEARTBEAT_SECONDS))
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                break
+            payload = getter.result()
+            if payload is RESYNC:
+                await websocket.send_text('{"type":"resync"}')
+            elif payload is not None:
+                await websocket.send_text(payload)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        broker.unsubscribe(subscription)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from app import warmup
+
+router = APIRouter(tags=["ヘルスチェック"])
+
+
+# プロセスが応答できるかだけを返す(DBには接続しない)
+@router.get("/healthz")
+def get_healthz():
+    return {"status": "ok"}
+
+
+# ウォームアップが終わっていればリクエストを受け付けられる. 接続プールからは接続を取り出さない
+@router.get("/readyz")
+def get_readyz():
+    report = warmup.warmer.report()
+    if not warmup.warmer.ready:
+        return JSONResponse(report, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return report
@@ -0,0 +1,17 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app import audit, const
+from app.deadline import route_deadline
+from app.dependencies import get_db
+from app.schemas.history_schema import ResponseChange
+
+router = APIRouter(
+      prefix="/lists",
+      tags=["変更履歴"],
+  )
+
+# リストとその項目の変更履歴を新しい順に返す. 直前の変更は反映までAUDIT_FLUSH_SECONDS秒ほど遅れる
+@router.get("/{todo_list_id}/history", response_model=List[ResponseChange], dependencies=[Depends(route_deadline(const.LIST_DEADLINE_SECONDS))])
+def get_history(todo_list_id: int, page: int = 1, per_page: int = const.MAX_PER_PAGE, db: Session = Depends(get_db)):
+    return audit.get_history(db, todo_list_id, page, per_page)
@@ -1,9 +1,13 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from ..crud import item_crud
-from ..schemas.item_schema import ResponseTodoItem, NewTodoItem, UpdateTodoItem
-from app.dependencies import get_db
+from ..schemas.item_schema import ResponseTodoItem, NewTodoItem, UpdateTodoItem, MoveTodoItem, MoveTodoItems
+from app import const, page_cache
+from app.deadline import route_deadline
+from app.crud.errors import CrossShardError, VersionMismatchError
+from app.dependencies import etag, get_db, if_match_version, sparse_fields
+from app.schemas import fieldset
 
 router = APIRouter(
       prefix="/lists",
@@ -11,10 +15,22 @@ router = APIRouter(
   )
 
 @router.get("/{todo_list_id}/items/{todo_item_id}", response_model=ResponseTodoItem)
-def get_todo_item(todo_list_id: int, todo_item_id: int, db: Session = Depends(get_db)):
-    result = item_crud.get_todo_item(db, todo_list_id, todo_item_id)
+def get_todo_item(
+    todo_list_id: int,
+    todo_item_id: int,
+    response: Response,
+    include_archived: bool = False,
+    fields: tuple[str, ...] | None = Depends(sparse_fields(ResponseTodoItem)),
+    db: Session = Depends(get_db),
+):
+    # fieldsを指定した場合はその列だけを読み込んで返す(ETag用のversionは常に読む)
+    columns = fields if fields is None or "version" in fields else (*fields, "version")
+    result = item_crud.get_todo_item(db, todo_list_id, todo_item_id, include_archived, columns)
     if result is None:
         raise HTTPException(status_code=404, detail="result not found")
+    response.headers["ETag"] = etag(result.version)
+    if fields is not None:
+        return fieldset.render(ResponseTodoItem, fields, result, {"ETag": response.headers["ETag"]})
     return result
 
 @router.post("/{todo_list_id}/items", response_model=ResponseTodoItem)
@@ -25,12 +41,52 @@ def post_todo_item(todo_list_id: int, todo_item_list: NewTodoItem, db: Session =
     return result
 
 @router.put("/{todo_list_id}/items/{todo_item_id}", response_model=ResponseTodoItem)
-def put_todo_item(todo_list_id: int, todo_item_id: int, update_data: UpdateTodoItem, db: Session = Depends(get_db)):
-    result = item_crud.put_todo_item(db, todo_list_id, todo_item_id, update_data)
+def put_todo_item(
+    todo_list_id: int,
+    todo_item_id: int,
+    update_data: UpdateTodoItem,
+    response: Response,
+    expected_version: int | None = Depends(if_match_version),
+    db: Session = Depends(get_db),
+):
+    try:
+        result = item_crud.put_todo_item(db, todo_list_id, todo_item_id, update_data, expected_version)
+    except VersionMismatchError:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="version mismatch") from None
     if result is None:
         raise HTTPException(status_code=404, detail="result not found")
+    response.headers["ETag"] = etag(result.version)
     return result
 
+@router.post("/{todo_list_id}/items/{todo_item_id}/move", response_model=ResponseTodoItem)
+def move_todo_item(
+    todo_list_id: int,
+    todo_item_id: int,
+    move_data: MoveTodoItem,
+    response: Response,
+    expected_version: int | None = Depends(if_match_version),
+    db: Session = Depends(get_db),
+):
+    try:
+        result = item_crud.move_todo_item(db, todo_list_id, todo_item_id, move_data.after_id, expected_version)
+    except VersionMismatchError:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="version mismatch") from None
+    if result is None:
+        raise HTTPException(status_code=404, detail="result not found")
+    response.headers["ETag"] = etag(result.version)
+    return result
+
+# 項目を読み込まず, DB内でまとめて別のリストへ移す
+@router.post("/{todo_list_id}/items:move", response_model=dict)
+def move_todo_items(todo_list_id: int, move_data: MoveTodoItems, db: Session = Depends(get_db)):
+    try:
+        moved = item_crud.move_todo_items(db, todo_list_id, move_data.target_list_id, move_data.item_ids)
+    except CrossShardError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="lists are on different shards") from None
+    if moved is None:
+        raise HTTPException(status_code=404, detail="result not found")
+    return {"moved": moved}
+
 @router.delete("/{todo_list_id}/items/{todo_item_id}", response_model=dict)
 def delete_todo_item(todo_list_id: int, todo_item_id: int, db: Session = Depends(get_db)):
     result = item_crud.delete_todo_item(db, todo_list_id, todo_item_id)
@@ -38,6 +94,29 @@ def delete_todo_item(todo_list_id: int, todo_item_id: int, db: Session = Depends
         raise HTTPException(status_code=404, detail="result not found")
     return result
 
-@router.get("/{todo_list_id}/items", response_model=List[ResponseTodoItem])
-def get_todo_items(todo_list_id: int, page: int, per_page: int, db: Session = Depends(get_db)):
-    return item_crud.get_todo_items(db, todo_list_id, page, per_page)
\ No newline at end of file
+@router.get("/{todo_list_id}/items", response_model=List[ResponseTodoItem], dependencies=[Depends(route_deadline(const.LIST_DEADLINE_SECONDS))])
+def get_todo_items(
+    todo_list_id: int,
+    page: int,
+    per_page: int,
+    request: Request,
+    response: Response,
+    exact_count: bool = False,
+    include_archived: bool = False,
+    fields: tuple[str, ...] | None = Depends(sparse_fields(ResponseTodoItem)),
+    db: Session = Depends(get_db),
+):
+    if page_cache.enabled():
+        # 同じ条件のページは, このリストが次に変更されるまでキャッシュから返す
+        query = (*page_cache.normalize_page(page, per_page), exact_count, include_archived, fields)
+        return page_cache.cache.response(request, todo_list_id, query, lambda: (
+            fieldset.dump(ResponseTodoItem, fields, item_crud.get_todo_items(db, todo_list_id, page, per_page, include_archived, fields), many=True),
+            {"X-Total-Count": str(item_crud.count_todo_items(db, todo_list_id, exact_count, include_archived))},
+        ))
+    # 総件数はヘッダで返す. exact_count=trueの場合のみCOUNT(*)で数える
+    response.headers["X-Total-Count"] = str(item_crud.count_todo_items(db, todo_list_id, exact_count, include_archived))
+    # アーカイブ済みの項目はinclude_archived=trueの場合のみ含める
+    result = item_crud.get_todo_items(db, todo_list_id, page, per_page, include_archived, fields)
+    if fields is not None:
+        return fieldset.render(ResponseTodoItem, fields, result, {"X-Total-Count": response.headers["X-Total-Count"]}, many=True)
+    return result
\ No newline at end of file
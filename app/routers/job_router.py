@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Header, HTTPException, Response, status
+
+from app import jobs
+from app.dependencies import require_admin
+from app.schemas.job_schema import NewJob, ResponseJob
+
+router = APIRouter(prefix="/jobs", tags=["ジョブ"])
+
+
+def _authorize(kind: str, x_admin_token: str | None) -> None:
+    """管理用の種類(エクスポートなど)のジョブは, 管理用APIと同じトークンで認可する."""
+    if kind in jobs.ADMIN_JOB_KINDS:
+        require_admin(x_admin_token)
+
+
+@router.post("", response_model=ResponseJob, status_code=status.HTTP_202_ACCEPTED)
+def post_job(new_job: NewJob, response: Response, x_admin_token: str | None = Header(default=None)):
+    _authorize(new_job.kind, x_admin_token)
+    try:
+        job = jobs.runner.submit(new_job.kind, new_job.params)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from None
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return job
+
+
+@router.get("/{job_id}", response_model=ResponseJob)
+def get_job(job_id: int, x_admin_token: str | None = Header(default=None)):
+    job = jobs.runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="result not found")
+    _authorize(job["kind"], x_admin_token)
+    return job
+
+
+@router.post("/{job_id}/cancel", response_model=ResponseJob, status_code=status.HTTP_202_ACCEPTED)
+def cancel_job(job_id: int, x_admin_token: str | None = Header(default=None)):
+    job = jobs.runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="result not found")
+    _authorize(job["kind"], x_admin_token)
+    job = jobs.runner.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="result not found")
+    if job["status"] in jobs.FINISHED and not job["cancel_requested"]:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"job already {job['status']}")
+    return job
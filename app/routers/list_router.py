@@ -1,17 +1,32 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from ..crud import list_crud
-from ..schemas.list_schema import NewTodoList, UpdateTodoList, ResponseTodoList
-from app.dependencies import get_db
+from ..schemas.list_schema import NewTodoList, UpdateTodoList, ResponseTodoList, DuplicateTodoList
+from app import const, jobs, page_cache
+from app.deadline import route_deadline
+from app.crud.errors import VersionMismatchError
+from app.dependencies import etag, get_db, if_match_version, sparse_fields
+from app.schemas import fieldset
 
 router = APIRouter(prefix="/lists", tags=["TODOリスト"],)
 
 @router.get("/{todo_list_id}", response_model=ResponseTodoList)
-def get_todo_list(todo_list_id: int, db: Session = Depends(get_db)):
-  result = list_crud.get_todo_list(db, todo_list_id)
+def get_todo_list(
+  todo_list_id: int,
+  response: Response,
+  fields: tuple[str, ...] | None = Depends(sparse_fields(ResponseTodoList)),
+  db: Session = Depends(get_db),
+):
+  # fieldsを指定した場合はその列だけを読み込んで返す(ETag用のversionは常に読む)
+  columns = fields if fields is None or "version" in fields else (*fields, "version")
+  result = list_crud.get_todo_list(db, todo_list_id, columns)
   if result is None:
     raise HTTPException(status_code=404, detail="result not found")
+  response.headers["ETag"] = etag(result.version)
+  if fields is not None:
+    return fieldset.render(ResponseTodoList, fields, result, {"ETag": response.headers["ETag"]})
   return result
 
 # クライアントからのリクエストボディをNewTodoList型で受け取る
@@ -21,20 +36,66 @@ def get_todo_list(todo_list_id: int, db: Session = Depends(get_db)):
 def post_todo_list(todo_list: NewTodoList, db: Session = Depends(get_db)):
   return list_crud.post_todo_list(db, todo_list)
 
+# 項目ごとの読み書きをせず, DB内でリストを項目ごと複製する
+@router.post("/{todo_list_id}:duplicate", response_model=ResponseTodoList)
+def duplicate_todo_list(todo_list_id: int, data: DuplicateTodoList | None = None, db: Session = Depends(get_db)):
+  result = list_crud.duplicate_todo_list(db, todo_list_id, data or DuplicateTodoList())
+  if result is None:
+    raise HTTPException(status_code=404, detail="result not found")
+  return result
+
 @router.put("/{todo_list_id}", response_model=ResponseTodoList)
-def put_todo_list(todo_list_id: int, update_data: UpdateTodoList, db: Session = Depends(get_db)):
-  result = list_crud.put_todo_list(db, todo_list_id, update_data)
+def put_todo_list(
+  todo_list_id: int,
+  update_data: UpdateTodoList,
+  response: Response,
+  expected_version: int | None = Depends(if_match_version),
+  db: Session = Depends(get_db),
+):
+  try:
+    result = list_crud.put_todo_list(db, todo_list_id, update_data, expected_version)
+  except VersionMismatchError:
+    raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="version mismatch") from None
   if result is None:
     raise HTTPException(status_code=404, detail="result not found")
+  response.headers["ETag"] = etag(result.version)
   return result
 
 @router.delete("/{todo_list_id}", response_model=dict)
-def delete_todo_list(todo_list_id: int, db: Session = Depends(get_db)):
+def delete_todo_list(todo_list_id: int, background: bool = False, db: Session = Depends(get_db)):
+  if background:
+    # 項目の多いリストはジョブとして少しずつ削除する. 進捗は/jobs/{id}で確認できる
+    if list_crud.get_todo_list(db, todo_list_id, ("id",)) is None:
+      raise HTTPException(status_code=404, detail="result not found")
+    job = jobs.runner.submit("delete_list", {"todo_list_id": todo_list_id})
+    return JSONResponse(
+      {"job_id": job["id"]}, status_code=status.HTTP_202_ACCEPTED, headers={"Location": f"/jobs/{job['id']}"},
+    )
   result = list_crud.delete_todo_list(db, todo_list_id)
   if result is None:
     raise HTTPException(status_code=404, detail="result not found")
   return result
 
-@router.get("/", response_model=List[ResponseTodoList])
-def get_todo_lists(page: int, per_page: int, db: Session = Depends(get_db)):
-  return list_crud.get_todo_lists(db, page, per_page)
\ No newline at end of file
+@router.get("/", response_model=List[ResponseTodoList], dependencies=[Depends(route_deadline(const.LIST_DEADLINE_SECONDS))])
+def get_todo_lists(
+  page: int,
+  per_page: int,
+  request: Request,
+  response: Response,
+  exact_count: bool = False,
+  fields: tuple[str, ...] | None = Depends(sparse_fields(ResponseTodoList)),
+  db: Session = Depends(get_db),
+):
+  if page_cache.enabled():
+    # 同じ条件のページは, リストが次に作成・更新・削除されるまでキャッシュから返す
+    query = (*page_cache.normalize_page(page, per_page), exact_count, fields)
+    return page_cache.cache.response(request, page_cache.LISTS, query, lambda: (
+      fieldset.dump(ResponseTodoList, fields, list_crud.get_todo_lists(db, page, per_page, fields), many=True),
+      {"X-Total-Count": str(list_crud.count_todo_lists(db, exact_count))},
+    ))
+  # 総件数はヘッダで返す. 通常は概算(SQLiteでは実数)で, exact_count=trueの場合のみCOUNT(*)で数える
+  response.headers["X-Total-Count"] = str(list_crud.count_todo_lists(db, exact_count))
+  result = list_crud.get_todo_lists(db, page, per_page, fields)
+  if fields is not None:
+    return fieldset.render(ResponseTodoList, fields, result, {"X-Total-Count": response.headers["X-Total-Count"]}, many=True)
+  return result
\ No newline at end of file
@@ -0,0 +1,40 @@
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field
+
+from app import const
+
+
+class BatchOperation(BaseModel):
+    """バッチ内の1操作のスキーマ."""
+
+    method: Literal["POST", "PUT", "DELETE"] = Field(title="HTTP method of the operation")
+    path: str = Field(title="Path of the operation, e.g. /lists/@{list.id}/items")
+    body: dict[str, Any] | None = Field(default=None, title="Request body of the operation")
+    ref: str | None = Field(default=None, title="Name to refer to the result as @{name.field}", pattern=r"^\w+$")
+    if_match: int | None = Field(default=None, title="Expected version (same as If-Match)")
+
+
+class BatchRequest(BaseModel):
+    """バッチAPIのリクエストスキーマ."""
+
+    mode: Literal["all_or_nothing", "best_effort"] = Field(default="all_or_nothing", title="Commit mode")
+    operations: list[BatchOperation] = Field(title="Operations to run in order", min_length=1, max_length=const.BATCH_MAX_OPERATIONS)
+
+
+class BatchResult(BaseModel):
+    """バッチ内の1操作の結果."""
+
+    ref: str | None = None
+    status: int = Field(title="HTTP status code the operation would have returned")
+    body: Any = Field(default=None, title="Response body of the operation")
+    elapsed_ms: float = Field(title="Time spent on the operation")
+
+
+class BatchResponse(BaseModel):
+    """バッチAPIのレスポンススキーマ."""
+
+    mode: str
+    committed: bool = Field(title="Whether the changes were committed")
+    results: list[BatchResult]
+    elapsed_ms: float = Field(title="Time spent on the whole batch including the commit")
@@ -0,0 +1,49 @@
+"""疎なフィールドセット(``fields=id,title``)用のレスポンスモデル.
+
+指定された項目だけを持つモデルとそのシリアライザを, 元のモデルと項目の組ごとに一度だけ作って使い回す.
+"""
+
+from functools import lru_cache
+
+from pydantic import BaseModel, TypeAdapter, create_model
+from starlette.responses import Response
+
+
+def parse(model: type[BaseModel], fields: str) -> tuple[str, ...]:
+    """カンマ区切りの項目名を, モデルでの宣言順に並べて返す. 未知の項目名があればValueError."""
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    if not requested:
+        msg = "fields must not be empty"
+        raise ValueError(msg)
+    unknown = requested - model.model_fields.keys()
+    if unknown:
+        msg = f"unknown fields: {', '.join(sorted(unknown))}"
+        raise ValueError(msg)
+    return tuple(name for name in model.model_fields if name in requested)
+
+
+@lru_cache(maxsize=128)
+def partial_model(model: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    """modelのうちfieldsの項目だけを持つモデル."""
+    return create_model(
+        f"{model.__name__}[{','.join(fields)}]",
+        __doc__=model.__doc__,
+        **{name: (info.annotation, info) for name, info in model.model_fields.items() if name in fields},
+    )
+
+
+@lru_cache(maxsize=128)
+def _adapter(model: type[BaseModel], fields: tuple[str, ...], many: bool) -> TypeAdapter:
+    partial = partial_model(model, fields)
+    return TypeAdapter(list[partial] if many else partial)
+
+
+def dump(model: type[BaseModel], fields: tuple[str, ...] | None, content: object, many: bool = False) -> bytes:
+    """行(またはそのリスト)をfieldsの項目だけのJSONにする. fieldsがNoneの場合は全項目."""
+    adapter = _adapter(model, tuple(model.model_fields) if fields is None else fields, many)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def render(model: type[BaseModel], fields: tuple[str, ...], content: object, headers: dict | None = None, many: bool = False) -> Response:
+    """行(またはそのリスト)をfieldsの項目だけのJSONレスポンスにする."""
+    return Response(dump(model, fields, content, many), media_type="application/json", headers=headers)
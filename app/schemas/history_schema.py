@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, Field, Json
+
+
+class ResponseChange(BaseModel):
+    """変更履歴のレスポンススキーマ."""
+
+    id: int
+    todo_list_id: int
+    entity: str = Field(title="list or item")
+    entity_id: int | None = Field(default=None, title="Changed item ID (null for the list itself or bulk changes)")
+    action: str
+    version: int | None = Field(default=None, title="Version after the change")
+    changes: Json[dict[str, Any]] | None = Field(default=None, title="Changed values")
+    changed_at: datetime
@@ -11,6 +11,7 @@ class ResponseTodoItem(BaseModel):
     description: str | None = Field(default=None, title="Todo Item Description", min_length=1, max_length=200)
     status_code: TodoItemStatusCode = Field(title="Todo Status Code")
     due_at: datetime | None = Field(default=None, title="Todo Item Due")
+    version: int = Field(title="Version number for If-Match")
     created_at: datetime = Field(title="datetime that the item was created")
     updated_at: datetime = Field(title="datetime that the item was updated")
 
@@ -31,3 +32,14 @@ class UpdateTodoItem(BaseModel):
     complete: bool | None = Field(default=None, title="Set Todo Item status as completed")
 
 
+
+class MoveTodoItem(BaseModel):
+    """TODO項目の並び替え時のスキーマ."""
+
+    after_id: int | None = Field(default=None, title="Move after this Todo Item (top of the list if null)")
+
+class MoveTodoItems(BaseModel):
+    """TODO項目の一括移動時のスキーマ."""
+
+    target_list_id: int = Field(title="Todo List to move the items to")
+    item_ids: list[int] | None = Field(default=None, title="Todo Items to move (all items if null)")
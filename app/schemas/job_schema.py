@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+
+class NewJob(BaseModel):
+    """ジョブ登録時のスキーマ."""
+
+    kind: str = Field(title="Job kind", min_length=1, max_length=50)
+    params: dict[str, Any] = Field(default_factory=dict, title="Job parameters")
+
+
+class ResponseJob(BaseModel):
+    """ジョブのレスポンススキーマ."""
+
+    id: int
+    kind: str
+    params: dict[str, Any]
+    status: str = Field(title="queued, running, succeeded, failed or cancelled")
+    progress: int = Field(title="Units of work done")
+    total: int | None = Field(default=None, title="Units of work in total, if known")
+    result: Any = Field(default=None, title="Result of a succeeded job")
+    error: str | None = None
+    cancel_requested: bool
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+    finished_at: datetime | None = None
@@ -21,5 +21,11 @@ class ResponseTodoList(BaseModel):
     id: int
     title: str = Field(title="Todo List Title", min_length=1, max_length=100)
     description: str | None = Field(default=None, title="Todo List Description", min_length=1, max_length=200)
+    version: int = Field(title="Version number for If-Match")
     created_at: datetime = Field(title="datetime that the item was created")
-    updated_at: datetime = Field(title="datetime that the item was updated")
\ No newline at end of file
+    updated_at: datetime = Field(title="datetime that the item was updated")
+
+class DuplicateTodoList(BaseModel):
+    """TODOリスト複製時のスキーマ."""
+
+    title: str | None = Field(default=None, title="Title of the copy (same as the original if null)", min_length=1, max_length=100)
@@ -0,0 +1,78 @@
+"""本番用のサーバ起動モジュール.
+
+Gunicornのマスタープロセスでアプリを読み込んでから(preload)Uvicornワーカーをforkする.
+
+    python -m app.server
+"""
+
+import os
+
+from gunicorn.app.base import BaseApplication
+
+from app import const
+
+
+def cpu_count() -> int:
+    """このプロセスが使用できるCPU数."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # sched_getaffinityが無いOS
+        return os.cpu_count() or 1
+
+
+def default_workers() -> int:
+    """ワーカー数. WEB_CONCURRENCYが指定されていなければCPU数(上限MAX_WORKERS)."""
+    if const.WEB_CONCURRENCY > 0:
+        return const.WEB_CONCURRENCY
+    return max(1, min(cpu_count(), const.MAX_WORKERS))
+
+
+def post_fork(_server, _worker) -> None:  # noqa: ANN001
+    """fork前に作られた接続をワーカー間で共有しないよう, 接続プールを作り直す."""
+    from app import database, sharding  # noqa: PLC0415
+
+    if database.engine_created():
+        database.get_engine().dispose(close=False)
+    if sharding.router_created():
+        sharding.get_router().dispose()
+
+
+def options() -> dict:
+    return {
+        "bind": f"{const.APP_HOST}:{const.APP_PORT}",
+        "workers": default_workers(),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "keepalive": const.KEEPALIVE_SECONDS,
+        "backlog": const.BACKLOG,
+        "max_requests": const.MAX_REQUESTS,
+        "max_requests_jitter": const.MAX_REQUESTS_JITTER,
+        "graceful_timeout": const.GRACEFUL_TIMEOUT_SECONDS,
+        "post_fork": post_fork,
+        "accesslog": None,
+    }
+
+
+class Server(BaseApplication):
+    """設定ファイルを使わずにGunicornを起動するためのアプリケーション."""
+
+    def __init__(self, settings: dict) -> None:
+        self.settings = settings
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.settings.items():
+            self.cfg.set(key, value)
+
+    def load(self):  # noqa: ANN201
+        from app.main import app  # noqa: PLC0415
+
+        return app
+
+
+def main() -> None:
+    Server(options()).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""todo_list_id単位の水平シャーディング.
+
+既定のDBをシャード0とし, ``SHARD_URLS`` で追加のシャードを指定する. todo_list_idは
+``todo_list_id % SHARD_BUCKETS`` でバケットに分け, バケットごとに所属するシャードを
+``SHARD_MAP_PATH`` のJSONファイルで管理する. ファイルが無い場合は全バケットがシャード0なので,
+シャードを追加しただけではデータの置き場所は変わらない.
+
+- リクエストのDBセッションはパスの ``todo_list_id`` のシャードに接続する(``dependencies.get_db``)
+- リストと項目, 変更履歴のIDはシャード0の ``id_blocks`` から払い出し, シャードをまたいで一意にする
+- ``GET /lists/`` は全シャードに問い合わせて結果をID順にマージする
+
+バケットの移動はコマンドで行う. 移動中はそのバケットへの書き込みを止め, 移動後にワーカーを再起動すること.
+
+    python -m app.sharding status
+    python -m app.sharding plan --write
+    python -m app.sharding move --bucket 3 --to 1
+"""
+
+import argparse
+import contextvars
+import json
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import const, database, sqlite
+from app.database import SessionLocal
+from app.models.archive_model import ArchivedItemModel
+from app.models.history_model import HistoryModel, OutboxModel
+from app.models.id_block_model import IdBlockModel
+from app.models.item_model import ItemModel
+from app.models.list_model import ListModel
+
+lists_table = ListModel.__table__
+items_table = ItemModel.__table__
+archive_table = ArchivedItemModel.__table__
+history_table = HistoryModel.__table__
+outbox_table = OutboxModel.__table__
+id_blocks_table = IdBlockModel.__table__
+
+# 払い出すIDの名前と, 既存の最大値を調べるテーブル
+ID_TABLES = {
+    "todo_lists": (lists_table,),
+    "todo_items": (items_table, archive_table),
+    "change_history": (history_table, outbox_table),
+}
+
+# バケットの移動でコピーするテーブルと, todo_list_idを持つ列. 送信待ちの変更はidを除いてコピーし, コピー先で採番し直す
+BUCKET_TABLES = (
+    (lists_table, "id"),
+    (items_table, "todo_list_id"),
+    (archive_table, "todo_list_id"),
+    (history_table, "todo_list_id"),
+    (outbox_table, "todo_list_id"),
+)
+
+RESERVE_BLOCK = (
+    update(id_blocks_table)
+    .where(id_blocks_table.c.name == bindparam("block_name"))
+    .values(next_id=id_blocks_table.c.next_id + bindparam("size"))
+)
+SELECT_BLOCK = select(id_blocks_table.c.next_id).where(id_blocks_table.c.name == bindparam("block_name"))
+
+
+class IdAllocator:
+    """シャードをまたいで一意なIDを払い出す.
+
+    1つのDBに毎回問い合わせないよう, block_size個ずつ予約してプロセス内で払い出す.
+    """
+
+    def __init__(self, engine: Engine, block_size: int, initial_value: Callable[[str], int]) -> None:
+        self.engine = engine
+        self.block_size = block_size
+        self.initial_value = initial_value
+        self._blocks: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def next_id(self, name: str) -> int:
+        with self._lock:
+            current, end = self._blocks.get(name, (0, 0))
+            if current >= end:
+                current = self._reserve(name)
+                end = current + self.block_size
+            self._blocks[name] = (current + 1, end)
+            return current
+
+    def reserve(self, name: str, count: int) -> int:
+        """連続したcount個のIDを予約し, 先頭の値を返す(まとめて挿入する場合に使う)."""
+        with self._lock:
+            return self._reserve(name, count)
+
+    def _reserve(self, name: str, size: int | None = None) -> int:
+        """size個(既定はblock_size個)のIDを予約し, 先頭の値を返す."""
+        size = size or self.block_size
+        params = {"block_name": name, "size": size}
+        while True:
+            with self.engine.begin() as conn:
+                if conn.execute(RESERVE_BLOCK, params).rowcount:
+                    return conn.execute(SELECT_BLOCK, params).scalar_one() - size
+                start = self.initial_value(name)
+                try:
+                    conn.execute(insert(id_blocks_table), {"name": name, "next_id": start + size})
+                except IntegrityError:
+                    # 他のプロセスが同時に作成した. 予約し直す
+                    continue
+                return start
+
+
+class ShardRouter:
+    """todo_list_idからシャード(エンジン)を決める."""
+
+    def __init__(self, engines: list[Engine], bucket_map: list[int], block_size: int = const.SHARD_ID_BLOCK_SIZE) -> None:
+        if any(shard >= len(engines) for shard in bucket_map):
+            msg = "bucket map refers to an unknown shard"
+            raise ValueError(msg)
+        self.engines = engines
+        self.bucket_map = bucket_map
+        self.allocator = IdAllocator(engines[0], block_size, self.max_id)
+        self._executor = ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix="shard")
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.engines)
+
+    def bucket_for(self, todo_list_id: int) -> int:
+        return todo_list_id % len(self.bucket_map)
+
+    def shard_for(self, todo_list_id: int) -> int:
+        return self.bucket_map[self.bucket_for(todo_list_id)]
+
+    def session_for(self, todo_list_id: int) -> Session:
+        return SessionLocal.session_factory(bind=self.engines[self.shard_for(todo_list_id)])
+
+    def next_id(self, name: str) -> int:
+        return self.allocator.next_id(name)
+
+    def next_id_on(self, name: str, shard: int) -> int:
+        """shardに置かれるIDを払い出す(他のシャードになるIDは読み飛ばす)."""
+        # 連続したIDは全バケットを順に巡るので, バケット数の数倍あれば必ず見つかる
+        for _ in range(len(self.bucket_map) * 4):
+            next_id = self.allocator.next_id(name)
+            if self.shard_for(next_id) == shard:
+                return next_id
+        msg = f"no bucket is mapped to shard {shard}"
+        raise ValueError(msg)
+
+    def reserve_ids(self, name: str, count: int) -> int:
+        return self.allocator.reserve(name, count)
+
+    def max_id(self, name: str) -> int:
+        """全シャードの既存IDの最大値+1を返す(採番の初期値)."""
+        maximum = 0
+        for engine in self.engines:
+            # 採番のトランザクションの中から呼ばれるので, 書き込みキューを待たずに読む
+            with database.read_only_engine(engine).connect() as conn:
+                for table in ID_TABLES[name]:
+                    maximum = max(maximum, conn.execute(select(func.max(table.c.id))).scalar_one() or 0)
+        return maximum + 1
+
+    def scatter(self, operation: Callable[[Session], object]) -> list:
+        """全シャードで読み込みだけのoperation(db)を並行に実行し, シャード順の結果のリストを返す.
+
+        リクエストの締め切りが伝わるよう, 呼び出し元のコンテキストで実行する.
+        """
+        def run(engine: Engine) -> object:
+            with SessionLocal.session_factory(bind=engine, info={sqlite.READ_ONLY: True}) as db:
+                return operation(db)
+
+        futures = [self._executor.submit(contextvars.copy_context().run, run, engine) for engine in self.engines]
+        return [future.result() for future in futures]
+
+    def dispose(self) -> None:
+        for engine in self.engines[1:]:
+            engine.dispose(close=False)
+
+
+def load_bucket_map(path: str, buckets: int) -> list[int]:
+    if not Path(path).exists():
+        return [0] * buckets
+    bucket_map = json.loads(Path(path).read_text())
+    if len(bucket_map) != buckets:
+        msg = f"{path} has {len(bucket_map)} buckets, expected {buckets}"
+        raise ValueError(msg)
+    return bucket_map
+
+
+def save_bucket_map(path: str, bucket_map: list[int]) -> None:
+    Path(path).write_text(json.dumps(bucket_map))
+
+
+def plan_bucket_map(bucket_map: list[int], shard_count: int) -> list[int]:
+    """各シャードのバケット数が均等になるよう, 移動するバケットが最小になる対応を返す."""
+    new_map = list(bucket_map)
+    buckets_of = {shard: [b for b, s in enumerate(new_map) if s == shard] for shard in range(shard_count)}
+    target = len(new_map) // shard_count
+    spare = []
+    for shard in range(shard_count):
+        # 多すぎるシャードからは後ろのバケットを外す(余りの分は先頭のシャードに残す)
+        limit = target + (1 if shard < len(new_map) % shard_count else 0)
+        spare.extend(buckets_of[shard][limit:])
+        buckets_of[shard] = buckets_of[shard][:limit]
+    for shard in range(shard_count):
+        limit = target + (1 if shard < len(new_map) % shard_count else 0)
+        while len(buckets_of[shard]) < limit:
+            bucket = spare.pop()
+            buckets_of[shard].append(bucket)
+            new_map[bucket] = shard
+    return new_map
+
+
+def copy_bucket(router: ShardRouter, bucket: int, target: int, chunk_size: int = 500) -> int:
+    """バケットに属するリスト, 項目, アーカイブ済み項目と変更履歴をtargetのシャードへコピーし, 行数を返す.
+
+    targetに途中までコピーされた行があれば置き換えるので, 何度実行してもよい.
+    """
+    source = router.engines[router.bucket_map[bucket]]
+    in_bucket = (lists_table.c.id % len(router.bucket_map)) == bucket
+    copied = 0
+    with source.connect() as src:
+        list_ids = src.execute(select(lists_table.c.id).where(in_bucket).order_by(lists_table.c.id)).scalars().all()
+        for n in range(0, len(list_ids), chunk_size):
+            chunk = list_ids[n:n + chunk_size]
+            with router.engines[target].begin() as dst:
+                _delete_lists(dst, chunk)
+                for table, column in BUCKET_TABLES:
+                    query = select(table).where(table.c[column].in_(chunk))
+                    if table is outbox_table:
+                        query = query.order_by(outbox_table.c.id)
+                    rows = src.execution_options(stream_results=True).execute(query)
+                    for partition in rows.mappings().partitions(chunk_size):
+                        values = [dict(row) for row in partition]
+                        if table is outbox_table:
+                            for row in values:
+                                del row["id"]
+                        dst.execute(insert(table), values)
+                        copied += len(partition)
+    return copied
+
+
+def purge_bucket(router: ShardRouter, bucket: int, shard: int, chunk_size: int = 500) -> int:
+    """移動後, 元のシャードに残ったバケットの行を削除し, リスト数を返す."""
+    in_bucket = (lists_table.c.id % len(router.bucket_map)) == bucket
+    engine = router.engines[shard]
+    with engine.connect() as conn:
+        list_ids = conn.execute(select(lists_table.c.id).where(in_bucket)).scalars().all()
+    for n in range(0, len(list_ids), chunk_size):
+        with engine.begin() as conn:
+            _delete_lists(conn, list_ids[n:n + chunk_size])
+    return len(list_ids)
+
+
+def _delete_lists(conn, list_ids: list[int]) -> None:  # noqa: ANN001
+    conn.execute(delete(outbox_table).where(outbox_table.c.todo_list_id.in_(list_ids)))
+    conn.execute(delete(history_table).where(history_table.c.todo_list_id.in_(list_ids)))
+    conn.execute(delete(archive_table).where(archive_table.c.todo_list_id.in_(list_ids)))
+    conn.execute(delete(items_table).where(items_table.c.todo_list_id.in_(list_ids)))
+    conn.execute(delete(lists_table).where(lists_table.c.id.in_(list_ids)))
+
+
+def _bucket_has_lists(router: ShardRouter, bucket: int, shard: int) -> bool:
+    in_bucket = (lists_table.c.id % len(router.bucket_map)) == bucket
+    with router.engines[shard].connect() as conn:
+        return conn.execute(select(lists_table.c.id).where(in_bucket).limit(1)).first() is not None
+
+
+def move_bucket(router: ShardRouter, bucket: int, target: int, map_path: str) -> int:
+    """バケットをtargetのシャードへ移し, 対応表を保存してから元のシャードの行を削除する."""
+    source = router.bucket_map[bucket]
+    if source == target:
+        return 0
+    copied = copy_bucket(router, bucket, target)
+    router.bucket_map[bucket] = target
+    save_bucket_map(map_path, router.bucket_map)
+    purge_bucket(router, bucket, source)
+    return copied
+
+
+_router: ShardRouter | None = None
+_router_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(const.SHARD_URLS)
+
+
+def get_router() -> ShardRouter:
+    """シャードの振り分けを返す. 未作成なら作成する."""
+    global _router  # noqa: PLW0603
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                engines = [database.get_engine(), *[database._create_engine(url) for url in const.SHARD_URLS]]  # noqa: SLF001
+                _router = ShardRouter(engines, load_bucket_map(const.SHARD_MAP_PATH, const.SHARD_BUCKETS))
+    return _router
+
+
+def router_created() -> bool:
+    return _router is not None
+
+
+def engines() -> list[Engine | None]:
+    """全シャードのエンジン. シャーディングしない場合は既定のエンジン(None)のみ."""
+    if not enabled():
+        return [None]
+    return get_router().engines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="シャードのバケットを管理する")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="シャードごとのバケット数とリスト数を表示する")
+    plan = commands.add_parser("plan", help="バケットが均等になる対応表を作る")
+    plan.add_argument("--write", action="store_true", help="空のDBに対して対応表を保存する(データは移動しない)")
+    move = commands.add_parser("move", help="バケットを別のシャードへ移す")
+    move.add_argument("--bucket", type=int, required=True)
+    move.add_argument("--to", type=int, required=True)
+    args = parser.parse_args()
+
+    router = get_router()
+    if args.command == "status":
+        counts = router.scatter(lambda db: db.execute(select(func.count()).select_from(lists_table)).scalar_one())
+        for shard, count in enumerate(counts):
+            print(f"shard {shard}: {router.bucket_map.count(shard)} buckets, {count} lists")
+    elif args.command == "plan":
+        new_map = plan_bucket_map(router.bucket_map, router.shard_count)
+        moves = [(b, router.bucket_map[b], s) for b, s in enumerate(new_map) if router.bucket_map[b] != s]
+        for bucket, source, target in moves:
+            print(f"python -m app.sharding move --bucket {bucket} --to {target}  # from shard {source}")
+        if args.write:
+            if any(_bucket_has_lists(router, bucket, source) for bucket, source, _ in moves):
+                parser.error("buckets to be moved have data; use the move command instead")
+            save_bucket_map(const.SHARD_MAP_PATH, new_map)
+    else:
+        print(move_bucket(router, args.bucket, args.to, const.SHARD_MAP_PATH))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""スロークエリの記録.
+
+エンジンのイベントで文ごとの実行時間を測り, ``SLOW_QUERY_MS`` を超えたものを
+ルート, パラメータの形(値は記録しない), 実行時間, 行数とともに記録する.
+SELECT文は別スレッドでEXPLAINを取って記録に加える(リクエストは待たせない).
+
+記録は直近 ``SLOW_QUERY_KEEP`` 件をリングバッファに保持して管理用APIから参照でき,
+同じ内容をJSONの構造化ログ(``app.slow_query`` ロガー)にも出力する.
+"""
+
+import contextvars
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app import const
+
+logger = logging.getLogger(__name__)
+
+_current_scope: contextvars.ContextVar[Scope | None] = contextvars.ContextVar("current_scope", default=None)
+
+_START_KEY = "slow_query_start"
+# EXPLAIN用の接続で実行した文は記録しない
+_SKIP_OPTION = "slow_query_skip"
+
+
+def current_route() -> str | None:
+    """実行中のリクエストのルート(パスのテンプレート). ルーティング前はパスそのもの."""
+    scope = _current_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path")
+    return f"{scope.get('method', 'WS')} {path}"
+
+
+def parameter_shape(parameters: object, executemany: bool) -> object:
+    """パラメータの値を除いた形(型名)を返す."""
+    if executemany:
+        return {"executemany": len(parameters), "each": parameter_shape(parameters[0], False) if parameters else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class SlowQueryLog:
+    """スロークエリの記録を保持し, EXPLAINを別スレッドで取る."""
+
+    def __init__(self, keep: int, explain: bool = True, explain_queue_size: int = 16) -> None:
+        self.records: deque[dict] = deque(maxlen=keep)
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=explain_queue_size)
+        self._thread: threading.Thread | None = None
+
+    def record(  # noqa: PLR0913
+        self,
+        engine: Engine,
+        statement: str,
+        parameters: object,
+        shape: object,
+        duration: float,
+        rows: int | None,
+        *,
+        executemany: bool = False,
+    ) -> dict:
+        """記録を追加する. parametersはEXPLAIN用のドライバに渡す値, shapeは記録用の形."""
+        entry = {
+            "at": time.time(),
+            "route": current_route(),
+            "statement": statement,
+            "parameters": shape,
+            "duration_ms": round(duration * 1000, 3),
+            "rows": rows,
+            "plan": None,
+        }
+        with self._lock:
+            self.records.append(entry)
+        if self.explain and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            try:
+                self._queue.put_nowait((engine, entry, statement, parameters))
+            except queue.Full:
+                # EXPLAINが追いつかない場合は取らない
+                self._log(entry)
+            else:
+                self._ensure_started()
+        else:
+            self._log(entry)
+        return entry
+
+    def entries(self) -> list[dict]:
+        """新しい順の記録."""
+        with self._lock:
+            return list(reversed(self.records))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
+
+    def join(self) -> None:
+        """取得待ちのEXPLAINが無くなるまで待つ."""
+        self._queue.join()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            engine, entry, statement, parameters = self._queue.get()
+            try:
+                entry["plan"] = explain(engine, statement, parameters)
+            except Exception as exc:  # noqa: BLE001 記録は残す
+                entry["plan"] = f"EXPLAIN failed: {exc}"
+            self._log(entry)
+            self._queue.task_done()
+
+    def _log(self, entry: dict) -> None:
+        logger.warning(json.dumps({"event": "slow_query", **entry}, default=str, ensure_ascii=False))
+
+
+def explain(engine: Engine, statement: str, parameters: object) -> list:
+    """文の実行計画を行のリストで返す."""
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        conn.execution_options(**{_SKIP_OPTION: True})
+        result = conn.exec_driver_sql(prefix + statement, parameters)
+        return [dict(row._mapping) for row in result]  # noqa: SLF001
+
+
+slow_query_log = SlowQueryLog(const.SLOW_QUERY_KEEP, const.SLOW_QUERY_EXPLAIN)
+
+
+def enabled() -> bool:
+    return const.SLOW_QUERY_MS > 0
+
+
+def register_engine_events(engine: Engine, threshold_ms: float = const.SLOW_QUERY_MS, log: SlowQueryLog = slow_query_log) -> None:
+    """文の実行時間を測り, threshold_msを超えたものを記録するイベントをエンジンに登録する."""
+    threshold = threshold_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001, ARG001, PLR0913, PLR0917
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001, ARG001, PLR0913, PLR0917
+        duration = time.perf_counter() - conn.info[_START_KEY].pop()
+        if duration < threshold or conn.get_execution_options().get(_SKIP_OPTION):
+            return
+        rows = cursor.rowcount if cursor.rowcount >= 0 else None
+        # 名前付きのパラメータがあればそちらの形を記録する
+        if context is not None and context.compiled is not None:
+            compiled = context.compiled_parameters
+            shape = parameter_shape(compiled if executemany else compiled[0], executemany)
+        else:
+            shape = parameter_shape(parameters, executemany)
+        log.record(conn.engine, statement, parameters, shape, duration, rows, executemany=executemany)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context) -> None:  # noqa: ANN001
+        if context.connection is not None and context.connection.info.get(_START_KEY):
+            context.connection.info[_START_KEY].pop()
+
+
+class QueryContextMiddleware:
+    """スロークエリの記録にルートを残すため, 実行中のリクエストを覚えておくASGIミドルウェア."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # ルーティング時に同じscopeへrouteが書き込まれるので, scopeごと保持する
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
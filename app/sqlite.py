@@ -0,0 +1,103 @@
+"""組み込みSQLiteバックエンド用の設定.
+
+WALモードと調整済みのPRAGMAを接続ごとに適用し, 書き込みトランザクションは
+プロセス内の単一ライターキューで順番に実行する. WALでは読み込みは書き込みを待たない.
+
+トランザクションは既定で ``BEGIN IMMEDIATE`` で始め, 開始時にライターキューの順番を取る.
+読み込んだスナップショットのまま書き込むトランザクションでも, 途中で書き込みロックへの
+昇格に失敗しない. 書き込まないセッションは ``info`` に :data:`READ_ONLY` を設定すると
+通常の ``BEGIN`` で始まり, キューを待たない(``database.LazyEngineSession`` が実行オプションに変換する).
+"""
+
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+# 接続時に適用するPRAGMA
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+    "cache_size": "-16000",     # 約16MB
+    "mmap_size": "134217728",   # 128MB
+}
+
+# 読み込みだけのトランザクションを示すセッションのinfoのキー兼実行オプション名
+READ_ONLY = "sqlite_read_only"
+
+_WRITE_LOCK_KEY = "sqlite_writer_ticket"
+
+
+class WriterQueue:
+    """書き込みトランザクションを到着順に1つずつ通すキュー."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned: set[int] = set()
+
+    def acquire(self, timeout: float | None = None) -> int:
+        """順番が来るまで待ってチケットを返す. timeout秒以内に来なければTimeoutErrorを送出する."""
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            if not self._cond.wait_for(lambda: self._serving == ticket, timeout):
+                # 順番が来たときに飛ばせるよう, 諦めたチケットを覚えておく
+                self._abandoned.add(ticket)
+                raise TimeoutError
+            return ticket
+
+    def release(self) -> None:
+        with self._cond:
+            self._serving += 1
+            while self._serving in self._abandoned:
+                self._abandoned.remove(self._serving)
+                self._serving += 1
+            self._cond.notify_all()
+
+
+def configure_engine(engine: Engine, busy_timeout_ms: int) -> WriterQueue:
+    """SQLite用のPRAGMA設定, トランザクション制御, 単一ライターキューをエンジンに登録する."""
+    writers = WriterQueue()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _) -> None:  # noqa: ANN001
+        # pysqliteの暗黙のBEGINを止め, SAVEPOINTが正しく動くようにSQLAlchemy側でBEGINを発行する
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+        for name, value in PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn) -> None:  # noqa: ANN001
+        if conn.get_execution_options().get(READ_ONLY):
+            conn.exec_driver_sql("BEGIN")
+            return
+        # 書き込みロックは最初に取る. 読み込み後の昇格はスナップショットが古いと即座に失敗するため
+        try:
+            conn.info[_WRITE_LOCK_KEY] = writers.acquire(busy_timeout_ms / 1000)
+        except TimeoutError:
+            # MySQLだけを使う場合に読み込まないよう, ここで読み込む
+            import sqlite3  # noqa: PLC0415
+
+            raise OperationalError("BEGIN IMMEDIATE", None, sqlite3.OperationalError("database is locked")) from None
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        except BaseException:
+            _release_writer(conn)
+            raise
+
+    def _release_writer(conn) -> None:  # noqa: ANN001
+        if conn.info.pop(_WRITE_LOCK_KEY, None) is not None:
+            writers.release()
+
+    event.listen(engine, "commit", _release_writer)
+    event.listen(engine, "rollback", _release_writer)
+
+    return writers
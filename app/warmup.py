@@ -0,0 +1,134 @@
+"""起動時のウォームアップと準備完了状態.
+
+接続は最初に使う時に開くので, そのままだと起動直後のリクエストが接続の確立(TCP, 認証, 文字コードの設定)を待つ.
+起動時にバックグラウンドで各エンジンの接続プールを ``WARMUP_CONNECTIONS`` 本まで開き,
+それぞれの接続でよく使う文を実行して, 文のコンパイル結果とDB側のスキーマ情報をキャッシュさせておく.
+
+ウォームアップが終わるまで ``/readyz`` は503を返すので, ロードバランサは準備のできたワーカーにだけ振り分ける.
+DBに接続できなかった場合は ``WARMUP_RETRY_SECONDS`` 秒ごとに再試行する.
+"""
+
+import logging
+import threading
+import time
+
+from sqlalchemy.engine import Engine
+
+from app import const, database, sharding
+from app.crud import item_crud, list_crud
+
+logger = logging.getLogger(__name__)
+
+STARTING = "starting"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+STOPPING = "stopping"
+
+# 接続ごとに実行する代表的な読み込み. 結果は使わない
+WARMUP_STATEMENTS = (
+    (list_crud.SELECT_LISTS_PAGE, {"offset": 0, "limit": 1}),
+    (list_crud.SELECT_LIST, {"todo_list_id": 0}),
+    (item_crud.SELECT_LIST_EXISTS, {"todo_list_id": 0}),
+    (item_crud.SELECT_ITEM, {"todo_item_id": 0, "todo_list_id": 0}),
+    (item_crud.SELECT_ITEMS_PAGE, {"todo_list_id": 0, "offset": 0, "limit": 1}),
+)
+
+
+def _engines() -> list[Engine]:
+    return [engine or database.get_engine() for engine in sharding.engines()]
+
+
+def warm_engine(engine: Engine, connections: int) -> int:
+    """接続をconnections本(プールの大きさまで)同時に開いて文を実行し, プールに戻す. 開いた本数を返す."""
+    size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    opened = []
+    try:
+        for _ in range(min(connections, size)):
+            conn = engine.connect()
+            opened.append(conn)
+            for statement, params in WARMUP_STATEMENTS:
+                conn.execute(statement, params).all()
+            conn.rollback()
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+def pool_status(engine: Engine) -> dict:
+    """接続プールの状態. 接続を取り出さずに調べる."""
+    pool = engine.pool
+    if not hasattr(pool, "size"):
+        return {}
+    return {"size": pool.size(), "idle": pool.checkedin(), "in_use": pool.checkedout(), "overflow": pool.overflow()}
+
+
+class Warmup:
+    """ウォームアップを実行するバックグラウンドスレッドと準備完了状態."""
+
+    def __init__(
+        self, connections: int = const.WARMUP_CONNECTIONS, retry_seconds: float = const.WARMUP_RETRY_SECONDS,
+    ) -> None:
+        self.connections = connections
+        self.retry_seconds = retry_seconds
+        self.status = STARTING
+        self.error: str | None = None
+        self.attempts = 0
+        self.elapsed_ms: float | None = None
+        self.opened = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def run(self) -> bool:
+        """ウォームアップを1回実行し, 成功したかどうかを返す."""
+        self.status = WARMING
+        self.attempts += 1
+        start = time.perf_counter()
+        try:
+            if self.connections > 0:
+                self.opened = sum(warm_engine(engine, self.connections) for engine in _engines())
+        except Exception as exc:
+            self.status = FAILED
+            self.error = f"{type(exc).__name__}: {exc}"
+            logger.warning("warmup failed: %s", self.error)
+            return False
+        self.elapsed_ms = (time.perf_counter() - start) * 1000
+        self.error = None
+        if not self._stop.is_set():
+            self.status = READY
+        return True
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止中は準備完了を取り下げ, 新しいリクエストが振り分けられないようにする."""
+        self.status = STOPPING
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def report(self) -> dict:
+        report = {"status": self.status, "attempts": self.attempts, "connections": self.opened}
+        if self.elapsed_ms is not None:
+            report["warmup_ms"] = round(self.elapsed_ms, 1)
+        if self.error is not None:
+            report["error"] = self.error
+        if database.engine_created():
+            report["pool"] = pool_status(database.get_engine())
+        return report
+
+    def _run(self) -> None:
+        while not self.run() and not self._stop.wait(self.retry_seconds):
+            pass
+
+
+warmer = Warmup()
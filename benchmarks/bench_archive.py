@@ -0,0 +1,85 @@
+"""アーカイブ前後で, 通常の一覧・取得処理の実行時間を比較するベンチマーク.
+
+一時ファイルのSQLiteをマイグレーションで作成し, リストごとに項目を作る(既定では9割が完了済みで古い).
+アーカイブ前に計測し, 完了済みの項目をアーカイブしてから同じ処理をもう一度計測する.
+
+    python -m benchmarks.bench_archive --lists 20 --items 10000 --completed 0.9
+"""
+
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import timeit
+from pathlib import Path
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_archive.sqlite3")  # noqa: PTH118
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.archive import archive_completed_items  # noqa: E402
+from app.crud import item_crud  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models.item_model import ItemModel  # noqa: E402
+from app.models.list_model import ListModel  # noqa: E402
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+OLD = datetime.datetime(2020, 1, 1)
+
+
+def setup(lists: int, items: int, completed: float) -> None:
+    command.upgrade(Config(str(ROOT_DIR / "alembic.ini")), "head")
+    rng = random.Random(0)
+    with SessionLocal.session_factory() as db:
+        db.execute(insert(ListModel), [{"id": n, "title": f"list {n}", "item_count": items} for n in range(1, lists + 1)])
+        for todo_list_id in range(1, lists + 1):
+            rows = []
+            for n in range(items):
+                done = rng.random() < completed
+                rows.append({
+                    "todo_list_id": todo_list_id,
+                    "title": f"item {n}",
+                    "status_code": 2 if done else 1,
+                    "updated_at": OLD if done else datetime.datetime.now(),  # noqa: DTZ005
+                })
+            db.execute(insert(ItemModel), rows)
+        db.commit()
+
+
+def measure(number: int, lists: int) -> dict[str, float]:
+    with SessionLocal.session_factory() as db:
+        last_page = max(item_crud.count_todo_items(db, 1) // 20, 1)
+        cases = {
+            "get_todo_items (page 1)": lambda: item_crud.get_todo_items(db, random.randint(1, lists), 1, 20),
+            "get_todo_items (last page)": lambda: item_crud.get_todo_items(db, random.randint(1, lists), last_page, 20),
+            "count_todo_items (exact)": lambda: item_crud.count_todo_items(db, random.randint(1, lists), exact=True),
+            "get_todo_item": lambda: item_crud.get_todo_item(db, 1, 1),
+        }
+        return {name: min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6 for name, func in cases.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lists", type=int, default=20)
+    parser.add_argument("--items", type=int, default=10000, help="リストごとの項目数")
+    parser.add_argument("--completed", type=float, default=0.9, help="完了済みで古い項目の割合")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    setup(args.lists, args.items, args.completed)
+    before = measure(args.number, args.lists)
+    moved = archive_completed_items(older_than_days=30)
+    after = measure(args.number, args.lists)
+
+    print(f"archived {moved} of {args.lists * args.items} items")
+    print(f"{'query':<28} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    for name in before:
+        print(f"{name:<28} {before[name]:>10.1f} {after[name]:>10.1f} {before[name] / after[name]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
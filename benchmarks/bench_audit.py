@@ -0,0 +1,80 @@
+"""変更履歴の記録が書き込みに加える時間のベンチマーク.
+
+一時ファイルのSQLiteをマイグレーションで作成し, 項目の作成と更新を ``--writes`` 回ずつ,
+変更履歴を記録しない場合・送信待ちに追加する場合(既定)・変更履歴テーブルへ直接書く場合で比較する.
+最後に送信待ちの変更を変更履歴へ移す速さを計測する.
+
+    python -m benchmarks.bench_audit --writes 2000
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_audit.sqlite3")  # noqa: PTH118
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import audit, const  # noqa: E402
+from app.crud import item_crud, list_crud  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.schemas.item_schema import NewTodoItem, UpdateTodoItem  # noqa: E402
+from app.schemas.list_schema import NewTodoList  # noqa: E402
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def measure(name: str, writes: int) -> None:
+    with SessionLocal.session_factory() as db:
+        todo_list_id = list_crud.post_todo_list(db, NewTodoList(title=name)).id
+        start = time.perf_counter()
+        for n in range(writes):
+            item = item_crud.post_todo_item(db, todo_list_id, NewTodoItem(title=f"item {n}"))
+            item_crud.put_todo_item(db, todo_list_id, item.id, UpdateTodoItem(title=f"renamed {n}", complete=True))
+        elapsed = time.perf_counter() - start
+    print(f"{name:<16} {elapsed / (writes * 2) * 1e6:>8.1f} us/write")
+
+
+_direct_ids = itertools.count(10**9)
+
+
+def record_directly(db, todo_list_id, entity, entity_id, action, version=None, changes=None) -> None:  # noqa: ANN001, PLR0913, PLR0917
+    """比較用: 送信待ちを経由せず, 変更履歴テーブルに同期で書く."""
+    db.execute(insert(audit.history_table), {
+        "todo_list_id": todo_list_id, "id": next(_direct_ids), "entity": entity, "entity_id": entity_id,
+        "action": action, "version": version, "changes": None if not changes else str(changes),
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+    command.upgrade(Config(str(ROOT_DIR / "alembic.ini")), "head")
+
+    const.AUDIT = False
+    measure("no audit", args.writes)
+    const.AUDIT = True
+    measure("outbox", args.writes)
+
+    pending = args.writes * 2 + 1
+    start = time.perf_counter()
+    flushed = audit.flush()
+    elapsed = time.perf_counter() - start
+    assert flushed == pending, (flushed, pending)
+    print(f"{'flush':<16} {flushed / elapsed:>8.0f} rows/s")
+
+    original = audit.record
+    audit.record = record_directly
+    measure("synchronous", args.writes)
+    audit.record = original
+
+
+if __name__ == "__main__":
+    main()
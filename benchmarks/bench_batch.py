@@ -0,0 +1,71 @@
+"""同じ書き込みを個別のAPI呼び出しで行った場合と, バッチAPI 1回で行った場合の時間を比較するベンチマーク.
+
+一時ファイルのSQLiteをマイグレーションで作成し, リストを1つ作ってから項目の作成と更新を
+``--operations`` 件ずつ実行する. TestClientを使うので, 実際のネットワーク往復の分だけ
+個別の呼び出しとの差はさらに大きくなる.
+
+    python -m benchmarks.bench_batch --operations 50 --rounds 20
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_batch.sqlite3")  # noqa: PTH118
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def sequential(client: TestClient, todo_list_id: int, operations: int) -> float:
+    start = time.perf_counter()
+    for n in range(operations // 2):
+        item = client.post(f"/lists/{todo_list_id}/items", json={"title": f"item {n}"}).json()
+        client.put(f"/lists/{todo_list_id}/items/{item['id']}", json={"complete": True})
+    return time.perf_counter() - start
+
+
+def batched(client: TestClient, todo_list_id: int, operations: int) -> tuple[float, float]:
+    body = {"operations": []}
+    for n in range(operations // 2):
+        body["operations"] += [
+            {"method": "POST", "path": f"/lists/{todo_list_id}/items", "body": {"title": f"item {n}"}, "ref": f"i{n}"},
+            {"method": "PUT", "path": f"/lists/{todo_list_id}/items/@{{i{n}.id}}", "body": {"complete": True}},
+        ]
+    start = time.perf_counter()
+    result = client.post("/batch", json=body).json()
+    assert result["committed"], result
+    return time.perf_counter() - start, result["elapsed_ms"] / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--operations", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    command.upgrade(Config(str(ROOT_DIR / "alembic.ini")), "head")
+    client = TestClient(app)
+    todo_list_id = client.post("/lists/", json={"title": "bench"}).json()["id"]
+
+    sequential_times = [sequential(client, todo_list_id, args.operations) for _ in range(args.rounds)]
+    batch_times, server_times = zip(*[batched(client, todo_list_id, args.operations) for _ in range(args.rounds)], strict=True)
+
+    seq, bat = statistics.median(sequential_times), statistics.median(batch_times)
+    print(f"{args.operations} operations, median of {args.rounds} rounds")
+    print(f"sequential calls   {seq * 1000:>9.1f} ms")
+    print(f"one batch          {bat * 1000:>9.1f} ms  (server {statistics.median(server_times) * 1000:.1f} ms)")
+    print(f"saved              {(seq - bat) * 1000:>9.1f} ms  ({seq / bat:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
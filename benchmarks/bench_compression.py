@@ -0,0 +1,76 @@
+"""レスポンス圧縮のCPU時間と削減バイト数を比較するベンチマーク.
+
+実行例::
+
+    python -m benchmarks.bench_compression --per-page 100 --repeat 200
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from app import const
+from app.compression import ENCODERS, PrecompressedBody, compress
+from app.schemas.item_schema import ResponseTodoItem
+
+
+def build_page(per_page: int) -> bytes:
+    """``GET /lists/{id}/items`` が返すのと同じ形のJSONを作る."""
+    now = datetime(2024, 7, 27, 5, 19, 27)
+    items = [
+        ResponseTodoItem(
+            id=i + 1,
+            todo_list_id=1,
+            title=f"買い物リスト {i:03d}",
+            description=f"牛乳と卵とパンを買う。メモ{i}: 特売日は水曜日" if i % 3 else None,
+            status_code=1 + (i % 2),
+            due_at=now + timedelta(days=i) if i % 2 else None,
+            version=1 + i % 4,
+            created_at=now,
+            updated_at=now + timedelta(minutes=i),
+        ).model_dump(mode="json")
+        for i in range(per_page)
+    ]
+    return json.dumps(items, ensure_ascii=False).encode()
+
+
+def bench(body: bytes, encoding: str, repeat: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compressed = compress(body, encoding)
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed, len(compressed)
+
+
+def bench_cached(body: bytes, encoding: str, repeat: int) -> float:
+    """キャッシュ層が圧縮済みボディを保持している場合の1回あたりのコスト."""
+    cached = PrecompressedBody(body)
+    cached.encoded(encoding)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cached.encoded(encoding)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-page", type=int, nargs="+", default=[10, 100, const.MAX_PER_PAGE])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'per_page':>8} {'encoding':>8} {'raw B':>9} {'comp B':>9} {'saved':>7} {'us/op':>9} {'MB/s':>8} {'cached us':>9}")
+    for per_page in sorted(set(args.per_page)):
+        body = build_page(per_page)
+        for encoding in ENCODERS:
+            elapsed, size = bench(body, encoding, args.repeat)
+            cached = bench_cached(body, encoding, args.repeat)
+            saved = 1 - size / len(body)
+            print(
+                f"{per_page:>8} {encoding:>8} {len(body):>9} {size:>9} {saved:>7.1%} "
+                f"{elapsed * 1e6:>9.1f} {len(body) / elapsed / 1e6:>8.1f} {cached * 1e6:>9.2f}",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""変更通知ブローカーの, アイドル購読者あたりのメモリと配信時間を計測するベンチマーク.
+
+    python -m benchmarks.bench_events --subscribers 10000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app.events import Broker
+
+
+async def run(subscribers: int, lists: int) -> None:
+    broker = Broker(queue_size=64)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    subscriptions = [broker.subscribe(n % lists) for n in range(subscribers)]
+    waiters = [asyncio.create_task(x.get(3600)) for x in subscriptions]
+    await asyncio.sleep(0)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(x.size_diff for x in after.compare_to(before, "filename"))
+    print(f"idle subscribers: {subscribers}, memory: {used / 1024 / 1024:.1f} MiB ({used / subscribers:.0f} B/subscriber, waiting task included)")
+
+    start = time.perf_counter()
+    for channel in range(lists):
+        broker.publish(channel, {"type": "item.updated", "todo_list_id": channel, "todo_item_id": 1, "version": 2})
+    await asyncio.gather(*waiters)
+    elapsed = time.perf_counter() - start
+    print(f"fan-out to {subscribers} subscribers on {lists} lists: {elapsed * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--lists", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.lists))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""分析用エクスポートと, ページングしたJSON APIで全項目を取得する場合の比較ベンチマーク.
+
+一時ファイルのSQLiteをマイグレーションで作成し, リストごとに項目を作る.
+JSON API(``GET /lists/{id}/items`` を最大件数で全ページ), NDJSONのエクスポート, Parquetのエクスポート(pyarrowがある場合)で
+全項目を取り出し, 1秒あたりの行数と出力のバイト数を比べる.
+
+    python -m benchmarks.bench_export --lists 20 --items 10000
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_export.sqlite3")  # noqa: PTH118
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import const, export  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.item_model import ItemModel  # noqa: E402
+from app.models.list_model import ListModel  # noqa: E402
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup(lists: int, items: int) -> None:
+    command.upgrade(Config(str(ROOT_DIR / "alembic.ini")), "head")
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None) - datetime.timedelta(minutes=1)
+    with SessionLocal.session_factory() as db:
+        db.execute(insert(ListModel), [{"id": n, "title": f"list {n}", "item_count": items, "updated_at": now} for n in range(1, lists + 1)])
+        for todo_list_id in range(1, lists + 1):
+            db.execute(insert(ItemModel), [
+                {
+                    "todo_list_id": todo_list_id, "title": f"item {n}", "description": f"description of item {n} in list {todo_list_id}",
+                    "status_code": 1 + n % 2, "position": n * 1024, "updated_at": now,
+                }
+                for n in range(items)
+            ])
+        db.commit()
+
+
+def report(name: str, rows: int, size: int, elapsed: float) -> None:
+    print(f"{name:<16} {rows:>9} rows {rows / elapsed:>10.0f} rows/s {size / 1e6:>9.2f} MB {size / rows:>7.1f} B/row")
+
+
+def fetch_json_api(lists: int) -> None:
+    client = TestClient(app)
+    rows = size = 0
+    start = time.perf_counter()
+    for todo_list_id in range(1, lists + 1):
+        page = 1
+        while True:
+            response = client.get(f"/lists/{todo_list_id}/items", params={"page": page, "per_page": const.MAX_PER_PAGE})
+            items = response.json()
+            rows += len(items)
+            size += len(response.content)
+            if len(items) < const.MAX_PER_PAGE:
+                break
+            page += 1
+    report("json api", rows, size, time.perf_counter() - start)
+
+
+def run_export(fmt: str, directory: str, chunk_size: int) -> None:
+    start = time.perf_counter()
+    result = export.export(directory, fmt, tables=["todo_items"], chunk_size=chunk_size)
+    elapsed = time.perf_counter() - start
+    report(f"{fmt} export", result["files"][0]["rows"], result["files"][0]["bytes"], elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lists", type=int, default=20)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=const.EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    setup(args.lists, args.items)
+
+    directory = tempfile.mkdtemp()
+    fetch_json_api(args.lists)
+    for fmt in ("ndjson", "parquet"):
+        if fmt in export.available_formats():
+            run_export(fmt, directory, args.chunk_size)
+        else:
+            print(f"{fmt + ' export':<16} skipped (pyarrow is not installed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""グループコミットの有無で, 並行する書き込みのスループットを比較するベンチマーク.
+
+一時ファイルのSQLiteに対して, 指定した数のスレッドから ``item_crud.post_todo_item`` を呼び,
+1秒あたりの書き込み件数, コミット回数, 失敗件数を表示する.
+グループコミットなしでは, 読み込み後に書き込むトランザクションが他の書き込みに追い越され
+``database is locked`` で失敗することがある(失敗件数として数える).
+
+    python -m benchmarks.bench_group_commit --writers 1 50 500 --writes 2000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_group_commit.sqlite3")  # noqa: PTH118
+
+from app import const, group_commit  # noqa: E402
+from app.crud import item_crud  # noqa: E402
+from app.database import Base, SessionLocal, get_engine  # noqa: E402
+from app.models.item_model import ItemModel  # noqa: E402, F401
+from app.models.list_model import ListModel  # noqa: E402
+from app.schemas.item_schema import NewTodoItem  # noqa: E402
+
+
+def setup() -> None:
+    Base.metadata.create_all(get_engine())
+    with SessionLocal.session_factory() as db:
+        db.add(ListModel(id=1, title="bench", description="benchmark"))
+        db.commit()
+
+
+def write(_: int) -> bool:
+    with SessionLocal.session_factory() as db:
+        try:
+            item_crud.post_todo_item(db, 1, NewTodoItem(title="bench", description="benchmark"))
+        except OperationalError:
+            return False
+        return True
+
+
+def run(writers: int, writes: int, *, enabled: bool) -> tuple[float, int, int]:
+    const.GROUP_COMMIT = enabled
+    batches_before = group_commit.committer.batches
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        succeeded = sum(executor.map(write, range(writes)))
+    elapsed = time.perf_counter() - start
+    commits = group_commit.committer.batches - batches_before if enabled else succeeded
+    return succeeded / elapsed, commits, writes - succeeded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+    print(f"{'writers':>8} {'off w/s':>10} {'errors':>7} {'on w/s':>10} {'errors':>7} {'commits':>8} {'speedup':>8}")
+    for writers in args.writers:
+        before, _, before_errors = run(writers, args.writes, enabled=False)
+        after, commits, after_errors = run(writers, args.writes, enabled=True)
+        print(
+            f"{writers:>8} {before:>10.0f} {before_errors:>7} {after:>10.0f} {after_errors:>7}"
+            f" {commits:>8} {after / before:>7.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
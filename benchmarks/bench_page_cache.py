@@ -0,0 +1,90 @@
+"""一覧ページのキャッシュのベンチマーク.
+
+一時ファイルのSQLiteをマイグレーションで作成し, ``--lists`` 個のリストに ``--items`` 件ずつ項目を作る.
+キャッシュ無しとキャッシュ有りで, 書き込みを ``--write-ratio`` の割合で混ぜながら
+ランダムなリストの項目一覧(1ページ目)を取得し, 1リクエストあたりの時間とヒット率を比較する.
+
+    python -m benchmarks.bench_page_cache --lists 50 --items 1000 --requests 5000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_page_cache.sqlite3")  # noqa: PTH118
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import const, page_cache  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.item_model import ItemModel  # noqa: E402
+from app.models.list_model import ListModel  # noqa: E402
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup(lists: int, items: int) -> None:
+    command.upgrade(Config(str(ROOT_DIR / "alembic.ini")), "head")
+    with SessionLocal.session_factory() as db:
+        db.execute(insert(ListModel), [{"id": n, "title": f"list {n}", "item_count": items} for n in range(1, lists + 1)])
+        db.execute(insert(ItemModel), [
+            {"todo_list_id": n % lists + 1, "title": f"item {n}", "status_code": 1, "position": n}
+            for n in range(lists * items)
+        ])
+        db.commit()
+
+
+def run(client: TestClient, lists: int, requests: int, write_ratio: float) -> tuple[float, float]:
+    rng = random.Random(0)
+    reads = 0
+    read_time = 0.0
+    for _ in range(requests):
+        todo_list_id = rng.randint(1, lists)
+        if rng.random() < write_ratio:
+            client.post(f"/lists/{todo_list_id}/items", json={"title": "new"})
+            continue
+        start = time.perf_counter()
+        response = client.get(
+            f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": const.MAX_PER_PAGE}, headers={"Accept-Encoding": "gzip"},
+        )
+        read_time += time.perf_counter() - start
+        reads += 1
+        assert response.status_code == 200  # noqa: PLR2004
+    return read_time / reads, page_cache.cache.stats()["hit_rate"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lists", type=int, default=50)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--max-bytes", type=int, default=64 << 20)
+    args = parser.parse_args()
+
+    setup(args.lists, args.items)
+    client = TestClient(app)
+    print(f"{args.lists} lists x {args.items} items, {args.requests} requests, {args.write_ratio:.0%} writes")
+
+    page_cache.cache = page_cache.PageCache(0)
+    uncached, _ = run(client, args.lists, args.requests, args.write_ratio)
+    print(f"{'no cache':<10} {uncached * 1000:>8.2f} ms/read")
+
+    page_cache.cache = page_cache.PageCache(args.max_bytes)
+    cached, hit_rate = run(client, args.lists, args.requests, args.write_ratio)
+    stats = page_cache.cache.stats()
+    print(f"{'cache':<10} {cached * 1000:>8.2f} ms/read  hit rate {hit_rate:.1%}"
+          f"  {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB")
+    print(f"speedup    {uncached / cached:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
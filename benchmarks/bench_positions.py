@@ -0,0 +1,94 @@
+"""大きなリストでの並び替えのベンチマーク.
+
+一時ファイルのSQLiteをマイグレーションで作成し, 1つのリストに項目を作る.
+ランダムな位置への移動と, 同じ位置へ繰り返し移動して振り直しが起きる場合の
+1回あたりの実行時間と更新した行数, 並び順での先頭ページの取得時間を計測する.
+
+    python -m benchmarks.bench_positions --items 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_positions.sqlite3")  # noqa: PTH118
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from app.crud import item_crud  # noqa: E402
+from app.database import SessionLocal, get_engine  # noqa: E402
+from app.models.item_model import ItemModel  # noqa: E402
+from app.models.list_model import ListModel  # noqa: E402
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup(items: int) -> None:
+    command.upgrade(Config(str(ROOT_DIR / "alembic.ini")), "head")
+    with SessionLocal.session_factory() as db:
+        db.execute(insert(ListModel), [{"id": 1, "title": "list", "item_count": items}])
+        db.execute(insert(ItemModel), [
+            {"id": n, "todo_list_id": 1, "title": f"item {n}", "status_code": 1, "position": n * item_crud.POSITION_GAP}
+            for n in range(1, items + 1)
+        ])
+        db.commit()
+
+
+class RowCounter:
+    """todo_itemsへのUPDATEで更新した行数を数える."""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        event.listen(get_engine(), "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001, ARG002, PLR0913, PLR0917
+        if statement.startswith("UPDATE todo_items"):
+            self.rows += len(parameters) if executemany else 1
+
+
+def measure_moves(name: str, pairs: list[tuple[int, int]], counter: RowCounter) -> None:
+    counter.rows = 0
+    with SessionLocal.session_factory() as db:
+        start = time.perf_counter()
+        for todo_item_id, after_id in pairs:
+            item_crud.move_todo_item(db, 1, todo_item_id, after_id)
+        elapsed = time.perf_counter() - start
+    print(f"{name:<24} {elapsed / len(pairs) * 1e6:>10.1f} us/move {counter.rows / len(pairs):>8.2f} rows/move")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--moves", type=int, default=500)
+    args = parser.parse_args()
+
+    setup(args.items)
+    counter = RowCounter()
+    rng = random.Random(0)
+
+    randoms = []
+    for _ in range(args.moves):
+        todo_item_id, after_id = rng.sample(range(1, args.items + 1), 2)
+        randoms.append((todo_item_id, after_id))
+    measure_moves("random moves", randoms, counter)
+
+    # 同じ項目の直後へ移し続けると間隔が尽き, 振り直しが起きる
+    anchor = args.items // 2
+    hotspot = [(rng.randint(1, args.items), anchor) for _ in range(args.moves)]
+    hotspot = [(todo_item_id, after_id) for todo_item_id, after_id in hotspot if todo_item_id != after_id]
+    measure_moves("moves to one spot", hotspot, counter)
+
+    with SessionLocal.session_factory() as db:
+        page = min(timeit.repeat(lambda: item_crud.get_todo_items(db, 1, 1, 20), number=200, repeat=3)) / 200 * 1e6
+    print(f"{'get_todo_items (page 1)':<24} {page:>10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""期限のリマインドのベンチマーク.
+
+一時ファイルのSQLiteをマイグレーションで作成し, 期限を``--spread-hours``時間に散らした
+未完了の項目を``--items``件(既定100万件)作る. 次の時間を ``(status_code, due_at)`` のインデックスが
+ある場合と削除した場合で比較する.
+
+- 起動時の読み込み(期限がhorizon秒以内の項目をタイマーホイールに載せる)
+- 1tickごとの処理(読み込み範囲を1tick分広げ, 期限が来た項目に送る)
+- ``GET /items/due`` の1ページ分の取得
+
+あわせてタイマーホイール単体への追加と取り出しの速さを計測する.
+
+    python -m benchmarks.bench_reminders --items 1000000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_reminders.sqlite3")  # noqa: PTH118
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+
+from app import reminders  # noqa: E402
+from app.crud import item_crud  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models.item_model import ItemModel  # noqa: E402
+from app.models.list_model import ListModel  # noqa: E402
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+START = datetime.datetime(2026, 1, 1)
+CHUNK = 50000
+
+
+def setup(items: int, spread_hours: float) -> None:
+    command.upgrade(Config(str(ROOT_DIR / "alembic.ini")), "head")
+    rng = random.Random(0)
+    spread = spread_hours * 3600
+    with SessionLocal.session_factory() as db:
+        db.execute(insert(ListModel), [{"id": n, "title": f"list {n}", "item_count": items // 100} for n in range(1, 101)])
+        for first in range(1, items + 1, CHUNK):
+            db.execute(insert(ItemModel), [
+                {
+                    "id": n, "todo_list_id": n % 100 + 1, "title": f"item {n}", "status_code": 1, "position": n,
+                    "due_at": START + datetime.timedelta(seconds=rng.uniform(0, spread)),
+                }
+                for n in range(first, min(first + CHUNK, items + 1))
+            ])
+        db.commit()
+
+
+def measure(name: str, horizon: float, ticks: int) -> None:
+    # 公開は計測の対象外にする(購読者がいないので配信はされない)
+    reminders.events.publish = lambda *args, **fields: None  # noqa: ARG005
+    scheduler = reminders.ReminderScheduler(tick=1, horizon=horizon, catchup=0)
+    now = START + datetime.timedelta(hours=1)
+    start = time.perf_counter()
+    scheduler.run_once(now)
+    startup = time.perf_counter() - start
+    loaded = len(scheduler.wheel)
+
+    start = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        scheduler.run_once(now + datetime.timedelta(seconds=tick))
+    per_tick = (time.perf_counter() - start) / ticks
+
+    with SessionLocal.session_factory() as db:
+        start = time.perf_counter()
+        for tick in range(ticks):
+            due_from = now + datetime.timedelta(seconds=tick)
+            item_crud.get_due_items(db, due_from, due_from + datetime.timedelta(hours=1), 1, 50)
+        page = (time.perf_counter() - start) / ticks
+
+    print(f"{name:<14} startup {startup * 1000:>9.1f} ms ({loaded} loaded)"
+          f"  tick {per_tick * 1000:>8.2f} ms ({scheduler.fired} fired)  due page {page * 1000:>8.2f} ms")
+
+
+def measure_wheel(entries: int, horizon: float) -> None:
+    rng = random.Random(0)
+    times = [rng.uniform(0, horizon) for _ in range(entries)]
+    wheel = reminders.TimerWheel(tick=1, slots=int(horizon) + 1, now=0)
+    start = time.perf_counter()
+    for key, when in enumerate(times):
+        wheel.add(key, when, key)
+    added = time.perf_counter() - start
+    start = time.perf_counter()
+    fired = sum(len(wheel.advance(second)) for second in range(int(horizon) + 1))
+    advanced = time.perf_counter() - start
+    print(f"{'timer wheel':<14} add {added / entries * 1e9:>7.0f} ns/entry  advance {advanced / fired * 1e9:>7.0f} ns/entry")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--spread-hours", type=float, default=24 * 30)
+    parser.add_argument("--horizon", type=float, default=300)
+    parser.add_argument("--ticks", type=int, default=60)
+    args = parser.parse_args()
+
+    setup(args.items, args.spread_hours)
+    print(f"{args.items} pending items due within {args.spread_hours:g} h, horizon {args.horizon:g} s")
+    measure("with index", args.horizon, args.ticks)
+
+    with SessionLocal.session_factory() as db:
+        db.execute(text("UPDATE todo_items SET reminded_at = NULL"))
+        db.execute(text("DROP INDEX ix_todo_items_status_code_due_at"))
+        db.commit()
+    measure("without index", args.horizon, args.ticks)
+
+    measure_wheel(args.items, args.horizon)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""よく使うCRUDの文について, 1回あたりのPython側のオーバーヘッドを比較するマイクロベンチマーク.
+
+毎回ORMのselectを組み立てる従来の方式, 組み立て済みの文を使う現在の方式,
+DBドライバのカーソルを直接使う場合を, インメモリのSQLiteで比較する.
+
+    python -m benchmarks.bench_statements --number 5000
+"""
+
+import argparse
+import timeit
+
+from sqlalchemy import and_, create_engine, select
+from sqlalchemy.orm import Session
+
+from app.crud import item_crud, list_crud
+from app.database import Base
+from app.models.item_model import ItemModel
+from app.models.list_model import ListModel
+
+ITEM_COLUMNS = "id, todo_list_id, title, description, status_code, due_at, created_at, updated_at"
+LIST_COLUMNS = "id, title, description, created_at, updated_at"
+
+
+def setup() -> tuple[Session, object]:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.add(ListModel(id=1, title="bench", description="benchmark"))
+    db.add_all([ItemModel(todo_list_id=1, title=f"item {i}", description="benchmark", status_code=1) for i in range(100)])
+    db.commit()
+    return db, engine.raw_connection()
+
+
+def cases(db: Session, raw) -> list[tuple]:  # noqa: ANN001
+    def raw_query(sql: str, params: tuple, *, many: bool = False):  # noqa: ANN202
+        def run() -> None:
+            cursor = raw.cursor()
+            cursor.execute(sql, params)
+            cursor.fetchall() if many else cursor.fetchone()
+        return run
+
+    return [
+        (
+            "get_todo_item",
+            lambda: db.execute(select(ItemModel).where(and_(ItemModel.id == 1, ItemModel.todo_list_id == 1))).scalar_one_or_none(),
+            lambda: item_crud.get_todo_item(db, 1, 1),
+            raw_query(f"SELECT {ITEM_COLUMNS} FROM todo_items WHERE id = ? AND todo_list_id = ?", (1, 1)),
+        ),
+        (
+            "get_todo_items",
+            lambda: db.execute(select(ItemModel).offset(0).limit(20).where(and_(ItemModel.todo_list_id == 1))).scalars().all(),
+            lambda: item_crud.get_todo_items(db, 1, 1, 20),
+            raw_query(f"SELECT {ITEM_COLUMNS} FROM todo_items WHERE todo_list_id = ? LIMIT ? OFFSET ?", (1, 20, 0), many=True),
+        ),
+        (
+            "list exists (post_todo_item)",
+            lambda: db.execute(select(ListModel).where(ListModel.id == 1)).scalar_one_or_none(),
+            lambda: db.execute(item_crud.SELECT_LIST_EXISTS, {"todo_list_id": 1}).scalar_one_or_none(),
+            raw_query("SELECT id FROM todo_lists WHERE id = ?", (1,)),
+        ),
+        (
+            "get_todo_list",
+            lambda: db.execute(select(ListModel).where(ListModel.id == 1)).scalar_one_or_none(),
+            lambda: list_crud.get_todo_list(db, 1),
+            raw_query(f"SELECT {LIST_COLUMNS} FROM todo_lists WHERE id = ?", (1,)),
+        ),
+        (
+            "get_todo_lists",
+            lambda: db.execute(select(ListModel).offset(0).limit(20)).scalars().all(),
+            lambda: list_crud.get_todo_lists(db, 1, 20),
+            raw_query(f"SELECT {LIST_COLUMNS} FROM todo_lists LIMIT ? OFFSET ?", (20, 0), many=True),
+        ),
+        (
+            "select for update (put/delete)",
+            lambda: db.execute(select(ItemModel).where(and_(ItemModel.id == 1, ItemModel.todo_list_id == 1))).scalar_one_or_none(),
+            lambda: db.execute(item_crud.SELECT_ITEM_FOR_UPDATE, {"todo_item_id": 1, "todo_list_id": 1}).scalar_one_or_none(),
+            raw_query(f"SELECT {ITEM_COLUMNS} FROM todo_items WHERE id = ? AND todo_list_id = ?", (1, 1)),
+        ),
+    ]
+
+
+def per_call_us(func, number: int) -> float:  # noqa: ANN001
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    db, raw = setup()
+    print(f"{'statement':<32} {'rebuilt us':>10} {'cached us':>10} {'raw us':>8} {'speedup':>8}")
+    for name, rebuilt, cached, raw_driver in cases(db, raw):
+        before = per_call_us(rebuilt, args.number)
+        after = per_call_us(cached, args.number)
+        driver = per_call_us(raw_driver, args.number)
+        print(f"{name:<32} {before:>10.1f} {after:>10.1f} {driver:>8.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
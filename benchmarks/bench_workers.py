@@ -0,0 +1,107 @@
+"""本番サーバ(app.server)のワーカー数によるスループットを比較するベンチマーク.
+
+SQLiteモードでサーバを起動し, ``GET /lists/`` に並列でリクエストを送る.
+
+    python -m benchmarks.bench_workers --workers 1 4 --concurrency 32 --duration 10
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    msg = f"server did not start on port {port}"
+    raise TimeoutError(msg)
+
+
+def prepare_database(env: dict) -> None:
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=ROOT_DIR, env=env, check=True, capture_output=True)
+    subprocess.run(
+        [sys.executable, "-c", (
+            "from app.database import SessionLocal;"
+            "from app.models.item_model import ItemModel;"
+            "from app.models.list_model import ListModel;"
+            "db = SessionLocal();"
+            "db.add_all([ListModel(title=f'bench {i}', description='benchmark') for i in range(100)]);"
+            "db.commit()"
+        )],
+        cwd=ROOT_DIR, env=env, check=True,
+    )
+
+
+def load(port: int, concurrency: int, duration: float) -> tuple[int, int]:
+    """並列にリクエストを送り, (成功数, 失敗数)を返す."""
+    stop_at = time.monotonic() + duration
+    counts = [0, 0]
+    lock = threading.Lock()
+
+    def worker() -> None:
+        ok = ng = 0
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while time.monotonic() < stop_at:
+                try:
+                    response = client.get("/lists/", params={"page": 1, "per_page": 20})
+                    ok += response.status_code == 200  # noqa: PLR2004
+                    ng += response.status_code != 200  # noqa: PLR2004
+                except httpx.HTTPError:
+                    ng += 1
+        with lock:
+            counts[0] += ok
+            counts[1] += ng
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts[0], counts[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=18099)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DB_BACKEND": "sqlite", "SQLITE_PATH": str(Path(tmp) / "bench.sqlite3"), "APP_PORT": str(args.port)}
+        prepare_database(env)
+
+        print(f"{'workers':>7} {'requests':>9} {'errors':>7} {'req/s':>9}")
+        for workers in args.workers:
+            server = subprocess.Popen(
+                [sys.executable, "-m", "app.server"],
+                cwd=ROOT_DIR, env={**env, "WEB_CONCURRENCY": str(workers)},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_for_port(args.port)
+                load(args.port, args.concurrency, 1)  # ウォームアップ
+                ok, ng = load(args.port, args.concurrency, args.duration)
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{workers:>7} {ok:>9} {ng:>7} {ok / args.duration:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""``app.main`` の読み込み時間と最初のリクエストの応答時間を計測するレポート.
+
+``python -X importtime`` の結果をトップレベルのパッケージごとに集計して表示する.
+
+    python -m benchmarks.import_profile --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# 別プロセスで実行する計測用スクリプト. 結果は "import_ms first_request_ms" を出力する
+MEASURE_SCRIPT = """
+import time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(app)
+t2 = time.perf_counter()
+client.get("/lists/", params={"page": 1, "per_page": 10})
+t3 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.1f} {(t3 - t2) * 1000:.1f}")
+"""
+
+
+def measure(sqlite_path: str) -> tuple[float, float]:
+    """(app.mainの読み込み時間, 最初のリクエストの応答時間)をミリ秒で返す."""
+    env = {**os.environ, "DB_BACKEND": "sqlite", "SQLITE_PATH": sqlite_path, "DEBUG": ""}
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT_DIR, env=env, check=True, capture_output=True,
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT],
+        cwd=ROOT_DIR, env=env, check=True, capture_output=True, text=True,
+    )
+    import_ms, first_request_ms = result.stdout.split()[-2:]
+    return float(import_ms), float(first_request_ms)
+
+
+def import_times() -> dict[str, int]:
+    """トップレベルのパッケージごとの読み込み時間(自身の時間の合計, マイクロ秒)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT_DIR, env={**os.environ, "DEBUG": ""}, check=True, capture_output=True, text=True,
+    )
+    totals = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        totals[name.strip().split(".")[0]] += int(self_us)
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    totals = import_times()
+    print(f"{'package':<24} {'ms':>8}")
+    for name, micros in sorted(totals.items(), key=lambda x: -x[1])[:args.top]:
+        print(f"{name:<24} {micros / 1000:>8.1f}")
+    print(f"{'(total)':<24} {sum(totals.values()) / 1000:>8.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import_ms, first_request_ms = measure(str(Path(tmp) / "cold.sqlite3"))
+    print()
+    print(f"import app.main: {import_ms:.1f} ms")
+    print(f"first request:   {first_request_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,4 +2,6 @@
 CREATE DATABASE IF NOT EXISTS python_be_syokyu;
 CREATE DATABASE IF NOT EXISTS python_be_syokyu_test;
 GRANT ALL ON python_be_syokyu.* TO 'dev'@'%';
-GRANT ALL ON python_be_syokyu_test.* TO 'dev'@'%';
\ No newline at end of file
+GRANT ALL ON python_be_syokyu_test.* TO 'dev'@'%';
+-- pytest-xdistのワーカーごとのテスト用DB(python_be_syokyu_test_gw0 など)
+GRANT ALL ON `python_be_syokyu_test\_%`.* TO 'dev'@'%';
\ No newline at end of file
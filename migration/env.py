@@ -10,10 +10,15 @@ from alembic import context
 # access to the values within the .ini file in use.
 config = context.config
 
-config.set_section_option("alembic", "DB_USER", os.environ.get("DB_USER"))
-config.set_section_option("alembic", "DB_PASS", os.environ.get("DB_PASS"))
-config.set_section_option("alembic", "DB_HOST", os.environ.get("DB_HOST"))
-config.set_section_option("alembic", "DB_NAME", os.environ.get("DB_NAME"))
+# SQLiteを使う場合は接続先をDBファイルに差し替える
+if os.environ.get("DB_BACKEND", "mysql") == "sqlite":
+    sqlite_path = os.environ.get("SQLITE_PATH", "python_be_syokyu.sqlite3")
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{sqlite_path}")
+else:
+    config.set_section_option("alembic", "DB_USER", os.environ.get("DB_USER"))
+    config.set_section_option("alembic", "DB_PASS", os.environ.get("DB_PASS"))
+    config.set_section_option("alembic", "DB_HOST", os.environ.get("DB_HOST"))
+    config.set_section_option("alembic", "DB_NAME", os.environ.get("DB_NAME"))
 
 
 # Interpret the config file for Python logging.
@@ -72,7 +77,10 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLiteはALTER TABLEの機能が限られるため, テーブルを作り直すbatchモードで実行する
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
@@ -0,0 +1,39 @@
+"""change_outbox ids are never reused on sqlite
+
+Revision ID: 0a6c2e4f8b13
+Revises: f1c3e5a7b9d2
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6c2e4f8b13'
+down_revision: Union[str, None] = 'f1c3e5a7b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLiteのINTEGER PRIMARY KEYは最大値の行が消えるとIDを再利用する. 送信待ちは移すたびに空になるので,
+    # AUTOINCREMENTにして変更履歴(主キーにidを引き継ぐ)と衝突しないようにする. MySQLのAUTO_INCREMENTは再利用しない
+    if op.get_context().dialect.name != "sqlite":
+        return
+    with op.batch_alter_table('change_outbox', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    # 移し済みのidより後から振る
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'change_outbox'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'change_outbox', COALESCE(MAX(id), 0) FROM "
+        "(SELECT MAX(id) AS id FROM change_history UNION ALL SELECT MAX(id) FROM change_outbox)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "sqlite":
+        return
+    with op.batch_alter_table('change_outbox', recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+        pass
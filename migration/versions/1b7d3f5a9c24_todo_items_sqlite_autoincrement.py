@@ -0,0 +1,51 @@
+"""todo_items ids are never reused on sqlite
+
+Revision ID: 1b7d3f5a9c24
+Revises: 0a6c2e4f8b13
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7d3f5a9c24'
+down_revision: Union[str, None] = '0a6c2e4f8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# テーブルを作り直すと消えるので, e3a9c5f7b1d4 と同じトリガーを作り直す
+UPDATED_AT_TRIGGER = (
+    "CREATE TRIGGER todo_items_updated_at AFTER UPDATE ON todo_items "
+    "FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at AND NEW.position IS OLD.position AND NEW.reminded_at IS OLD.reminded_at BEGIN "
+    "UPDATE todo_items SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END"
+)
+
+
+def _recreate_todo_items(autoincrement: bool) -> None:
+    with op.batch_alter_table('todo_items', recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+        pass
+    op.execute("DROP TRIGGER IF EXISTS todo_items_updated_at")
+    op.execute(UPDATED_AT_TRIGGER)
+
+
+def upgrade() -> None:
+    # アーカイブした項目はIDを引き継ぐので, 最大のIDの項目をアーカイブした後に同じIDを振らないようAUTOINCREMENTにする.
+    # MySQLのAUTO_INCREMENTは再利用しない
+    if op.get_context().dialect.name != "sqlite":
+        return
+    _recreate_todo_items(autoincrement=True)
+    # アーカイブ済みのIDより後から振る
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'todo_items'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'todo_items', COALESCE(MAX(id), 0) FROM "
+        "(SELECT MAX(id) AS id FROM todo_items UNION ALL SELECT MAX(id) FROM todo_items_archive)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "sqlite":
+        return
+    _recreate_todo_items(autoincrement=False)
@@ -18,6 +18,13 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+def _updated_at_default():
+    # MySQLはサーバ側で更新日時を自動更新する. それ以外はトリガーで更新する
+    if op.get_context().dialect.name == "mysql":
+        return sa.text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+    return sa.func.now()
+
+
 def upgrade() -> None:
     op.create_table(
         'todo_items',
@@ -28,9 +35,15 @@ def upgrade() -> None:
         sa.Column('status_code', sa.Integer, nullable=False),
         sa.Column('due_at', sa.DateTime),
         sa.Column('created_at', sa.DateTime, server_default=sa.func.now()),
-        sa.Column('updated_at', sa.DateTime, server_default=sa.text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")),
+        sa.Column('updated_at', sa.DateTime, server_default=_updated_at_default()),
         sa.ForeignKeyConstraint(['todo_list_id'], ['todo_lists.id'], name='todo_list_id_fk', ondelete='CASCADE')
     )
+    if op.get_context().dialect.name == "sqlite":
+        op.execute(
+            "CREATE TRIGGER todo_items_updated_at AFTER UPDATE ON todo_items "
+            "FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at BEGIN "
+            "UPDATE todo_items SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END"
+        )
 
 
 def downgrade() -> None:
@@ -0,0 +1,31 @@
+"""add version columns
+
+Revision ID: 5c1e8f2a9b47
+Revises: 3f0b5fa5c5e1
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8f2a9b47'
+down_revision: Union[str, None] = '3f0b5fa5c5e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 楽観的排他制御(If-Match)用のバージョン番号. 更新のたびに1増やす
+    op.add_column('todo_lists', sa.Column('version', sa.Integer, nullable=False, server_default=sa.text('1')))
+    op.add_column('todo_items', sa.Column('version', sa.Integer, nullable=False, server_default=sa.text('1')))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('todo_items') as batch_op:
+        batch_op.drop_column('version')
+    with op.batch_alter_table('todo_lists') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,46 @@
+"""add todo_lists.item_count
+
+Revision ID: 8d2a4b6c1e03
+Revises: 5c1e8f2a9b47
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2a4b6c1e03'
+down_revision: Union[str, None] = '5c1e8f2a9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_sqlite_trigger(when: str) -> None:
+    op.execute("DROP TRIGGER IF EXISTS todo_lists_updated_at")
+    op.execute(
+        "CREATE TRIGGER todo_lists_updated_at AFTER UPDATE ON todo_lists "
+        f"FOR EACH ROW WHEN {when} BEGIN "
+        "UPDATE todo_lists SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END"
+    )
+
+
+def upgrade() -> None:
+    # 一覧の総件数用に, リストごとのTODO項目数を項目の作成・削除時に更新して保持する
+    op.add_column('todo_lists', sa.Column('item_count', sa.Integer, nullable=False, server_default=sa.text('0')))
+    op.execute(
+        "UPDATE todo_lists SET item_count = "
+        "(SELECT COUNT(*) FROM todo_items WHERE todo_items.todo_list_id = todo_lists.id)"
+    )
+    if op.get_context().dialect.name == "sqlite":
+        # 件数の更新ではリストの更新日時を変えない
+        _replace_sqlite_trigger("NEW.updated_at IS OLD.updated_at AND NEW.item_count IS OLD.item_count")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('todo_lists') as batch_op:
+        batch_op.drop_column('item_count')
+    if op.get_context().dialect.name == "sqlite":
+        _replace_sqlite_trigger("NEW.updated_at IS OLD.updated_at")
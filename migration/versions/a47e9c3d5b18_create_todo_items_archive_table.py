@@ -0,0 +1,44 @@
+"""create todo_items_archive table
+
+Revision ID: a47e9c3d5b18
+Revises: 8d2a4b6c1e03
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a47e9c3d5b18'
+down_revision: Union[str, None] = '8d2a4b6c1e03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 完了から一定期間が過ぎたTODO項目の移動先. IDは元の項目のものを引き継ぐ
+    op.create_table(
+        'todo_items_archive',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('todo_list_id', sa.Integer, nullable=False),
+        sa.Column('title', sa.String(50), nullable=False),
+        sa.Column('description', sa.Unicode(200)),
+        sa.Column('status_code', sa.Integer, nullable=False),
+        sa.Column('due_at', sa.DateTime),
+        sa.Column('version', sa.Integer, nullable=False),
+        sa.Column('created_at', sa.DateTime),
+        sa.Column('updated_at', sa.DateTime),
+        sa.Column('archived_at', sa.DateTime, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['todo_list_id'], ['todo_lists.id'], name='todo_items_archive_todo_list_id_fk', ondelete='CASCADE')
+    )
+    op.create_index('ix_todo_items_archive_todo_list_id', 'todo_items_archive', ['todo_list_id'])
+    # アーカイブ対象(完了済みで更新が古いもの)を全件走査せずに探す
+    op.create_index('ix_todo_items_status_code_updated_at', 'todo_items', ['status_code', 'updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todo_items_status_code_updated_at', table_name='todo_items')
+    op.drop_table('todo_items_archive')
@@ -0,0 +1,31 @@
+"""create id_blocks table
+
+Revision ID: b5f3d7e9a210
+Revises: a47e9c3d5b18
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f3d7e9a210'
+down_revision: Union[str, None] = 'a47e9c3d5b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # シャーディング時にシャードをまたいで一意なIDを払い出すための採番テーブル
+    op.create_table(
+        'id_blocks',
+        sa.Column('name', sa.String(50), primary_key=True),
+        sa.Column('next_id', sa.BigInteger, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('id_blocks')
@@ -0,0 +1,53 @@
+"""add todo_items.position
+
+Revision ID: c2e6a8f4d931
+Revises: b5f3d7e9a210
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e6a8f4d931'
+down_revision: Union[str, None] = 'b5f3d7e9a210'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app.crud.item_crud.POSITION_GAPと同じ値
+POSITION_GAP = 65536
+
+
+def _replace_sqlite_trigger(when: str) -> None:
+    op.execute("DROP TRIGGER IF EXISTS todo_items_updated_at")
+    op.execute(
+        "CREATE TRIGGER todo_items_updated_at AFTER UPDATE ON todo_items "
+        f"FOR EACH ROW WHEN {when} BEGIN "
+        "UPDATE todo_items SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END"
+    )
+
+
+def upgrade() -> None:
+    # リスト内の並び順. 間隔を空けた値を振り, 移動は前後の値の中間に置く
+    op.add_column('todo_items', sa.Column('position', sa.BigInteger, nullable=False, server_default=sa.text('0')))
+    op.add_column('todo_items_archive', sa.Column('position', sa.BigInteger))
+    # 既存の項目はID順に並べる
+    op.execute(f"UPDATE todo_items SET position = id * {POSITION_GAP}")
+    op.execute(f"UPDATE todo_items_archive SET position = id * {POSITION_GAP}")
+    op.create_index('ix_todo_items_todo_list_id_position', 'todo_items', ['todo_list_id', 'position'])
+    if op.get_context().dialect.name == "sqlite":
+        # 並び順の詰め直しでは更新日時を変えない
+        _replace_sqlite_trigger("NEW.updated_at IS OLD.updated_at AND NEW.position IS OLD.position")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todo_items_todo_list_id_position', table_name='todo_items')
+    with op.batch_alter_table('todo_items_archive') as batch_op:
+        batch_op.drop_column('position')
+    with op.batch_alter_table('todo_items') as batch_op:
+        batch_op.drop_column('position')
+    if op.get_context().dialect.name == "sqlite":
+        _replace_sqlite_trigger("NEW.updated_at IS OLD.updated_at")
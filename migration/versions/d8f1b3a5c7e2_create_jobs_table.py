@@ -0,0 +1,46 @@
+"""create jobs table
+
+Revision ID: d8f1b3a5c7e2
+Revises: c2e6a8f4d931
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f1b3a5c7e2'
+down_revision: Union[str, None] = 'c2e6a8f4d931'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # リクエスト外で実行する長い処理の状態と進捗
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('kind', sa.String(50), nullable=False),
+        sa.Column('params', sa.Text, nullable=False),
+        sa.Column('result', sa.Text),
+        sa.Column('status', sa.String(20), nullable=False, server_default=sa.text("'queued'")),
+        sa.Column('progress', sa.Integer, nullable=False, server_default=sa.text('0')),
+        sa.Column('total', sa.Integer),
+        sa.Column('error', sa.String(500)),
+        sa.Column('cancel_requested', sa.Boolean, nullable=False, server_default=sa.text('0')),
+        sa.Column('attempts', sa.Integer, nullable=False, server_default=sa.text('0')),
+        sa.Column('owner', sa.String(100)),
+        sa.Column('heartbeat_at', sa.DateTime),
+        sa.Column('created_at', sa.DateTime, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime),
+    )
+    # 実行待ちのジョブと, 生存確認が途絶えた実行中のジョブを探す
+    op.create_index('ix_jobs_status_heartbeat_at', 'jobs', ['status', 'heartbeat_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('jobs')
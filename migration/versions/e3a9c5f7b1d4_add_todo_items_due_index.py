@@ -0,0 +1,50 @@
+"""add todo_items due index and reminded_at
+
+Revision ID: e3a9c5f7b1d4
+Revises: d8f1b3a5c7e2
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9c5f7b1d4'
+down_revision: Union[str, None] = 'd8f1b3a5c7e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_sqlite_trigger(when: str) -> None:
+    op.execute("DROP TRIGGER IF EXISTS todo_items_updated_at")
+    op.execute(
+        "CREATE TRIGGER todo_items_updated_at AFTER UPDATE ON todo_items "
+        f"FOR EACH ROW WHEN {when} BEGIN "
+        "UPDATE todo_items SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END"
+    )
+
+
+def upgrade() -> None:
+    # 期限のリマインドを送った日時. 複数のプロセスから同じリマインドを送らないよう条件付きUPDATEで記録する
+    op.add_column('todo_items', sa.Column('reminded_at', sa.DateTime))
+    op.add_column('todo_items_archive', sa.Column('reminded_at', sa.DateTime))
+    # 未完了で期限が近い項目を範囲検索する
+    op.create_index('ix_todo_items_status_code_due_at', 'todo_items', ['status_code', 'due_at'])
+    if op.get_context().dialect.name == "sqlite":
+        # リマインドの記録では更新日時を変えない
+        _replace_sqlite_trigger(
+            "NEW.updated_at IS OLD.updated_at AND NEW.position IS OLD.position AND NEW.reminded_at IS OLD.reminded_at"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todo_items_status_code_due_at', table_name='todo_items')
+    with op.batch_alter_table('todo_items_archive') as batch_op:
+        batch_op.drop_column('reminded_at')
+    with op.batch_alter_table('todo_items') as batch_op:
+        batch_op.drop_column('reminded_at')
+    if op.get_context().dialect.name == "sqlite":
+        _replace_sqlite_trigger("NEW.updated_at IS OLD.updated_at AND NEW.position IS OLD.position")
@@ -0,0 +1,55 @@
+"""create change outbox and history tables
+
+Revision ID: f1c3e5a7b9d2
+Revises: e3a9c5f7b1d4
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c3e5a7b9d2'
+down_revision: Union[str, None] = 'e3a9c5f7b1d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# change_historyのパーティション数(MySQLのみ)
+HISTORY_PARTITIONS = 16
+
+
+def upgrade() -> None:
+    # 書き込みと同じトランザクションで追加する送信待ちの変更. 主キー以外のインデックスは付けない
+    op.create_table(
+        'change_outbox',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('todo_list_id', sa.Integer, nullable=False),
+        sa.Column('entity', sa.String(10), nullable=False),
+        sa.Column('entity_id', sa.Integer),
+        sa.Column('action', sa.String(20), nullable=False),
+        sa.Column('version', sa.Integer),
+        sa.Column('changes', sa.Text),
+        sa.Column('changed_at', sa.DateTime, server_default=sa.func.now()),
+    )
+    # バックグラウンドでまとめて移した変更履歴. リストごとに新しい順で読む
+    op.create_table(
+        'change_history',
+        sa.Column('todo_list_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('entity', sa.String(10), nullable=False),
+        sa.Column('entity_id', sa.Integer),
+        sa.Column('action', sa.String(20), nullable=False),
+        sa.Column('version', sa.Integer),
+        sa.Column('changes', sa.Text),
+        sa.Column('changed_at', sa.DateTime),
+    )
+    if op.get_context().dialect.name == "mysql":
+        op.execute(f"ALTER TABLE change_history PARTITION BY KEY (todo_list_id) PARTITIONS {HISTORY_PARTITIONS}")
+
+
+def downgrade() -> None:
+    op.drop_table('change_history')
+    op.drop_table('change_outbox')
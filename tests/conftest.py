@@ -1,33 +1,107 @@
+import os
+from pathlib import Path
+
+# pytest-xdistで並列実行する場合はワーカーごとに別のDBを使う(app.constの読み込みより前に設定する)
+XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+if XDIST_WORKER:
+    os.environ["DB_NAME"] = f"{os.environ['DB_NAME']}_{XDIST_WORKER}"
+    os.environ["SQLITE_PATH"] = f"{os.environ['SQLITE_PATH']}.{XDIST_WORKER}"
+
 import pytest
-from sqlalchemy import inspect
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app import const
+from app.database import Base, SessionLocal, engine
+from app.dependencies import get_db
+from app.main import app
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# db_sessionの後始末の方法
+#   rollback: テストごとに外側のトランザクションを張り, 終了時にロールバックする(既定)
+#   truncate: テストの前後で全レコードを削除する(従来の方式)
+TEST_DB_MODE = os.environ.get("TEST_DB_MODE", "rollback")
 
-from app.database import SessionLocal, engine
-from app.models import item_model, list_model
+
+@pytest.fixture(scope="session", autouse=True)
+def _worker_database():
+    """並列実行時やSQLite使用時, テスト用のDBを用意してマイグレーションを適用する."""
+    if XDIST_WORKER or const.DB_BACKEND == "sqlite":
+        if const.DB_BACKEND != "sqlite":
+            server_engine = create_engine(engine.url.set(database=None))
+            with server_engine.connect() as conn:
+                conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{engine.url.database}`"))
+            server_engine.dispose()
+
+        config = Config(str(ROOT_DIR / "alembic.ini"))
+        config.set_main_option("script_location", str(ROOT_DIR / "migration"))
+        command.upgrade(config, "head")
+    yield
+
+
+@pytest.fixture(scope="session")
+def _initial_cleanup():
+    """rollbackモードでは前回までの実行で残ったレコードを最初に一度だけ削除する."""
+    if TEST_DB_MODE != "truncate":
+        db = SessionLocal()
+        try:
+            _reset_records(db)
+        finally:
+            db.close()
 
 
 @pytest.fixture(autouse=False)
-def db_session():
-    db = SessionLocal()
+def db_session(_initial_cleanup):
+    if TEST_DB_MODE == "truncate":
+        yield from _truncating_session()
+    else:
+        yield from _rollback_session()
+
+
+def _rollback_session():
+    """テスト全体を1つのトランザクションで包み, 終了時にロールバックするセッション.
+
+    テスト内の ``commit()`` はSAVEPOINTの解放になる. APIからも同じセッションを使うよう
+    ``get_db`` を差し替えるため, APIで書き込んだ内容もテストから見えてロールバックで消える.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    # APIのcommitでテスト側が保持するオブジェクトが期限切れにならないようにする
+    db = Session(bind=connection, autoflush=False, expire_on_commit=False, join_transaction_mode="create_savepoint")
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        yield db
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+
+def _truncating_session():
+    """テストの前後で全レコードを削除するセッション.
+
+    APIからも同じセッションを使う. SQLiteでは書き込みを1つずつ通すので, テストが読み込んだまま
+    開いているトランザクションとAPIの書き込みが別のセッションだと, APIの書き込みが待ち続けるため.
+    """
+    db = SessionLocal.session_factory()
+    app.dependency_overrides[get_db] = lambda: db
     try:
         _reset_records(db)
         yield db
     finally:
+        app.dependency_overrides.pop(get_db, None)
         _reset_records(db)
         db.close()
 
 
 def _reset_records(db) -> None:
-    """テーブルのレコードをリセット."""
-    inspector = inspect(engine)
-    table_names = inspector.get_table_names()
-    is_deleted = False
-
-    if ("todo_lists" in table_names):
-        db.query(list_model.ListModel).delete()
-        is_deleted = True
-    if ("todo_items" in table_names):
-        db.query(item_model.ItemModel).delete()
-        is_deleted = True
-
-    if is_deleted:
-        db.commit()
+    """全テーブルのレコードをリセット. 外部キーの参照元から順に削除する."""
+    table_names = set(inspect(db.connection()).get_table_names())
+    for table in reversed(Base.metadata.sorted_tables):
+        if table.name in table_names:
+            db.execute(table.delete())
+    db.commit()
@@ -0,0 +1,137 @@
+import datetime
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import bindparam, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import archive
+from app.archive import archive_batch
+from app.main import app
+from app.models import archive_model, item_model, list_model
+
+client = TestClient(app)
+
+OLD = datetime.datetime(2020, 1, 1)
+CUTOFF = datetime.datetime(2021, 1, 1)
+
+
+def _create_items(db_session) -> tuple[int, list[int]]:
+    """完了済みで古い項目3件, 未完了の古い項目1件, 完了済みの新しい項目1件を作る."""
+    db_todo_list = list_model.ListModel(title="archive_test", description="A test record for archiving.", item_count=5)
+    db_session.add(db_todo_list)
+    db_session.commit()
+    items = [
+        item_model.ItemModel(todo_list_id=db_todo_list.id, title="old done", status_code=2, updated_at=OLD),
+        item_model.ItemModel(todo_list_id=db_todo_list.id, title="old done", status_code=2, updated_at=OLD),
+        item_model.ItemModel(todo_list_id=db_todo_list.id, title="old done", status_code=2, updated_at=OLD),
+        item_model.ItemModel(todo_list_id=db_todo_list.id, title="old open", status_code=1, updated_at=OLD),
+        item_model.ItemModel(todo_list_id=db_todo_list.id, title="new done", status_code=2),
+    ]
+    db_session.add_all(items)
+    db_session.commit()
+    return db_todo_list.id, [x.id for x in items]
+
+
+def _archived_ids(db_session) -> set[int]:
+    return set(db_session.execute(select(archive_model.ArchivedItemModel.id)).scalars())
+
+
+def test_archive_moves_old_completed_items_in_batches(db_session) -> None:
+    todo_list_id, item_ids = _create_items(db_session)
+
+    assert archive_batch(db_session, CUTOFF, batch_size=2) == 2  # noqa: PLR2004
+    assert len(_archived_ids(db_session)) == 2  # noqa: PLR2004
+    assert archive_batch(db_session, CUTOFF, batch_size=2) == 1
+    assert archive_batch(db_session, CUTOFF, batch_size=2) == 0
+
+    assert _archived_ids(db_session) == set(item_ids[:3])
+    remaining = db_session.execute(
+        select(item_model.ItemModel.id).where(item_model.ItemModel.todo_list_id == todo_list_id),
+    ).scalars().all()
+    assert set(remaining) == set(item_ids[3:])
+    item_count = db_session.execute(
+        select(list_model.ListModel.item_count).where(list_model.ListModel.id == todo_list_id),
+    ).scalar_one()
+    assert item_count == 2  # noqa: PLR2004
+
+
+def test_archived_items_are_read_only_when_asked(db_session) -> None:
+    todo_list_id, item_ids = _create_items(db_session)
+    archive_batch(db_session, CUTOFF, batch_size=10)
+
+    response = client.get(f"/lists/{todo_list_id}/items/{item_ids[0]}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.get(f"/lists/{todo_list_id}/items/{item_ids[0]}", params={"include_archived": True})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["title"] == "old done"
+
+    response = client.get(f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 10})
+    assert [x["id"] for x in response.json()] == item_ids[3:]
+    assert response.headers["x-total-count"] == "2"
+
+    response = client.get(f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 10, "include_archived": True})
+    assert [x["id"] for x in response.json()] == item_ids
+    assert response.headers["x-total-count"] == "5"
+
+
+def test_archive_skips_items_changed_after_selection(db_session) -> None:
+    _, item_ids = _create_items(db_session)
+    db_session.execute(
+        item_model.ItemModel.__table__.update().where(item_model.ItemModel.id == item_ids[0]).values(status_code=1),
+    )
+    db_session.commit()
+
+    assert archive_batch(db_session, CUTOFF, batch_size=10) == 2  # noqa: PLR2004
+    assert item_ids[0] not in _archived_ids(db_session)
+    assert db_session.execute(select(func.count()).select_from(archive_model.ArchivedItemModel)).scalar_one() == 2  # noqa: PLR2004
+
+
+def test_archive_publishes_only_archived_items(db_session, monkeypatch) -> None:
+    _, item_ids = _create_items(db_session)
+    # 検索後に未完了へ戻された項目を, 候補に含める
+    monkeypatch.setattr(archive, "SELECT_ARCHIVABLE", (
+        select(item_model.ItemModel.id, item_model.ItemModel.todo_list_id)
+        .where(item_model.ItemModel.updated_at < bindparam("cutoff"))
+        .limit(bindparam("limit"))
+    ))
+    published = []
+    monkeypatch.setattr(archive.events, "publish", lambda *args, **fields: published.append(fields["todo_item_id"]))
+
+    assert archive_batch(db_session, CUTOFF, batch_size=10) == 3  # noqa: PLR2004
+    assert sorted(published) == item_ids[:3]
+    assert item_ids[3] not in _archived_ids(db_session)
+
+
+def test_archived_ids_are_not_reused(db_session) -> None:
+    todo_list_id, item_ids = _create_items(db_session)
+    # 最大のIDの項目をアーカイブしても, 次の項目には新しいIDを振る
+    db_session.execute(
+        item_model.ItemModel.__table__.update().where(item_model.ItemModel.id == item_ids[-1]).values(updated_at=OLD),
+    )
+    db_session.commit()
+    archive_batch(db_session, CUTOFF, batch_size=10)
+    assert item_ids[-1] in _archived_ids(db_session)
+
+    new_id = client.post(f"/lists/{todo_list_id}/items", json={"title": "new"}).json()["id"]
+    assert new_id > max(item_ids)
+    client.put(f"/lists/{todo_list_id}/items/{new_id}", json={"complete": True})
+    db_session.execute(
+        item_model.ItemModel.__table__.update().where(item_model.ItemModel.id == new_id).values(updated_at=OLD),
+    )
+    db_session.commit()
+    assert archive_batch(db_session, CUTOFF, batch_size=10) == 1
+    assert new_id in _archived_ids(db_session)
+
+
+def test_archive_conflict_is_raised(db_session) -> None:
+    todo_list_id, item_ids = _create_items(db_session)
+    db_session.execute(insert(archive_model.ArchivedItemModel).values(
+        id=item_ids[0], todo_list_id=todo_list_id, title="already archived", status_code=2, version=1,
+    ))
+    db_session.commit()
+
+    with pytest.raises(IntegrityError):
+        archive_batch(db_session, CUTOFF, batch_size=10)
+    assert item_ids[0] in db_session.execute(select(item_model.ItemModel.id)).scalars().all()
@@ -0,0 +1,115 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+
+from app import audit, const
+from app.main import app
+from app.models.history_model import HistoryModel, OutboxModel
+
+client = TestClient(app)
+
+
+def _pending(db_session, todo_list_id: int) -> list[tuple]:
+    rows = db_session.execute(
+        select(OutboxModel.entity, OutboxModel.action, OutboxModel.version)
+        .where(OutboxModel.todo_list_id == todo_list_id)
+        .order_by(OutboxModel.id)
+    )
+    return [tuple(row) for row in rows]
+
+
+def test_writes_append_outbox_records(db_session) -> None:
+    todo_list_id = client.post("/lists/", json={"title": "audited"}).json()["id"]
+    url = f"/lists/{todo_list_id}/items"
+    item_id = client.post(url, json={"title": "item"}).json()["id"]
+    client.put(f"{url}/{item_id}", json={"complete": True})
+    # 失敗した書き込みは記録しない
+    stale = client.put(f"{url}/{item_id}", json={"title": "stale"}, headers={"If-Match": '"1"'})
+    assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+    client.post(f"{url}/{item_id}/move", json={"after_id": None})
+    client.put(f"/lists/{todo_list_id}", json={"title": "renamed"})
+    client.delete(f"{url}/{item_id}")
+
+    assert _pending(db_session, todo_list_id) == [
+        ("list", "created", 1),
+        ("item", "created", 1),
+        ("item", "updated", 2),
+        ("item", "moved", 3),
+        ("list", "updated", 2),
+        ("item", "deleted", 3),
+    ]
+
+
+def test_flush_moves_records_to_history(db_session) -> None:
+    todo_list_id = client.post("/lists/", json={"title": "history"}).json()["id"]
+    url = f"/lists/{todo_list_id}/items"
+    item_id = client.post(url, json={"title": "first", "description": "desc"}).json()["id"]
+    client.put(f"{url}/{item_id}", json={"title": "second"})
+
+    # 移すまでは履歴に現れない
+    assert client.get(f"/lists/{todo_list_id}/history").json() == []
+    while audit.flush_batch(db_session, batch_size=2):
+        pass
+    assert db_session.execute(select(func.count()).select_from(OutboxModel)).scalar_one() == 0
+
+    history = client.get(f"/lists/{todo_list_id}/history").json()
+    assert [(x["entity"], x["action"], x["entity_id"]) for x in history] == [
+        ("item", "updated", item_id), ("item", "created", item_id), ("list", "created", None),
+    ]
+    assert history[0]["changes"] == {"title": "second"}
+    assert history[1]["changes"] == {"title": "first", "description": "desc"}
+
+    page = client.get(f"/lists/{todo_list_id}/history", params={"page": 2, "per_page": 2}).json()
+    assert [x["action"] for x in page] == ["created"]
+    assert page[0]["entity"] == "list"
+
+
+def test_bulk_and_failed_batch_operations(db_session) -> None:
+    source = client.post("/lists/", json={"title": "source"}).json()["id"]
+    target = client.post("/lists/", json={"title": "target"}).json()["id"]
+    for n in range(3):
+        client.post(f"/lists/{source}/items", json={"title": f"item {n}"})
+    client.post(f"/lists/{source}/items:move", json={"target_list_id": target})
+    assert _pending(db_session, source)[-1] == ("item", "moved_out", None)
+    assert _pending(db_session, target)[-1] == ("item", "moved_in", None)
+
+    before = _pending(db_session, target)
+    response = client.post("/batch", json={"operations": [
+        {"method": "POST", "path": f"/lists/{target}/items", "body": {"title": "rolled back"}},
+        {"method": "PUT", "path": f"/lists/{target}/items/999999", "body": {"title": "missing"}},
+    ]})
+    assert not response.json()["committed"]
+    assert _pending(db_session, target) == before
+
+
+def test_concurrent_flush_does_not_duplicate(db_session, monkeypatch) -> None:
+    todo_list_id = client.post("/lists/", json={"title": "raced"}).json()["id"]
+    outbox_id = db_session.execute(select(func.max(OutboxModel.id))).scalar_one()
+    # 別のプロセスが先に移した状態
+    db_session.execute(insert(HistoryModel).values(todo_list_id=todo_list_id, id=outbox_id, entity="list", action="created"))
+    db_session.commit()
+    warnings = []
+    monkeypatch.setattr(audit.logger, "warning", lambda *args: warnings.append(args))
+    assert audit.flush_batch(db_session) == 1
+    assert warnings[0][1:] == (1, 1)
+    assert db_session.execute(select(func.count()).select_from(HistoryModel).where(HistoryModel.id == outbox_id)).scalar_one() == 1
+    assert db_session.execute(select(func.count()).select_from(OutboxModel)).scalar_one() == 0
+
+
+def test_outbox_ids_are_not_reused_after_flush(db_session) -> None:
+    todo_list_id = client.post("/lists/", json={"title": "flushed"}).json()["id"]
+    while audit.flush_batch(db_session):
+        pass
+    client.put(f"/lists/{todo_list_id}", json={"title": "updated after flush"})
+    while audit.flush_batch(db_session):
+        pass
+
+    history = client.get(f"/lists/{todo_list_id}/history").json()
+    assert [x["action"] for x in history] == ["updated", "created"]
+
+
+def test_disabled(db_session, monkeypatch) -> None:
+    monkeypatch.setattr(const, "AUDIT", False)
+    todo_list_id = client.post("/lists/", json={"title": "not audited"}).json()["id"]
+    client.post(f"/lists/{todo_list_id}/items", json={"title": "item"})
+    assert _pending(db_session, todo_list_id) == []
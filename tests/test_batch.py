@@ -0,0 +1,64 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app import events
+from app.main import app
+
+client = TestClient(app)
+
+
+def _batch(operations: list[dict], mode: str = "all_or_nothing") -> dict:
+    response = client.post("/batch", json={"mode": mode, "operations": operations})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+
+def test_batch_refers_to_created_ids(db_session) -> None:  # noqa: ARG001
+    result = _batch([
+        {"method": "POST", "path": "/lists", "body": {"title": "batch list"}, "ref": "list"},
+        {"method": "POST", "path": "/lists/@{list.id}/items", "body": {"title": "first"}, "ref": "first"},
+        {"method": "POST", "path": "/lists/@{list.id}/items", "body": {"title": "second"}, "ref": "second"},
+        {"method": "PUT", "path": "/lists/@{list.id}/items/@{first.id}", "body": {"complete": True}, "if_match": 1},
+        {"method": "POST", "path": "/lists/@{list.id}/items/@{first.id}/move", "body": {"after_id": "@{second.id}"}},
+    ])
+    assert result["committed"] is True
+    assert [x["status"] for x in result["results"]] == [200] * 5
+    list_id = result["results"][0]["body"]["id"]
+    items = client.get(f"/lists/{list_id}/items", params={"page": 1, "per_page": 10}).json()
+    assert [(x["title"], x["status_code"], x["version"]) for x in items] == [("second", 1, 1), ("first", 2, 3)]
+
+
+def test_all_or_nothing_rolls_back_everything(db_session) -> None:  # noqa: ARG001
+    with events.deferred() as published:
+        result = _batch([
+            {"method": "POST", "path": "/lists", "body": {"title": "kept?"}, "ref": "list"},
+            {"method": "PUT", "path": "/lists/@{list.id}", "body": {"title": "stale"}, "if_match": 5},
+            {"method": "DELETE", "path": "/lists/@{list.id}"},
+        ])
+    assert result["committed"] is False
+    assert [x["status"] for x in result["results"]] == [200, 412, 424]
+    list_id = result["results"][0]["body"]["id"]
+    assert client.get(f"/lists/{list_id}").status_code == status.HTTP_404_NOT_FOUND
+    assert published == []
+
+
+def test_best_effort_keeps_successful_operations(db_session) -> None:  # noqa: ARG001
+    result = _batch([
+        {"method": "POST", "path": "/lists", "body": {"title": "kept"}, "ref": "list"},
+        {"method": "POST", "path": "/lists/@{list.id}/items", "body": {"title": ""}},
+        {"method": "POST", "path": "/lists/@{missing.id}/items", "body": {"title": "item"}},
+        {"method": "PUT", "path": "/lists/@{list.id}", "body": {"description": "updated"}},
+    ], mode="best_effort")
+    assert result["committed"] is True
+    assert [x["status"] for x in result["results"]] == [200, 422, 400, 200]
+    list_id = result["results"][0]["body"]["id"]
+    saved = client.get(f"/lists/{list_id}").json()
+    assert saved["description"] == "updated"
+    assert saved["version"] == 2  # noqa: PLR2004
+    count = client.get(f"/lists/{list_id}/items", params={"page": 1, "per_page": 1}).headers["x-total-count"]
+    assert count == "0"
+
+
+def test_batch_validates_request(db_session) -> None:  # noqa: ARG001
+    response = client.post("/batch", json={"operations": []})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
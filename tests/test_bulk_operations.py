@@ -0,0 +1,88 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.crud import item_crud, list_crud
+from app.main import app
+from app.models import list_model
+from app.schemas.list_schema import DuplicateTodoList
+
+client = TestClient(app)
+
+
+def _create_list(db_session, items: int) -> tuple[int, list[int]]:
+    db_todo_list = list_model.ListModel(title="bulk_test", description="A test record for bulk operations.")
+    db_session.add(db_todo_list)
+    db_session.commit()
+    item_ids = [client.post(f"/lists/{db_todo_list.id}/items", json={"title": f"item {n}"}).json()["id"] for n in range(items)]
+    return db_todo_list.id, item_ids
+
+
+def _titles(todo_list_id: int) -> list[str]:
+    response = client.get(f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 100})
+    return [item["title"] for item in response.json()]
+
+
+class _StatementLog:
+    def __init__(self, db_session) -> None:
+        self.engine = db_session.get_bind().engine
+        self.statements = []
+
+    def __enter__(self) -> list:
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self.statements
+
+    def __exit__(self, *_) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, *_) -> None:  # noqa: ANN001
+        self.statements.append(statement)
+
+
+def test_duplicate_copies_items_in_order(db_session) -> None:
+    todo_list_id, _ = _create_list(db_session, 5)
+    response = client.post(f"/lists/{todo_list_id}:duplicate", json={"title": "copy"})
+    assert response.status_code == status.HTTP_200_OK
+    copy = response.json()
+    assert copy["title"] == "copy"
+    assert copy["id"] != todo_list_id
+    assert _titles(copy["id"]) == _titles(todo_list_id) == [f"item {n}" for n in range(5)]
+    count = client.get(f"/lists/{copy['id']}/items", params={"page": 1, "per_page": 1}).headers["x-total-count"]
+    assert count == "5"
+
+
+def test_duplicate_runs_in_chunks_without_reading_items(db_session) -> None:
+    todo_list_id, _ = _create_list(db_session, 7)
+    with _StatementLog(db_session) as statements:
+        copy = list_crud.duplicate_todo_list(db_session, todo_list_id, DuplicateTodoList(), chunk_size=3)
+    inserts = [x for x in statements if x.startswith("INSERT INTO todo_items")]
+    assert len(inserts) == 3  # noqa: PLR2004
+    assert all("SELECT" in x for x in inserts)
+    assert copy.item_count == 7  # noqa: PLR2004
+    assert client.post("/lists/999999:duplicate").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_bulk_move_appends_to_target(db_session) -> None:
+    source, item_ids = _create_list(db_session, 6)
+    target, _ = _create_list(db_session, 2)
+    with _StatementLog(db_session) as statements:
+        moved = item_crud.move_todo_items(db_session, source, target, chunk_size=4)
+    assert moved == 6  # noqa: PLR2004
+    assert len([x for x in statements if x.startswith("UPDATE todo_items")]) == 2  # noqa: PLR2004
+    assert _titles(source) == []
+    assert _titles(target) == ["item 0", "item 1", *[f"item {n}" for n in range(6)]]
+    assert client.get(f"/lists/{target}/items/{item_ids[0]}").json()["version"] == 2  # noqa: PLR2004
+    counts = [client.get(f"/lists/{x}/items", params={"page": 1, "per_page": 1}).headers["x-total-count"] for x in (source, target)]
+    assert counts == ["0", "8"]
+
+
+def test_bulk_move_selected_items(db_session) -> None:
+    source, item_ids = _create_list(db_session, 4)
+    target, _ = _create_list(db_session, 0)
+    response = client.post(f"/lists/{source}/items:move", json={"target_list_id": target, "item_ids": [item_ids[3], item_ids[1]]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"moved": 2}
+    assert _titles(source) == ["item 0", "item 2"]
+    assert _titles(target) == ["item 1", "item 3"]
+    missing = client.post(f"/lists/{source}/items:move", json={"target_list_id": 999999})
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.import_profile import ROOT_DIR, measure
+
+# 起動時間の予算(ミリ秒). CI環境に合わせて環境変数で調整できる
+COLD_START_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", "1500"))
+FIRST_REQUEST_BUDGET_MS = float(os.getenv("FIRST_REQUEST_BUDGET_MS", "500"))
+
+
+def test_cold_start_within_budget(tmp_path) -> None:
+    import_ms, first_request_ms = measure(str(tmp_path / "cold.sqlite3"))
+    assert import_ms < COLD_START_BUDGET_MS, f"import app.main took {import_ms:.1f} ms"
+    assert first_request_ms < FIRST_REQUEST_BUDGET_MS, f"first request took {first_request_ms:.1f} ms"
+
+
+def test_import_is_lazy() -> None:
+    script = (
+        "import sys\n"
+        "import app.main\n"
+        "from app import database\n"
+        "assert not database.engine_created()\n"
+        "assert 'debug_toolbar' not in sys.modules\n"
+        "assert 'pymysql' not in sys.modules\n"
+        "assert 'pyarrow' not in sys.modules\n"
+    )
+    env = {**os.environ, "DEBUG": "", "DB_BACKEND": "mysql"}
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=False)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,69 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request, status
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import CompressionMiddleware, PrecompressedBody, negotiate
+
+LARGE_BODY = [{"id": i, "title": f"item {i}"} for i in range(200)]
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+
+@app.get("/large")
+def large():
+    return LARGE_BODY
+
+
+@app.get("/small")
+def small():
+    return {"id": 1}
+
+
+cached = PrecompressedBody(b"x" * 5000)
+
+
+@app.get("/cached")
+def cached_page(request: Request):
+    return cached.to_response(request)
+
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize(("accept_encoding", "expected"), [
+    ("gzip", "gzip"),
+    ("gzip;q=0, identity", None),
+    ("identity", None),
+    ("*", next(iter(compression.ENCODERS))),
+    ("gzip, br, zstd", next(iter(compression.ENCODERS))),
+])
+def test_negotiate(accept_encoding: str, expected: str | None) -> None:
+    assert negotiate(accept_encoding) == expected
+
+
+def test_large_response_is_compressed() -> None:
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == LARGE_BODY
+
+
+def test_small_response_is_not_compressed() -> None:
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"id": 1}
+
+
+def test_precompressed_body_is_reused() -> None:
+    first = client.get("/cached", headers={"Accept-Encoding": "gzip"})
+    encoded = cached.encoded("gzip")
+    second = client.get("/cached", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert second.content == first.content
+    assert cached.encoded("gzip") is encoded
+    assert gzip.decompress(encoded) == cached.raw
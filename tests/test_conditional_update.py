@@ -0,0 +1,65 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import item_model, list_model
+
+client = TestClient(app)
+
+
+def _create_item(db_session) -> tuple[int, int]:
+    db_todo_list = list_model.ListModel(title="if_match_test", description="A test record for If-Match.")
+    db_session.add(db_todo_list)
+    db_session.commit()
+    db_todo_item = item_model.ItemModel(todo_list_id=db_todo_list.id, title="if_match_test", status_code=1)
+    db_session.add(db_todo_item)
+    db_session.commit()
+    return db_todo_list.id, db_todo_item.id
+
+
+def test_get_returns_etag(db_session) -> None:
+    todo_list_id, todo_item_id = _create_item(db_session)
+
+    response = client.get(f"/lists/{todo_list_id}/items/{todo_item_id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] == '"1"'
+    assert response.json()["version"] == 1
+
+
+def test_put_with_matching_version_increments(db_session) -> None:
+    todo_list_id, todo_item_id = _create_item(db_session)
+
+    response = client.put(f"/lists/{todo_list_id}/items/{todo_item_id}", json={"title": "updated"}, headers={"If-Match": '"1"'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["title"] == "updated"
+    assert response.json()["version"] == 2  # noqa: PLR2004
+    assert response.headers["etag"] == '"2"'
+
+
+def test_put_with_stale_version_is_rejected(db_session) -> None:
+    todo_list_id, todo_item_id = _create_item(db_session)
+    client.put(f"/lists/{todo_list_id}/items/{todo_item_id}", json={"title": "first"})
+
+    response = client.put(f"/lists/{todo_list_id}/items/{todo_item_id}", json={"title": "second"}, headers={"If-Match": '"1"'})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+    response = client.get(f"/lists/{todo_list_id}/items/{todo_item_id}")
+    assert response.json()["title"] == "first"
+
+
+def test_put_with_version_on_missing_item_is_404(db_session) -> None:
+    todo_list_id, _ = _create_item(db_session)
+
+    response = client.put(f"/lists/{todo_list_id}/items/-1", json={"title": "x"}, headers={"If-Match": '"1"'})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_put_list_with_if_match(db_session) -> None:
+    todo_list_id, _ = _create_item(db_session)
+
+    response = client.put(f"/lists/{todo_list_id}", json={"title": "renamed"}, headers={"If-Match": 'W/"1"'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] == '"2"'
+
+    response = client.put(f"/lists/{todo_list_id}", json={"title": "again"}, headers={"If-Match": '"1"'})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
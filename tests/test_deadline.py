@@ -0,0 +1,149 @@
+import datetime
+import re
+import sqlite3
+import time
+
+import pytest
+from fastapi import Depends, FastAPI, status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from app import audit, const, page_cache
+from app.crud import item_crud, list_crud
+from app.deadline import (
+    Deadline,
+    DeadlineExceededError,
+    DeadlineMiddleware,
+    deadline_exceeded_handler,
+    register_engine_events,
+    route_deadline,
+)
+from app.main import app as main_app
+from app.models import list_model
+
+engine = create_engine("sqlite://")
+register_engine_events(engine)
+
+# ヒントの書き換えを確かめるため, MySQLとして扱わせる(ヒントはSQLiteではただのコメントになる)
+mysql_engine = create_engine("sqlite://")
+mysql_engine.dialect.name = "mysql"
+register_engine_events(mysql_engine)
+executed = []
+event.listen(mysql_engine, "before_cursor_execute", lambda conn, cursor, statement, *_: executed.append(statement))
+
+app = FastAPI()
+app.add_middleware(DeadlineMiddleware, timeout=5)
+app.add_exception_handler(DeadlineExceededError, deadline_exceeded_handler)
+
+
+@app.get("/fast")
+def fast():
+    with engine.connect() as conn:
+        return {"value": conn.execute(text("SELECT 1")).scalar_one()}
+
+
+@app.get("/slow", dependencies=[Depends(route_deadline(0.05))])
+def slow():
+    time.sleep(0.1)
+    with engine.connect() as conn:
+        return {"value": conn.execute(text("SELECT 1")).scalar_one()}
+
+
+@app.get("/hinted")
+def hinted():
+    with mysql_engine.connect() as conn:
+        return {"value": conn.execute(text("SELECT 1")).scalar_one()}
+
+
+client = TestClient(app)
+main_client = TestClient(main_app)
+
+
+def test_statement_runs_within_deadline() -> None:
+    response = client.get("/fast")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"value": 1}
+
+
+def test_deadline_exceeded_returns_504() -> None:
+    response = client.get("/slow")
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+
+
+def test_route_deadline_only_tightens() -> None:
+    deadline = Deadline(1)
+    before = deadline.expires_at
+    deadline.tighten(10)
+    assert deadline.expires_at == before
+    deadline.tighten(0)
+    with pytest.raises(DeadlineExceededError):
+        deadline.check()
+
+
+def test_cancelled_deadline_raises() -> None:
+    deadline = Deadline(10)
+    deadline.cancel()
+    with pytest.raises(DeadlineExceededError):
+        deadline.check()
+
+
+def test_per_page_is_capped(monkeypatch) -> None:
+    captured = {}
+
+    class _Session:
+        def execute(self, stmt, params):
+            captured["limit"] = params["limit"]
+            return self
+
+        def all(self):
+            return []
+
+    monkeypatch.setattr(const, "MAX_PER_PAGE", 20)
+    item_crud.get_todo_items(_Session(), 1, 1, 1000)
+    assert captured["limit"] == 20
+
+    # 0件以下の指定は1件にする(負のLIMITはSQLiteでは無制限, MySQLではエラーになる)
+    for per_page in (0, -1):
+        for read in (
+            lambda: item_crud.get_todo_items(_Session(), 1, 1, per_page),
+            lambda: item_crud.get_due_items(_Session(), datetime.datetime.min, datetime.datetime.max, 1, per_page),
+            lambda: list_crud.get_todo_lists(_Session(), 1, per_page),
+            lambda: audit.get_history(_Session(), 1, 1, per_page),
+        ):
+            captured.clear()
+            read()
+            assert captured["limit"] == 1
+        assert page_cache.normalize_page(0, per_page) == (1, 1)
+
+
+@pytest.mark.parametrize("per_page", [0, -1])
+def test_non_positive_per_page_returns_one_item(db_session, per_page) -> None:
+    todo_list = list_model.ListModel(title="per_page")
+    db_session.add(todo_list)
+    db_session.commit()
+    for n in range(3):
+        main_client.post(f"/lists/{todo_list.id}/items", json={"title": f"item {n}"})
+    response = main_client.get(f"/lists/{todo_list.id}/items", params={"page": 1, "per_page": per_page})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
+
+
+def test_mysql_select_gets_max_execution_time_hint() -> None:
+    response = client.get("/hinted")
+    assert response.status_code == status.HTTP_200_OK
+    match = re.fullmatch(r"SELECT /\*\+ MAX_EXECUTION_TIME\((\d+)\) \*/ 1", executed[-1])
+    assert match is not None, executed[-1]
+    assert 0 < int(match.group(1)) <= 5000  # noqa: PLR2004
+
+
+def test_lost_connection_under_deadline_returns_504(monkeypatch) -> None:
+    def read_timeout(*_) -> None:
+        # read_timeoutが切れた時にPyMySQLが送出するのと同じエラー番号
+        raise sqlite3.OperationalError(2013, "Lost connection to MySQL server during query (timed out)")
+
+    monkeypatch.setattr(engine.dialect, "do_execute", read_timeout)
+    assert client.get("/fast").status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    # 締め切りの無い処理では接続断のまま
+    with engine.connect() as conn, pytest.raises(OperationalError):
+        conn.execute(text("SELECT 1"))
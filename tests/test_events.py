@@ -0,0 +1,88 @@
+import asyncio
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.events import RESYNC, Broker, broker
+from app.main import app
+from app.models import list_model
+from app.routers import event_router
+
+client = TestClient(app)
+
+
+def test_broker_fans_out_to_every_subscriber() -> None:
+    async def scenario():
+        broker = Broker(queue_size=8)
+        first = broker.subscribe(1)
+        second = broker.subscribe(1)
+        other = broker.subscribe(2)
+        broker.publish(1, {"type": "item.created"})
+        return await first.get(1), await second.get(1), await other.get(0.01)
+
+    first, second, other = asyncio.run(scenario())
+    assert first == second == '{"type":"item.created"}'
+    assert other is None
+
+
+def test_slow_subscriber_gets_resync_instead_of_unbounded_buffer() -> None:
+    async def scenario():
+        broker = Broker(queue_size=2)
+        subscription = broker.subscribe(1)
+        for n in range(10):
+            broker.publish(1, {"n": n})
+        await asyncio.sleep(0)
+        return await subscription.get(1), await subscription.get(0.01)
+
+    first, second = asyncio.run(scenario())
+    assert first is RESYNC
+    assert second is None
+
+
+def test_unsubscribe_releases_channel() -> None:
+    async def scenario():
+        broker = Broker(queue_size=2)
+        subscription = broker.subscribe(1)
+        broker.unsubscribe(subscription)
+        return broker.subscriber_count()
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_websocket_receives_item_changes(db_session) -> None:
+    db_todo_list = list_model.ListModel(title="events_test", description="A test record for events.")
+    db_session.add(db_todo_list)
+    db_session.commit()
+    todo_list_id = db_todo_list.id
+
+    with client.websocket_connect(f"/lists/{todo_list_id}/ws") as websocket:
+        response = client.post(f"/lists/{todo_list_id}/items", json={"title": "events_test"})
+        assert response.status_code == status.HTTP_200_OK
+        event = websocket.receive_json()
+
+    assert event["type"] == "item.created"
+    assert event["todo_list_id"] == todo_list_id
+    assert event["todo_item_id"] == response.json()["id"]
+
+
+def test_event_stream_for_missing_list_is_404(db_session) -> None:
+    response = client.get("/lists/-1/events")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_event_stream_subscribes_only_while_streaming(monkeypatch) -> None:
+    monkeypatch.setattr(event_router, "_todo_list_exists", lambda db, todo_list_id: True)
+
+    async def scenario():
+        counts = []
+        # 送られずに破棄されたレスポンスは購読しない
+        await event_router.stream_events(1, db=None)
+        counts.append(broker.subscriber_count(1))
+        response = await event_router.stream_events(1, db=None)
+        assert await anext(response.body_iterator) == "retry: 3000\n\n"
+        counts.append(broker.subscriber_count(1))
+        await response.body_iterator.aclose()
+        counts.append(broker.subscriber_count(1))
+        return counts
+
+    assert asyncio.run(scenario()) == [0, 1, 0]
@@ -0,0 +1,147 @@
+import datetime
+import json
+import time
+
+import pytest
+from sqlalchemy import insert
+
+from app import const, export, jobs, reminders, sharding
+from app.crud import item_crud
+from app.database import Base, SessionLocal, _create_engine
+from app.models.item_model import ItemModel
+from app.models.list_model import ListModel
+
+OLD = datetime.datetime(2024, 1, 1)
+NEW = datetime.datetime(2024, 6, 1)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = _create_engine(f"sqlite:///{tmp_path / 'export.sqlite3'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(sharding, "engines", lambda: [engine])
+    with engine.begin() as conn:
+        conn.execute(insert(ListModel), [{"id": n, "title": f"list {n}", "updated_at": OLD} for n in (1, 2)])
+        conn.execute(insert(ItemModel), [
+            {"todo_list_id": 1 + n % 2, "title": f"item {n}", "status_code": 1, "updated_at": NEW if n >= 5 else OLD}
+            for n in range(7)
+        ])
+        # 未来の更新日時は今回の範囲(until)より後
+        conn.execute(insert(ItemModel), {"todo_list_id": 1, "title": "future", "updated_at": datetime.datetime(2999, 1, 1)})
+    yield engine
+    engine.dispose()
+
+
+def _read_ndjson(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:  # noqa: PTH123
+        return [json.loads(line) for line in f]
+
+
+def test_ndjson_export_in_chunks(engine, tmp_path) -> None:
+    reported = []
+    result = export.export(str(tmp_path / "out"), "ndjson", chunk_size=3, progress=reported.append)
+    lists, items = result["files"]
+    assert (lists["table"], lists["rows"]) == ("todo_lists", 2)
+    assert (items["table"], items["rows"]) == ("todo_items", 7)
+    assert items["bytes"] > 0
+    rows = _read_ndjson(items["path"])
+    assert [row["title"] for row in rows] == [f"item {n}" for n in range(7)]
+    assert rows[0]["updated_at"] == "2024-01-01 00:00:00"
+    # リストの2行の後に, 項目を3行ずつ
+    assert reported == [2, 5, 8, 9]
+    # 項目数は差分で追えないので書き出さない
+    assert "item_count" not in _read_ndjson(lists["path"])[0]
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == sorted(
+        f"{name}-{datetime.datetime.fromisoformat(result['until']):%Y%m%dT%H%M%S}.ndjson" for name in ("todo_lists", "todo_items")
+    )
+
+
+def test_incremental_export(engine, tmp_path, monkeypatch) -> None:
+    result = export.export(str(tmp_path), "ndjson", since=NEW, tables=["todo_items"])
+    assert result["since"] == NEW.isoformat()
+    assert [row["title"] for row in _read_ndjson(result["files"][0]["path"])] == ["item 5", "item 6"]
+
+    # 境界ちょうどに更新された行は今回ではなく次回に含まれる
+    since = datetime.datetime.fromisoformat(result["until"])
+    with engine.begin() as conn:
+        conn.execute(ItemModel.__table__.update().where(ItemModel.id == 1).values(title="changed", updated_at=since))
+    monkeypatch.setattr(export, "db_now", lambda db: since + datetime.timedelta(seconds=const.EXPORT_LAG_SECONDS + 60))
+    result = export.export(str(tmp_path / "next"), "ndjson", since=since, tables=["todo_items"])
+    assert [row["title"] for row in _read_ndjson(result["files"][0]["path"])] == ["changed"]
+
+
+def test_failed_export_leaves_no_file(engine, tmp_path) -> None:
+    with pytest.raises(ValueError, match="unsupported export format"):
+        export.export(str(tmp_path), "csv")
+    with pytest.raises(ValueError, match="unknown tables"):
+        export.export(str(tmp_path), "ndjson", tables=["jobs"])
+
+    def fail(rows: int) -> None:
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        export.export(str(tmp_path / "out"), "ndjson", progress=fail)
+    assert list((tmp_path / "out").iterdir()) == []
+
+
+def test_parquet_export(engine, tmp_path) -> None:
+    pyarrow = pytest.importorskip("pyarrow")
+    parquet = pytest.importorskip("pyarrow.parquet")
+    result = export.export(str(tmp_path), "parquet", tables=["todo_items"], chunk_size=3)
+    path = result["files"][0]["path"]
+    metadata = parquet.ParquetFile(path).metadata
+    # 1チャンクが1つの行グループ
+    assert (metadata.num_rows, metadata.num_row_groups) == (7, 3)
+    table = parquet.read_table(path)
+    assert table.schema.field("updated_at").type == pyarrow.timestamp("us")
+    assert table.column("title").to_pylist() == [f"item {n}" for n in range(7)]
+
+
+def test_export_job(engine, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(const, "EXPORT_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(const, "EXPORT_CHUNK_SIZE", 1)
+    chunk_sizes = []
+    original = export.export
+
+    def recording_export(*args):  # noqa: ANN002, ANN202
+        chunk_sizes.append(args[4])
+        return original(*args)
+
+    monkeypatch.setattr(export, "export", recording_export)
+    runner = jobs.JobRunner(workers=1, poll_interval=0.01, bind=engine)
+    job = runner.submit("export", {"format": "ndjson", "since": NEW.isoformat(), "tables": ["todo_items"], "chunk_size": 10**9})
+    runner.start()
+    try:
+        deadline = time.monotonic() + 5
+        while (job := runner.get(job["id"]))["status"] not in jobs.FINISHED and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        runner.stop()
+    assert job["status"] == jobs.SUCCEEDED, job
+    assert job["progress"] == 2
+    assert job["result"]["files"][0]["rows"] == 2
+    assert job["result"]["files"][0]["path"].startswith(str(tmp_path / "jobs"))
+    # APIから指定されたチャンクの大きさはEXPORT_CHUNK_SIZEまでに抑える
+    assert chunk_sizes == [1]
+
+
+def test_chained_incremental_exports_match_full_export(engine, tmp_path, monkeypatch) -> None:
+    items = ItemModel.__table__
+    with engine.begin() as conn:
+        # 期限を過ぎた古い項目. リマインドの記録では更新日時は変わらない
+        conn.execute(items.update().where(items.c.id == 3).values(due_at=OLD, updated_at=OLD))
+    first = export.export(str(tmp_path / "first"), "ndjson")
+    with SessionLocal.session_factory(bind=engine) as db:
+        # 位置の間隔が無いので, 移動先の後ろの項目(更新日時は古いまま)も振り直される
+        assert item_crud.move_todo_item(db, 1, 7, after_id=1) is not None
+        db.execute(reminders.MARK_REMINDED, {"todo_item_id": 3, "due": OLD, "now": NEW})
+        db.commit()
+
+    until = datetime.datetime.fromisoformat(first["until"])
+    monkeypatch.setattr(export, "db_now", lambda db: datetime.datetime.now(datetime.UTC).replace(tzinfo=None) + datetime.timedelta(seconds=const.EXPORT_LAG_SECONDS + 60))
+    second = export.export(str(tmp_path / "second"), "ndjson", since=until)
+    full = export.export(str(tmp_path / "full"), "ndjson")
+    for n, table in enumerate(("todo_lists", "todo_items")):
+        chained = {row["id"]: row for row in _read_ndjson(first["files"][n]["path"])}
+        chained.update((row["id"], row) for row in _read_ndjson(second["files"][n]["path"]))
+        assert list(chained.values()) == _read_ndjson(full["files"][n]["path"]), table
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from app.group_commit import GroupCommitter
+
+
+def _select(db, value: int) -> int:  # noqa: ANN001
+    return db.execute(text("SELECT :value"), {"value": value}).scalar_one()
+
+
+def _fail(db, value: int) -> int:  # noqa: ANN001, ARG001
+    raise ValueError(value)
+
+
+def _submit_concurrently(committer: GroupCommitter, jobs: list) -> list:
+    results = [None] * len(jobs)
+    barrier = threading.Barrier(len(jobs))
+
+    def worker(n: int) -> None:
+        operation, value = jobs[n]
+        barrier.wait()
+        try:
+            results[n] = committer.submit(operation, value)
+        except ValueError as exc:
+            results[n] = exc
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(len(jobs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_submits_share_a_commit() -> None:
+    committer = GroupCommitter(window_ms=50, max_batch=100)
+    results = _submit_concurrently(committer, [(_select, n) for n in range(20)])
+    assert results == list(range(20))
+    assert committer.operations == 20
+    assert committer.batches < committer.operations
+
+
+def test_failure_is_returned_only_to_its_caller() -> None:
+    committer = GroupCommitter(window_ms=50, max_batch=100)
+    results = _submit_concurrently(committer, [(_select, 1), (_fail, 2), (_select, 3)])
+    assert results[0] == 1
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 3
+
+
+def test_max_batch_limits_batch_size() -> None:
+    committer = GroupCommitter(window_ms=50, max_batch=2)
+    _submit_concurrently(committer, [(_select, n) for n in range(6)])
+    assert committer.batches >= 3
+
+
+def test_single_submit_raises_operation_error() -> None:
+    committer = GroupCommitter(window_ms=1, max_batch=10)
+    with pytest.raises(ValueError):
+        committer.submit(_fail, 1)
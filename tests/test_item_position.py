@@ -0,0 +1,116 @@
+import itertools
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select, update
+
+from app.crud import item_crud
+from app.main import app
+from app.models import item_model, list_model
+
+client = TestClient(app)
+
+
+def _create_list_with_items(db_session, count: int) -> tuple[int, list[int]]:
+    db_todo_list = list_model.ListModel(title="position_test", description="A test record for item positions.")
+    db_session.add(db_todo_list)
+    db_session.commit()
+    item_ids = [client.post(f"/lists/{db_todo_list.id}/items", json={"title": f"item {n}"}).json()["id"] for n in range(count)]
+    return db_todo_list.id, item_ids
+
+
+def _order(todo_list_id: int) -> list[int]:
+    response = client.get(f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 100})
+    return [item["id"] for item in response.json()]
+
+
+class _UpdateLog:
+    def __init__(self, db_session) -> None:
+        self.engine = db_session.get_bind().engine
+        self.updates = []
+
+    def __enter__(self) -> "_UpdateLog":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *_) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001, PLR0913, PLR0917
+        if statement.startswith("UPDATE todo_items"):
+            self.updates.append(len(parameters) if executemany else 1)
+
+
+def test_items_keep_insertion_order(db_session) -> None:
+    todo_list_id, item_ids = _create_list_with_items(db_session, 5)
+    assert _order(todo_list_id) == item_ids
+
+
+def test_move_updates_only_the_moved_item(db_session) -> None:
+    todo_list_id, item_ids = _create_list_with_items(db_session, 5)
+    with _UpdateLog(db_session) as log:
+        response = client.post(f"/lists/{todo_list_id}/items/{item_ids[4]}/move", json={"after_id": item_ids[0]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["version"] == 2  # noqa: PLR2004
+    assert log.updates == [1]
+    assert _order(todo_list_id) == [item_ids[0], item_ids[4], *item_ids[1:4]]
+
+    client.post(f"/lists/{todo_list_id}/items/{item_ids[2]}/move", json={"after_id": None})
+    assert _order(todo_list_id) == [item_ids[2], item_ids[0], item_ids[4], item_ids[1], item_ids[3]]
+
+
+def test_move_rebalances_when_gap_is_exhausted(db_session) -> None:
+    todo_list_id, item_ids = _create_list_with_items(db_session, 4)
+    first, rest = item_ids[0], item_ids[1:]
+    # 毎回先頭の直後へ移すと間隔が半分ずつ減り, いずれ振り直しが必要になる
+    expected = list(item_ids)
+    for n in range(item_crud.POSITION_GAP.bit_length() + 2):
+        moving = rest[n % len(rest)]
+        response = client.post(f"/lists/{todo_list_id}/items/{moving}/move", json={"after_id": first})
+        assert response.status_code == status.HTTP_200_OK
+        expected.remove(moving)
+        expected.insert(1, moving)
+        assert _order(todo_list_id) == expected
+
+
+def test_move_shifts_the_tail_when_the_window_is_capped(db_session, monkeypatch) -> None:
+    monkeypatch.setattr(item_crud, "REBALANCE_WINDOW", 2)
+    monkeypatch.setattr(item_crud, "MAX_REBALANCE_WINDOW", 4)
+    todo_list_id, item_ids = _create_list_with_items(db_session, 10)
+    # 間隔の無い並びにする. 最大の窓でも間隔が取れない
+    for n, todo_item_id in enumerate(item_ids):
+        db_session.execute(update(item_model.ItemModel).where(item_model.ItemModel.id == todo_item_id).values(position=n + 1))
+    db_session.commit()
+
+    with _UpdateLog(db_session) as log:
+        response = client.post(f"/lists/{todo_list_id}/items/{item_ids[9]}/move", json={"after_id": item_ids[0]})
+    assert response.status_code == status.HTTP_200_OK
+    # 窓内の4件, 窓より後ろをまとめてずらす1文, 移動する項目
+    assert log.updates == [1, 4, 1]
+    assert _order(todo_list_id) == [item_ids[0], item_ids[9], *item_ids[1:9]]
+    positions = db_session.execute(
+        select(item_model.ItemModel.position).where(item_model.ItemModel.todo_list_id == todo_list_id).order_by(item_model.ItemModel.position),
+    ).scalars().all()
+    # 移動した項目から窓より後ろの先頭までは間隔が空き, それより後ろは元の間隔のまま
+    assert [b - a for a, b in itertools.pairwise(positions)] == [item_crud.POSITION_GAP] * 6 + [1] * 3
+
+
+def test_move_errors(db_session) -> None:
+    todo_list_id, item_ids = _create_list_with_items(db_session, 2)
+    missing = client.post(f"/lists/{todo_list_id}/items/{item_ids[0]}/move", json={"after_id": 999999})
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+    stale = client.post(
+        f"/lists/{todo_list_id}/items/{item_ids[0]}/move", json={"after_id": item_ids[1]}, headers={"If-Match": '"5"'},
+    )
+    assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert _order(todo_list_id) == item_ids
+
+
+def test_page_uses_position_index(db_session) -> None:
+    if db_session.get_bind().dialect.name != "sqlite":
+        return
+    statement = str(item_crud.SELECT_ITEMS_PAGE.compile(db_session.get_bind()))
+    plan = db_session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, (1, 10, 0)).all()
+    details = " ".join(row.detail for row in plan)
+    assert "ix_todo_items_todo_list_id_position" in details
+    assert "TEMP B-TREE" not in details
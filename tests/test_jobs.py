@@ -0,0 +1,146 @@
+import datetime
+import threading
+import time
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from app import const, jobs
+from app.database import Base, SessionLocal, _create_engine
+from app.main import app
+from app.models import item_model, list_model
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    engine = _create_engine(f"sqlite:///{tmp_path / 'jobs.sqlite3'}")
+    Base.metadata.create_all(engine)
+    job_runner = jobs.JobRunner(workers=2, poll_interval=0.01, stale_seconds=60, max_attempts=3, bind=engine)
+    monkeypatch.setattr(jobs, "runner", job_runner)
+    yield job_runner
+    job_runner.stop()
+    engine.dispose()
+
+
+def _wait(runner, job_id: int, statuses: tuple = jobs.FINISHED) -> dict:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        job = runner.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(runner.get(job_id))
+
+
+def _create_list(runner, items: int) -> int:
+    with SessionLocal.session_factory(bind=runner.engine) as db:
+        todo_list = list_model.ListModel(title="job_test", item_count=items)
+        db.add(todo_list)
+        db.flush()
+        db.execute(insert(item_model.ItemModel), [
+            {"todo_list_id": todo_list.id, "title": f"item {n}", "status_code": 1} for n in range(items)
+        ])
+        db.commit()
+        return todo_list.id
+
+
+def test_delete_list_job_reports_progress(runner) -> None:
+    todo_list_id = _create_list(runner, 25)
+    job = runner.submit("delete_list", {"todo_list_id": todo_list_id, "chunk_size": 10})
+    runner.start()
+    job = _wait(runner, job["id"])
+    assert job["status"] == jobs.SUCCEEDED
+    assert (job["progress"], job["total"]) == (25, 25)
+    assert job["result"] == {"deleted": True, "items": 25}
+    with runner.engine.connect() as conn:
+        assert conn.execute(select(list_model.ListModel.id).where(list_model.ListModel.id == todo_list_id)).first() is None
+        assert conn.execute(select(item_model.ItemModel.id).where(item_model.ItemModel.todo_list_id == todo_list_id)).first() is None
+
+
+def test_cancel_queued_and_running_jobs(runner, monkeypatch) -> None:
+    started = threading.Event()
+
+    def wait_for_cancel(ctx) -> None:  # noqa: ANN001
+        started.set()
+        while True:
+            ctx.progress(0)
+            time.sleep(0.01)
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "wait_for_cancel", wait_for_cancel)
+    queued = runner.submit("wait_for_cancel", {})
+    assert runner.cancel(queued["id"])["status"] == jobs.CANCELLED
+
+    running = runner.submit("wait_for_cancel", {})
+    runner.start()
+    assert started.wait(5)
+    assert runner.cancel(running["id"])["cancel_requested"] is True
+    assert _wait(runner, running["id"])["status"] == jobs.CANCELLED
+
+
+def test_stale_jobs_are_resumed(runner, monkeypatch) -> None:
+    monkeypatch.setitem(jobs.JOB_KINDS, "echo", lambda ctx, value: value)  # noqa: ARG005
+    with runner.engine.begin() as conn:
+        job_id = conn.execute(insert(jobs.jobs_table), {
+            "kind": "echo", "params": '{"value": 42}', "status": jobs.RUNNING, "owner": "crashed", "attempts": 1,
+            "heartbeat_at": datetime.datetime(2020, 1, 1),
+        }).inserted_primary_key[0]
+    runner.start()
+    job = _wait(runner, job_id)
+    assert (job["status"], job["result"], job["attempts"]) == (jobs.SUCCEEDED, 42, 2)
+
+
+def test_stop_releases_running_jobs(runner, monkeypatch) -> None:
+    started = threading.Event()
+
+    def wait_for_stop(ctx) -> None:  # noqa: ANN001
+        started.set()
+        while True:
+            ctx.progress(0)
+            time.sleep(0.01)
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "wait_for_stop", wait_for_stop)
+    job = runner.submit("wait_for_stop", {})
+    runner.start()
+    assert started.wait(5)
+    runner.stop()
+    assert runner.get(job["id"])["status"] == jobs.QUEUED
+    assert runner.get(job["id"])["attempts"] == 0
+
+
+def test_job_api(runner, db_session) -> None:
+    assert client.post("/jobs", json={"kind": "no_such_job"}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.post("/jobs", json={"kind": "delete_list", "params": {}}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get("/jobs/999").status_code == status.HTTP_404_NOT_FOUND
+
+    todo_list = list_model.ListModel(title="background delete")
+    db_session.add(todo_list)
+    db_session.commit()
+    response = client.delete(f"/lists/{todo_list.id}", params={"background": True})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = client.get(response.headers["location"]).json()
+    assert (job["kind"], job["status"], job["params"]) == ("delete_list", jobs.QUEUED, {"todo_list_id": todo_list.id})
+    assert client.post(f"/jobs/{job['id']}/cancel").json()["status"] == jobs.CANCELLED
+    assert client.post(f"/jobs/{job['id']}/cancel").status_code == status.HTTP_202_ACCEPTED
+    assert runner.get(job["id"])["status"] == jobs.CANCELLED
+
+
+def test_export_jobs_require_admin_token(runner, monkeypatch) -> None:
+    export_job = {"kind": "export", "params": {"format": "ndjson"}}
+    # トークンが未設定なら管理用APIと同様に無いものとして扱う
+    monkeypatch.setattr(const, "ADMIN_TOKEN", "")
+    assert client.post("/jobs", json=export_job).status_code == status.HTTP_404_NOT_FOUND
+    monkeypatch.setattr(const, "ADMIN_TOKEN", "secret")
+    assert client.post("/jobs", json=export_job).status_code == status.HTTP_403_FORBIDDEN
+    assert client.post("/jobs", json=export_job, headers={"X-Admin-Token": "wrong"}).status_code == status.HTTP_403_FORBIDDEN
+
+    response = client.post("/jobs", json=export_job, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    location = response.headers["location"]
+    assert client.get(location).status_code == status.HTTP_403_FORBIDDEN
+    assert client.post(f"{location}/cancel").status_code == status.HTTP_403_FORBIDDEN
+    assert client.get(location, headers={"X-Admin-Token": "secret"}).json()["status"] == jobs.QUEUED
+    assert runner.get(response.json()["id"])["status"] == jobs.QUEUED
@@ -0,0 +1,167 @@
+import gzip
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app import const, events, page_cache
+from app.crud import list_crud
+from app.main import app
+from app.page_cache import LISTS, PageCache
+from app.schemas.list_schema import DuplicateTodoList
+
+client = TestClient(app)
+
+
+def _request(accept_encoding: str = "") -> Request:
+    return Request({"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]})
+
+
+class Renderer:
+    def __init__(self, body: bytes = b"[]") -> None:
+        self.body = body
+        self.calls = 0
+
+    def __call__(self) -> tuple[bytes, dict]:
+        self.calls += 1
+        return self.body, {"X-Total-Count": str(self.calls)}
+
+
+def test_write_invalidates_only_its_list() -> None:
+    cache = PageCache(max_bytes=1 << 20)
+    first, second = Renderer(), Renderer()
+    for _ in range(3):
+        cache.response(_request(), 1, (1, 10), first)
+        cache.response(_request(), 2, (1, 10), second)
+    assert (first.calls, second.calls) == (1, 1)
+
+    cache.on_event(1, '{"type":"item.created","todo_list_id":1}')
+    response = cache.response(_request(), 1, (1, 10), first)
+    cache.response(_request(), 2, (1, 10), second)
+    assert (first.calls, second.calls) == (2, 1)
+    assert response.headers["X-Total-Count"] == "2"
+    assert cache.stats()["hits"] == 5
+    assert cache.stats()["hit_rate"] == pytest.approx(5 / 8)
+
+
+def test_list_events_invalidate_list_index() -> None:
+    cache = PageCache(max_bytes=1 << 20)
+    lists = Renderer()
+    cache.response(_request(), LISTS, (1, 10), lists)
+    cache.on_event(1, '{"type":"item.updated","todo_list_id":1}')
+    cache.response(_request(), LISTS, (1, 10), lists)
+    assert lists.calls == 1
+    cache.on_event(1, '{"type":"list.updated","todo_list_id":1}')
+    cache.response(_request(), LISTS, (1, 10), lists)
+    assert lists.calls == 2
+
+
+def test_eviction_keeps_bytes_under_limit() -> None:
+    cache = PageCache(max_bytes=3000)
+    renderer = Renderer(b"x" * 1000)
+    for page in range(1, 6):
+        cache.response(_request(), 1, (page, 10), renderer)
+    assert cache.nbytes <= 3000
+    assert cache.stats()["evictions"] == 2
+    # 直近に使ったページが残る
+    cache.response(_request(), 1, (5, 10), renderer)
+    assert renderer.calls == 5
+
+
+def test_compressed_copies_count_against_limit(monkeypatch) -> None:
+    monkeypatch.setattr(const, "COMPRESSION_MINIMUM_SIZE", 100)
+    cache = PageCache(max_bytes=1 << 20)
+    renderer = Renderer(b'{"title":"item"}' * 200)
+    cache.response(_request(), 1, (1, 10), renderer)
+    raw_bytes = cache.nbytes
+    response = cache.response(_request("gzip"), 1, (1, 10), renderer)
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == renderer.body
+    assert cache.nbytes == raw_bytes + len(response.body)
+
+
+def test_generation_table_is_bounded() -> None:
+    cache = PageCache(max_bytes=1 << 20, max_generations=10)
+    renderer = Renderer()
+    cache.response(_request(), 1, (1, 10), renderer)
+    for channel in range(100, 120):
+        cache.invalidate(channel)
+    assert len(cache._generations) <= 10
+    # 世代の表を作り直した後も, 古いページは使わない
+    cache.response(_request(), 1, (1, 10), renderer)
+    assert renderer.calls == 2
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = PageCache(max_bytes=1 << 20)
+    monkeypatch.setattr(page_cache, "cache", cache)
+    return cache
+
+
+def test_item_pages_are_cached_until_the_list_changes(db_session, cache) -> None:
+    todo_list_id = client.post("/lists/", json={"title": "cached"}).json()["id"]
+    item_id = client.post(f"/lists/{todo_list_id}/items", json={"title": "first"}).json()["id"]
+    url = f"/lists/{todo_list_id}/items"
+
+    first = client.get(url, params={"page": 1, "per_page": 10})
+    again = client.get(url, params={"page": "01", "per_page": 10})
+    assert first.json() == again.json()
+    assert first.headers["X-Total-Count"] == "1"
+    assert cache.stats()["hits"] == 1
+
+    client.put(f"{url}/{item_id}", json={"title": "renamed"})
+    assert [x["title"] for x in client.get(url, params={"page": 1, "per_page": 10}).json()] == ["renamed"]
+    client.post(url, json={"title": "second"})
+    response = client.get(url, params={"page": 1, "per_page": 10})
+    assert [x["title"] for x in response.json()] == ["renamed", "second"]
+    assert response.headers["X-Total-Count"] == "2"
+    client.delete(f"{url}/{item_id}")
+    assert [x["title"] for x in client.get(url, params={"page": 1, "per_page": 10}).json()] == ["second"]
+
+    fields = client.get(url, params={"page": 1, "per_page": 10, "fields": "title"})
+    assert fields.json() == [{"title": "second"}]
+
+
+def test_list_pages_are_cached_until_a_list_changes(db_session, cache) -> None:
+    todo_list_id = client.post("/lists/", json={"title": "before"}).json()["id"]
+    params = {"page": 1, "per_page": const.MAX_PER_PAGE}
+    assert "before" in [x["title"] for x in client.get("/lists/", params=params).json()]
+    client.post(f"/lists/{todo_list_id}/items", json={"title": "item"})
+    client.get("/lists/", params=params)
+    assert cache.stats()["hits"] == 1
+
+    client.put(f"/lists/{todo_list_id}", json={"title": "after"})
+    titles = [x["title"] for x in client.get("/lists/", params=params).json()]
+    assert "after" in titles and "before" not in titles
+
+
+def test_duplicated_list_pages_are_refreshed_after_each_chunk(db_session, cache, monkeypatch) -> None:
+    source = client.post("/lists/", json={"title": "source"}).json()["id"]
+    for n in range(3):
+        client.post(f"/lists/{source}/items", json={"title": f"item {n}"})
+    pages = []
+    publish = events.publish
+
+    def read_copy_while_copying(todo_list_id: int, event_type: str, **fields) -> None:  # noqa: ANN003
+        publish(todo_list_id, event_type, **fields)
+        # 複製先のページをコピーの途中で読んでキャッシュさせる
+        if event_type in {"list.created", "items.copied"}:
+            page = client.get(f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 10}).json()
+            pages.append([x["title"] for x in page])
+
+    monkeypatch.setattr(events, "publish", read_copy_while_copying)
+    copy = list_crud.duplicate_todo_list(db_session, source, DuplicateTodoList(), chunk_size=2)
+    monkeypatch.setattr(events, "publish", publish)
+
+    assert pages == [[], ["item 0", "item 1"], ["item 0", "item 1", "item 2"]]
+    response = client.get(f"/lists/{copy.id}/items", params={"page": 1, "per_page": 10})
+    assert [x["title"] for x in response.json()] == ["item 0", "item 1", "item 2"]
+
+
+def test_admin_stats(monkeypatch, cache) -> None:
+    monkeypatch.setattr(const, "ADMIN_TOKEN", "secret")
+    response = client.get("/admin/page-cache", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["max_bytes"] == 1 << 20
@@ -0,0 +1,77 @@
+import json
+import time
+
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+
+from app import const
+from app.main import app as main_app
+from app.profiling import Profiler, ProfilingMiddleware
+
+app = FastAPI()
+app.add_middleware(ProfilingMiddleware, token="secret", sample_rate=0)
+
+
+def _busy(seconds: float) -> int:
+    total = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+@app.get("/work")
+def work():
+    return {"total": _busy(0.1)}
+
+
+client = TestClient(app)
+admin_client = TestClient(main_app)
+
+
+def test_request_without_header_is_not_profiled() -> None:
+    response = client.get("/work")
+    assert response.status_code == status.HTTP_200_OK
+    assert "x-profile-id" not in response.headers
+    response = client.get("/work", headers={"X-Profile": "wrong"})
+    assert "x-profile-id" not in response.headers
+
+
+def test_profiled_request_is_exported(monkeypatch) -> None:
+    monkeypatch.setattr(const, "ADMIN_TOKEN", "secret")
+    response = client.get("/work", headers={"X-Profile": "secret"})
+    profile_id = response.headers["x-profile-id"]
+
+    response = admin_client.get(f"/admin/profiles/{profile_id}", params={"format": "collapsed"}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == status.HTTP_200_OK
+    assert "_busy (test_profiling.py:" in response.text
+
+    response = admin_client.get(f"/admin/profiles/{profile_id}", headers={"X-Admin-Token": "secret"})
+    speedscope = response.json()
+    frames = speedscope["shared"]["frames"]
+    assert any(frame["name"] == "_busy" for frame in frames)
+    assert len(speedscope["profiles"][0]["samples"]) == len(speedscope["profiles"][0]["weights"])
+    json.dumps(speedscope)
+
+
+def test_admin_api_requires_token(monkeypatch) -> None:
+    monkeypatch.setattr(const, "ADMIN_TOKEN", "")
+    assert admin_client.get("/admin/profiles").status_code == status.HTTP_404_NOT_FOUND
+    monkeypatch.setattr(const, "ADMIN_TOKEN", "secret")
+    assert admin_client.get("/admin/profiles").status_code == status.HTTP_403_FORBIDDEN
+    assert admin_client.get("/admin/profiles", headers={"X-Admin-Token": "secret"}).status_code == status.HTTP_200_OK
+
+
+def test_worker_profile_stops_after_seconds() -> None:
+    worker_profiler = Profiler(interval_ms=1, keep=5)
+    profile = worker_profiler.start_for(0.05)
+    _busy(0.1)
+    time.sleep(0.05)
+    assert profile.finished
+    assert sum(profile.samples.values()) > 0
+    assert worker_profiler._thread is None  # noqa: SLF001
+
+
+def test_disabled_profiler_adds_no_middleware() -> None:
+    assert not const.ADMIN_TOKEN
+    assert ProfilingMiddleware not in [middleware.cls for middleware in main_app.user_middleware]
@@ -0,0 +1,197 @@
+import datetime
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select, update
+
+from app import reminders
+from app.crud import item_crud, list_crud
+from app.database import Base, SessionLocal, _create_engine
+from app.main import app
+from app.models import item_model, list_model
+from app.schemas.item_schema import UpdateTodoItem
+from app.schemas.list_schema import DuplicateTodoList
+
+client = TestClient(app)
+
+NOW = datetime.datetime(2026, 10, 19, 12, 0, 0)
+
+
+def test_timer_wheel_fires_entries_in_slot_order() -> None:
+    wheel = reminders.TimerWheel(tick=1, slots=60, now=1000)
+    wheel.add("late", 1010.5, "late")
+    wheel.add("early", 1002, "early")
+    wheel.add("moved", 1001, "moved")
+    wheel.add("moved", 1020, "moved")    # 同じkeyは置き換える
+    assert not wheel.add("far", 1060, "far")
+    assert wheel.add("past", 900, "past")    # 過去の予定は次の取り出しで出る
+    assert len(wheel) == 4
+
+    assert wheel.advance(1000.5) == ["past"]
+    assert wheel.advance(1005) == ["early"]
+    assert wheel.advance(1019) == ["late"]
+    assert wheel.advance(2000) == ["moved"]    # 1周以上進んでも取りこぼさない
+    assert len(wheel) == 0
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = _create_engine(f"sqlite:///{tmp_path / 'reminders.sqlite3'}")
+    Base.metadata.create_all(engine)
+    published = []
+    monkeypatch.setattr(reminders.events, "publish", lambda *args, **fields: published.append((args, fields)))
+    engine.published = published
+    yield engine
+    engine.dispose()
+
+
+def _create_items(engine, due_offsets: dict[str, float | None], completed: tuple = ()) -> tuple[int, dict[str, int]]:
+    with SessionLocal.session_factory(bind=engine) as db:
+        todo_list = list_model.ListModel(title="reminders", item_count=len(due_offsets))
+        db.add(todo_list)
+        db.flush()
+        ids = {}
+        for title, offset in due_offsets.items():
+            ids[title] = db.execute(insert(item_model.ItemModel).values(
+                todo_list_id=todo_list.id,
+                title=title,
+                due_at=None if offset is None else NOW + datetime.timedelta(seconds=offset),
+                status_code=2 if title in completed else 1,
+            )).inserted_primary_key[0]
+        db.commit()
+        return todo_list.id, ids
+
+
+def _fired(engine) -> list[str]:
+    return [fields["todo_item_id"] for _, fields in engine.published]
+
+
+def test_scheduler_fires_each_due_item_once(engine) -> None:
+    todo_list_id, ids = _create_items(
+        engine,
+        {"missed": -60, "soon": 10, "later": 500, "done": -30, "none": None},
+        completed=("done",),
+    )
+    scheduler = reminders.ReminderScheduler(tick=1, horizon=300, catchup=3600, engines=lambda: [engine])
+
+    assert scheduler.run_once(NOW) == 1    # 停止中に期限が来た項目は起動時に送る
+    assert _fired(engine) == [ids["missed"]]
+    assert scheduler.run_once(NOW + datetime.timedelta(seconds=5)) == 0
+    assert scheduler.run_once(NOW + datetime.timedelta(seconds=11)) == 1
+    assert scheduler.run_once(NOW + datetime.timedelta(seconds=501)) == 1
+    assert _fired(engine) == [ids["missed"], ids["soon"], ids["later"]]
+    assert engine.published[0][0] == (todo_list_id, "item.due")
+
+    with engine.connect() as conn:
+        reminded = dict(conn.execute(select(item_model.ItemModel.title, item_model.ItemModel.reminded_at)).all())
+    assert reminded["missed"] == NOW
+    assert reminded["done"] is None and reminded["none"] is None
+
+    # 別のプロセスの読み込み直しでも, 送ったリマインドは送り直さない
+    again = reminders.ReminderScheduler(tick=1, horizon=300, catchup=3600, engines=lambda: [engine])
+    assert again.run_once(NOW + datetime.timedelta(seconds=600)) == 0
+
+
+def test_scheduler_skips_items_changed_after_loading(engine) -> None:
+    _, ids = _create_items(engine, {"moved": 10, "completed": 20})
+    scheduler = reminders.ReminderScheduler(tick=1, horizon=300, catchup=0, engines=lambda: [engine])
+    scheduler.run_once(NOW)
+    with SessionLocal.session_factory(bind=engine) as db:
+        db.execute(update(item_model.ItemModel).where(item_model.ItemModel.id == ids["moved"]).values(due_at=NOW + datetime.timedelta(hours=1)))
+        db.execute(update(item_model.ItemModel).where(item_model.ItemModel.id == ids["completed"]).values(status_code=2))
+        db.commit()
+    assert scheduler.run_once(NOW + datetime.timedelta(seconds=30)) == 0
+    assert engine.published == []
+
+
+def test_scheduler_picks_up_items_scheduled_inside_loaded_window(engine) -> None:
+    scheduler = reminders.ReminderScheduler(tick=1, horizon=300, catchup=0, engines=lambda: [engine])
+    scheduler.run_once(NOW)
+    todo_list_id, ids = _create_items(engine, {"new": 30})
+    scheduler.running = True
+    scheduler.schedule(ids["new"], todo_list_id, NOW + datetime.timedelta(seconds=30))
+    assert scheduler.run_once(NOW + datetime.timedelta(seconds=31)) == 1
+    assert _fired(engine) == [ids["new"]]
+
+
+def test_scheduler_picks_up_items_changed_while_loading(engine) -> None:
+    todo_list_id, ids = _create_items(engine, {"cleared": 20})
+    loading = [True]
+
+    def engines():  # noqa: ANN202
+        if not loading[0]:
+            yield engine
+            return
+        loading[0] = False
+        # 読み込みが読む前に期限を外された項目. 読み込みが読む行は変更前のものとする
+        scheduler.schedule(ids["cleared"], todo_list_id, None)
+        yield engine
+        # 読み込みが通り過ぎた後に作成された項目
+        _, created = _create_items(engine, {"created": 30})
+        ids.update(created)
+        scheduler.schedule(ids["created"], todo_list_id, NOW + datetime.timedelta(seconds=30))
+
+    scheduler = reminders.ReminderScheduler(tick=1, horizon=300, catchup=0, engines=engines)
+    scheduler.reset(NOW)
+    scheduler.running = True
+    assert scheduler.load(NOW) == 1
+    assert list(scheduler.wheel._where) == [ids["created"]]  # noqa: SLF001
+
+
+def test_scheduler_sends_reminder_to_current_list(engine) -> None:
+    todo_list_id, ids = _create_items(engine, {"moved": 10})
+    target_list_id, _ = _create_items(engine, {})
+    scheduler = reminders.ReminderScheduler(tick=1, horizon=300, catchup=0, engines=lambda: [engine])
+    scheduler.run_once(NOW)
+    with SessionLocal.session_factory(bind=engine) as db:
+        assert item_crud.move_todo_items(db, todo_list_id, target_list_id) == 1
+    assert scheduler.run_once(NOW + datetime.timedelta(seconds=11)) == 1
+    assert engine.published[-1] == ((target_list_id, "item.due"), {"todo_item_id": ids["moved"], "due_at": (NOW + datetime.timedelta(seconds=10)).isoformat()})
+
+def test_scheduler_picks_up_duplicated_and_reopened_items(engine, monkeypatch) -> None:
+    todo_list_id, ids = _create_items(engine, {"copied": 10, "reopened": 20, "later": 600}, completed=("reopened",))
+    scheduler = reminders.ReminderScheduler(tick=1, horizon=300, catchup=0, engines=lambda: [engine])
+    scheduler.run_once(NOW)
+    scheduler.running = True
+    monkeypatch.setattr(reminders, "scheduler", scheduler)
+    with SessionLocal.session_factory(bind=engine) as db:
+        copy_id = list_crud.duplicate_todo_list(db, todo_list_id, DuplicateTodoList()).id
+        item_crud.put_todo_item(db, todo_list_id, ids["reopened"], UpdateTodoItem(complete=False))
+        copied = dict(db.execute(select(item_model.ItemModel.title, item_model.ItemModel.id).where(item_model.ItemModel.todo_list_id == copy_id)).all())
+
+    assert scheduler.run_once(NOW + datetime.timedelta(seconds=21)) == 3  # noqa: PLR2004
+    fired = [fields["todo_item_id"] for args, fields in engine.published if args[1] == "item.due"]
+    assert sorted(fired) == sorted([ids["copied"], copied["copied"], ids["reopened"]])
+
+
+def test_due_items_endpoint_returns_only_pending_items_in_window(db_session) -> None:
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    todo_list = list_model.ListModel(title="due")
+    db_session.add(todo_list)
+    db_session.commit()
+    created = {}
+    for title, offset in {"soon": 60, "sooner": 30, "later": 7200, "overdue": -60, "done": 30, "none": None}.items():
+        due_at = None if offset is None else (now + datetime.timedelta(seconds=offset)).isoformat()
+        created[title] = client.post(f"/lists/{todo_list.id}/items", json={"title": title, "due_at": due_at}).json()["id"]
+    client.put(f"/lists/{todo_list.id}/items/{created['done']}", json={"complete": True})
+
+    response = client.get("/items/due", params={"within": 3600})
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["title"] for item in response.json() if item["todo_list_id"] == todo_list.id] == ["sooner", "soon"]
+
+    response = client.get("/items/due", params={"within": 3600, "overdue": True})
+    assert [item["title"] for item in response.json() if item["todo_list_id"] == todo_list.id] == ["overdue", "sooner", "soon"]
+
+    assert client.get("/items/due").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get("/items/due", params={"within": 0}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_due_items_use_status_due_index(db_session) -> None:
+    if db_session.get_bind().dialect.name != "sqlite":
+        return
+    statement = str(item_crud.SELECT_DUE_ITEMS.compile(db_session.get_bind()))
+    plan = db_session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, (1, str(NOW), str(NOW), 10, 0)).all()
+    details = " ".join(row.detail for row in plan)
+    assert "ix_todo_items_status_code_due_at" in details
+    assert "TEMP B-TREE" not in details
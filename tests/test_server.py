@@ -0,0 +1,29 @@
+from app import const, server
+
+
+def test_workers_follow_cpu_count(monkeypatch) -> None:
+    monkeypatch.setattr(const, "WEB_CONCURRENCY", 0)
+    monkeypatch.setattr(const, "MAX_WORKERS", 16)
+    monkeypatch.setattr(server, "cpu_count", lambda: 4)
+    assert server.default_workers() == 4
+
+
+def test_workers_are_capped(monkeypatch) -> None:
+    monkeypatch.setattr(const, "WEB_CONCURRENCY", 0)
+    monkeypatch.setattr(const, "MAX_WORKERS", 8)
+    monkeypatch.setattr(server, "cpu_count", lambda: 64)
+    assert server.default_workers() == 8
+
+
+def test_workers_can_be_set_explicitly(monkeypatch) -> None:
+    monkeypatch.setattr(const, "WEB_CONCURRENCY", 3)
+    assert server.default_workers() == 3
+
+
+def test_options_preload_and_recycle_workers() -> None:
+    options = server.options()
+    assert options["preload_app"] is True
+    assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert options["max_requests"] == const.MAX_REQUESTS
+    assert options["keepalive"] == const.KEEPALIVE_SECONDS
+    assert options["backlog"] == const.BACKLOG
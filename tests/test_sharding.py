@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+from sqlalchemy import select
+
+from app import audit, const, sharding
+from app.crud import item_crud, list_crud
+from app.database import Base, _create_engine
+from app.models import list_model
+from app.models.history_model import HistoryModel, OutboxModel
+from app.schemas.item_schema import NewTodoItem, UpdateTodoItem
+from app.crud.errors import CrossShardError
+from app.schemas.list_schema import DuplicateTodoList, NewTodoList
+
+SHARDS = 3
+BUCKETS = 16
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    engines = [_create_engine(f"sqlite:///{tmp_path / f'shard{n}.sqlite3'}") for n in range(SHARDS)]
+    for engine in engines:
+        Base.metadata.create_all(engine)
+    shard_router = sharding.ShardRouter(engines, [n % SHARDS for n in range(BUCKETS)], block_size=4)
+    monkeypatch.setattr(const, "SHARD_URLS", ["sqlite://"])
+    monkeypatch.setattr(sharding, "_router", shard_router)
+    yield shard_router
+    for engine in engines:
+        engine.dispose()
+
+
+def _lists_on(router, shard: int) -> list[int]:
+    with sharding.SessionLocal.session_factory(bind=router.engines[shard]) as db:
+        return list(db.execute(select(list_model.ListModel.id).order_by(list_model.ListModel.id)).scalars())
+
+
+def test_lists_are_created_on_their_shard(router) -> None:
+    created = [list_crud.post_todo_list(None, NewTodoList(title=f"list {n}")).id for n in range(20)]
+    assert len(set(created)) == len(created)
+    for shard in range(SHARDS):
+        assert _lists_on(router, shard) == sorted(x for x in created if router.shard_for(x) == shard)
+
+
+def test_items_follow_their_list(router) -> None:
+    todo_list_id = list_crud.post_todo_list(None, NewTodoList(title="list")).id
+    with router.session_for(todo_list_id) as db:
+        item = item_crud.post_todo_item(db, todo_list_id, NewTodoItem(title="item"))
+        assert item_crud.get_todo_item(db, todo_list_id, item.id).title == "item"
+        assert item_crud.count_todo_items(db, todo_list_id) == 1
+
+
+def test_ids_are_unique_across_threads(router) -> None:
+    ids = []
+    lock = threading.Lock()
+
+    def worker() -> None:
+        for _ in range(25):
+            new_id = router.next_id("todo_items")
+            with lock:
+                ids.append(new_id)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 100  # noqa: PLR2004
+
+
+def test_id_allocation_starts_above_existing_rows(router) -> None:
+    with sharding.SessionLocal.session_factory(bind=router.engines[2]) as db:
+        db.add(list_model.ListModel(id=500, title="existing"))
+        db.commit()
+    assert router.next_id("todo_lists") == 501  # noqa: PLR2004
+
+
+def test_scatter_gather_pagination_matches_global_order(router) -> None:
+    created = [list_crud.post_todo_list(None, NewTodoList(title=f"list {n}")).id for n in range(23)]
+    pages = [list_crud.get_todo_lists(None, page, 5) for page in range(1, 7)]
+    assert [row.id for page in pages for row in page] == sorted(created)
+    assert list_crud.count_todo_lists(None, exact=True) == 23  # noqa: PLR2004
+    # 採番のブロックに関係なく, 各シャードの件数の合計
+    assert list_crud.count_todo_lists(None) == 23  # noqa: PLR2004
+
+
+def test_duplicate_stays_on_the_source_shard(router) -> None:
+    todo_list_id = list_crud.post_todo_list(None, NewTodoList(title="template")).id
+    with router.session_for(todo_list_id) as db:
+        items = [item_crud.post_todo_item(db, todo_list_id, NewTodoItem(title=f"item {n}")).id for n in range(5)]
+        copy = list_crud.duplicate_todo_list(db, todo_list_id, DuplicateTodoList(), chunk_size=2)
+        assert router.shard_for(copy.id) == router.shard_for(todo_list_id)
+        copied = [row.id for row in item_crud.get_todo_items(db, copy.id, 1, 10)]
+        # コピーに振ったIDは予約済みなので, 後から追加する項目のIDとは重ならない
+        added = [item_crud.post_todo_item(db, copy.id, NewTodoItem(title=f"added {n}")).id for n in range(10)]
+    assert len(copied) == len(items)
+    assert len(set(items) | set(copied) | set(added)) == len(items) + len(copied) + len(added)
+
+
+def test_bulk_move_rejects_lists_on_other_shards(router) -> None:
+    created = [list_crud.post_todo_list(None, NewTodoList(title=f"list {n}")).id for n in range(6)]
+    source = created[0]
+    target = next(x for x in created if router.shard_for(x) != router.shard_for(source))
+    with router.session_for(source) as db, pytest.raises(CrossShardError):
+        item_crud.move_todo_items(db, source, target)
+
+
+def test_move_bucket(router, tmp_path) -> None:
+    created = [list_crud.post_todo_list(None, NewTodoList(title=f"list {n}")).id for n in range(10)]
+    todo_list_id = created[0]
+    with router.session_for(todo_list_id) as db:
+        item_id = item_crud.post_todo_item(db, todo_list_id, NewTodoItem(title="item")).id
+    audit.flush()
+    # 移動時に送信待ちのまま残る変更
+    with router.session_for(todo_list_id) as db:
+        item_crud.put_todo_item(db, todo_list_id, item_id, UpdateTodoItem(complete=True))
+    bucket = router.bucket_for(todo_list_id)
+    source = router.shard_for(todo_list_id)
+    target = (source + 1) % SHARDS
+    in_bucket = [x for x in created if router.bucket_for(x) == bucket]
+
+    # リストと項目, それぞれの作成の履歴, 送信待ちの更新
+    copied = sharding.move_bucket(router, bucket, target, str(tmp_path / "map.json"))
+    assert copied == 2 * (len(in_bucket) + 1) + 1
+
+    assert router.shard_for(todo_list_id) == target
+    assert not set(in_bucket) & set(_lists_on(router, source))
+    assert set(in_bucket) <= set(_lists_on(router, target))
+    with router.session_for(todo_list_id) as db:
+        assert item_crud.count_todo_items(db, todo_list_id, exact=True) == 1
+    assert sharding.load_bucket_map(str(tmp_path / "map.json"), BUCKETS)[bucket] == target
+
+    audit.flush()
+    with router.session_for(todo_list_id) as db:
+        history = audit.get_history(db, todo_list_id, 1, 10)
+    assert [(row.entity, row.action) for row in history] == [("item", "updated"), ("item", "created"), ("list", "created")]
+    with sharding.SessionLocal.session_factory(bind=router.engines[source]) as db:
+        for model in (HistoryModel, OutboxModel):
+            assert db.execute(select(model.id).where(model.todo_list_id.in_(in_bucket))).first() is None
+    # 変更履歴のidはシャードをまたいで一意
+    history_ids = []
+    for engine in router.engines:
+        with sharding.SessionLocal.session_factory(bind=engine) as db:
+            history_ids += db.execute(select(HistoryModel.id)).scalars().all()
+    assert len(history_ids) == len(set(history_ids)) == len(created) + 2
+
+
+def test_plan_bucket_map_moves_minimum() -> None:
+    current = [0] * 8
+    planned = sharding.plan_bucket_map(current, 2)
+    assert planned.count(0) == planned.count(1) == 4  # noqa: PLR2004
+    assert sharding.plan_bucket_map(planned, 2) == planned
+    assert sum(a != b for a, b in zip(planned, sharding.plan_bucket_map(planned, 4), strict=True)) == 4  # noqa: PLR2004
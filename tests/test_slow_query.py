@@ -0,0 +1,62 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app import const
+from app.main import app
+from app.slow_query import SlowQueryLog, parameter_shape, register_engine_events
+
+client = TestClient(app)
+
+
+def _engine(tmp_path, threshold_ms: float, log: SlowQueryLog):  # noqa: ANN001, ANN202
+    # EXPLAINは別の接続で取るので, ファイルのDBを使う
+    engine = create_engine(f"sqlite:///{tmp_path / 'slow.sqlite3'}")
+    register_engine_events(engine, threshold_ms, log)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, value INTEGER)"))
+        conn.execute(text("INSERT INTO t (value) VALUES (:value)"), [{"value": n} for n in range(100)])
+    return engine
+
+
+def test_records_slow_statements_with_plan(tmp_path) -> None:
+    log = SlowQueryLog(keep=10)
+    engine = _engine(tmp_path, 0, log)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT * FROM t WHERE value = :value"), {"value": 3}).all()
+    log.join()
+
+    entry = next(x for x in log.entries() if x["statement"].startswith("SELECT"))
+    assert entry["parameters"] == {"value": "int"}
+    assert entry["duration_ms"] >= 0
+    assert "SCAN" in str(entry["plan"])
+    assert not [x for x in log.entries() if x["statement"].startswith("EXPLAIN")]
+
+
+def test_fast_statements_are_not_recorded(tmp_path) -> None:
+    log = SlowQueryLog(keep=10)
+    engine = _engine(tmp_path, 10_000, log)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1")).all()
+    assert log.entries() == []
+
+
+def test_ring_buffer_is_bounded(tmp_path) -> None:
+    log = SlowQueryLog(keep=3, explain=False)
+    engine = _engine(tmp_path, 0, log)
+    with engine.connect() as conn:
+        for n in range(10):
+            conn.execute(text("SELECT :n"), {"n": n}).all()
+    assert len(log.entries()) == 3  # noqa: PLR2004
+
+
+def test_parameter_shape_hides_values() -> None:
+    assert parameter_shape({"title": "secret", "limit": 20}, False) == {"title": "str", "limit": "int"}
+    assert parameter_shape([(1, "a"), (2, "b")], True) == {"executemany": 2, "each": ["int", "str"]}
+
+
+def test_admin_endpoint(monkeypatch) -> None:
+    monkeypatch.setattr(const, "ADMIN_TOKEN", "secret")
+    response = client.get("/admin/slow-queries", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == status.HTTP_200_OK
+    assert isinstance(response.json(), list)
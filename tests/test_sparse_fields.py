@@ -0,0 +1,81 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.models import list_model
+from app.schemas import fieldset
+from app.schemas.item_schema import ResponseTodoItem
+
+client = TestClient(app)
+
+
+def _create_list_with_items(db_session) -> tuple[int, list[int]]:
+    db_todo_list = list_model.ListModel(title="fields_test", description="A test record for sparse fieldsets.")
+    db_session.add(db_todo_list)
+    db_session.commit()
+    item_ids = [
+        client.post(f"/lists/{db_todo_list.id}/items", json={"title": f"item {n}", "description": "long text"}).json()["id"]
+        for n in range(3)
+    ]
+    return db_todo_list.id, item_ids
+
+
+class _StatementLog:
+    def __init__(self, db_session) -> None:
+        self.engine = db_session.get_bind().engine
+        self.statements = []
+
+    def __enter__(self) -> list:
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self.statements
+
+    def __exit__(self, *_) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, *_) -> None:  # noqa: ANN001
+        self.statements.append(statement)
+
+
+def test_item_page_selects_only_requested_columns(db_session) -> None:
+    todo_list_id, item_ids = _create_list_with_items(db_session)
+    with _StatementLog(db_session) as statements:
+        response = client.get(
+            f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 10, "fields": "title,id,status_code"},
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["x-total-count"] == "3"
+    assert response.json() == [{"id": x, "title": f"item {n}", "status_code": 1} for n, x in enumerate(item_ids)]
+    page_query = next(x for x in statements if "FROM todo_items" in x)
+    assert "description" not in page_query
+    assert "created_at" not in page_query
+
+
+def test_single_resources_keep_etag(db_session) -> None:
+    todo_list_id, item_ids = _create_list_with_items(db_session)
+    item = client.get(f"/lists/{todo_list_id}/items/{item_ids[0]}", params={"fields": "title"})
+    assert item.json() == {"title": "item 0"}
+    assert item.headers["etag"] == '"1"'
+    todo_list = client.get(f"/lists/{todo_list_id}", params={"fields": "id,version"})
+    assert todo_list.json() == {"id": todo_list_id, "version": 1}
+    lists = client.get("/lists/", params={"page": 1, "per_page": 100, "fields": "title"})
+    assert {"title": "fields_test"} in lists.json()
+
+
+def test_archived_items_with_fields(db_session) -> None:
+    todo_list_id, item_ids = _create_list_with_items(db_session)
+    response = client.get(
+        f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 10, "fields": "title", "include_archived": True},
+    )
+    assert response.json() == [{"title": f"item {n}"} for n in range(len(item_ids))]
+
+
+def test_unknown_fields_are_rejected(db_session) -> None:  # noqa: ARG001
+    response = client.get("/lists/1/items", params={"page": 1, "per_page": 10, "fields": "title,secret"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_partial_models_are_cached() -> None:
+    fields = fieldset.parse(ResponseTodoItem, "title, id")
+    assert fields == ("id", "title")
+    assert fieldset.partial_model(ResponseTodoItem, fields) is fieldset.partial_model(ResponseTodoItem, fields)
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.sqlite import READ_ONLY, WriterQueue, configure_engine
+
+
+def test_pragmas_are_applied(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'pragma.sqlite3'}")
+    configure_engine(engine, busy_timeout_ms=1234)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar_one() == "wal"
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar_one() == 1
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar_one() == 1234
+
+
+def test_writer_queue_is_fifo() -> None:
+    writers = WriterQueue()
+    order = []
+    writers.acquire()
+
+    def worker(n: int) -> None:
+        writers.acquire()
+        order.append(n)
+        writers.release()
+
+    threads = []
+    for n in range(5):
+        thread = threading.Thread(target=worker, args=(n,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)    # チケットの取得順を固定する
+    writers.release()
+    for thread in threads:
+        thread.join()
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_concurrent_writers_do_not_fail(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'writers.sqlite3'}", connect_args={"check_same_thread": False})
+    configure_engine(engine, busy_timeout_ms=100)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE counter (n INTEGER)"))
+
+    def worker() -> None:
+        for _ in range(20):
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO counter VALUES (1)"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM counter")).scalar_one() == 160
+
+
+def test_read_then_write_transactions_do_not_fail(tmp_path) -> None:
+    # 読み込んだ後に書き込むトランザクションも, 開始時に書き込みロックを取るので失敗しない
+    engine = create_engine(f"sqlite:///{tmp_path / 'upgrade.sqlite3'}", connect_args={"check_same_thread": False})
+    configure_engine(engine, busy_timeout_ms=100)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE counter (n INTEGER)"))
+
+    def worker() -> None:
+        for _ in range(20):
+            with engine.begin() as conn:
+                count = conn.execute(text("SELECT COUNT(*) FROM counter")).scalar_one()
+                conn.execute(text("INSERT INTO counter VALUES (:n)"), {"n": count + 1})
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT MAX(n) FROM counter")).scalar_one() == 160
+
+
+def test_read_only_transactions_do_not_wait_for_writer(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'reader.sqlite3'}", connect_args={"check_same_thread": False})
+    configure_engine(engine, busy_timeout_ms=100)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE counter (n INTEGER)"))
+        conn.execute(text("INSERT INTO counter VALUES (1)"))
+
+    with engine.begin() as writer:
+        writer.execute(text("INSERT INTO counter VALUES (2)"))
+        with engine.execution_options(**{READ_ONLY: True}).connect() as reader:
+            assert reader.execute(text("SELECT COUNT(*) FROM counter")).scalar_one() == 1
+
+
+def test_writer_queue_acquire_times_out() -> None:
+    writers = WriterQueue()
+    writers.acquire()
+    with pytest.raises(TimeoutError):
+        writers.acquire(timeout=0.01)
+    # 諦めたチケットは飛ばして次に進む
+    writers.release()
+    assert writers.acquire(timeout=0.01) == 2
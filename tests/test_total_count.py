@@ -0,0 +1,89 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.models import list_model
+
+client = TestClient(app)
+
+
+def _create_list(db_session) -> int:
+    db_todo_list = list_model.ListModel(title="count_test", description="A test record for X-Total-Count.")
+    db_session.add(db_todo_list)
+    db_session.commit()
+    return db_todo_list.id
+
+
+class _StatementLog:
+    def __init__(self, db_session) -> None:
+        self.engine = db_session.get_bind().engine
+        self.statements = []
+
+    def __enter__(self) -> list:
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self.statements
+
+    def __exit__(self, *_) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, *_) -> None:  # noqa: ANN001
+        self.statements.append(statement)
+
+
+def test_item_counter_follows_create_and_delete(db_session) -> None:
+    todo_list_id = _create_list(db_session)
+    item_ids = [client.post(f"/lists/{todo_list_id}/items", json={"title": f"item {n}"}).json()["id"] for n in range(5)]
+    for todo_item_id in item_ids[:2]:
+        client.delete(f"/lists/{todo_list_id}/items/{todo_item_id}")
+
+    counted = client.get(f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 2})
+    exact = client.get(f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 2, "exact_count": True})
+    assert counted.status_code == status.HTTP_200_OK
+    assert len(counted.json()) == 2  # noqa: PLR2004
+    assert counted.headers["x-total-count"] == exact.headers["x-total-count"] == "3"
+
+
+def test_item_count_does_not_touch_list(db_session) -> None:
+    todo_list_id = _create_list(db_session)
+    before = client.get(f"/lists/{todo_list_id}").json()
+    client.post(f"/lists/{todo_list_id}/items", json={"title": "item"})
+    after = client.get(f"/lists/{todo_list_id}").json()
+    assert after["version"] == before["version"]
+    assert after["updated_at"] == before["updated_at"]
+
+
+def test_default_count_avoids_count_star(db_session) -> None:
+    todo_list_id = _create_list(db_session)
+    with _StatementLog(db_session) as statements:
+        client.get(f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 10})
+        # SQLiteには行数の統計が無いので, リストの件数は常に数える
+        if db_session.get_bind().dialect.name == "mysql":
+            client.get("/lists/", params={"page": 1, "per_page": 10})
+    assert not [x for x in statements if "count(*)" in x.lower()]
+
+    with _StatementLog(db_session) as statements:
+        client.get(f"/lists/{todo_list_id}/items", params={"page": 1, "per_page": 10, "exact_count": True})
+    assert [x for x in statements if "count(*)" in x.lower()]
+
+
+def test_list_count_estimate_and_exact(db_session) -> None:
+    for _ in range(3):
+        _create_list(db_session)
+
+    estimated = client.get("/lists/", params={"page": 1, "per_page": 1})
+    exact = client.get("/lists/", params={"page": 1, "per_page": 1, "exact_count": True})
+    assert exact.status_code == status.HTTP_200_OK
+    assert int(exact.headers["x-total-count"]) >= 3  # noqa: PLR2004
+    if db_session.get_bind().dialect.name != "mysql":
+        assert estimated.headers["x-total-count"] == exact.headers["x-total-count"]
+
+
+def test_list_count_follows_deletes(db_session) -> None:
+    todo_list_ids = [_create_list(db_session) for _ in range(3)]
+    before = int(client.get("/lists/", params={"page": 1, "per_page": 1, "exact_count": True}).headers["x-total-count"])
+    client.delete(f"/lists/{todo_list_ids[-1]}")
+    after = client.get("/lists/", params={"page": 1, "per_page": 1, "exact_count": True})
+    assert int(after.headers["x-total-count"]) == before - 1
+    if db_session.get_bind().dialect.name != "mysql":
+        assert client.get("/lists/", params={"page": 1, "per_page": 1}).headers["x-total-count"] == str(before - 1)
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app import warmup
+from app.database import Base, _create_engine
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = _create_engine(f"sqlite:///{tmp_path / 'warmup.sqlite3'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_warmup_opens_pool_and_primes_statements(engine, monkeypatch) -> None:
+    monkeypatch.setattr(warmup, "_engines", lambda: [engine])
+    warmer = warmup.Warmup(connections=3)
+    assert warmer.run()
+    assert warmer.ready
+    assert warmer.opened == 3
+    assert warmup.pool_status(engine)["idle"] == 3
+    assert len(engine._compiled_cache) >= len(warmup.WARMUP_STATEMENTS)
+
+
+def test_warmup_is_capped_at_pool_size(engine, monkeypatch) -> None:
+    monkeypatch.setattr(warmup, "_engines", lambda: [engine])
+    warmer = warmup.Warmup(connections=100)
+    warmer.run()
+    assert warmer.opened == engine.pool.size()
+
+
+def test_warmup_retries_until_database_is_reachable(engine, tmp_path, monkeypatch) -> None:
+    broken = _create_engine(f"sqlite:///{tmp_path / 'missing' / 'db.sqlite3'}")
+    engines = [broken]
+    monkeypatch.setattr(warmup, "_engines", lambda: engines)
+    warmer = warmup.Warmup(connections=1, retry_seconds=0.01)
+    warmer.start()
+    try:
+        deadline = time.monotonic() + 5
+        while warmer.status != warmup.FAILED and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not warmer.ready
+        assert "OperationalError" in warmer.report()["error"]
+
+        engines[:] = [engine]
+        while not warmer.ready and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert warmer.ready
+        assert "error" not in warmer.report()
+    finally:
+        warmer.stop()
+    assert warmer.status == warmup.STOPPING
+
+
+def test_readyz_reports_ready_only_after_warmup(engine, monkeypatch) -> None:
+    monkeypatch.setattr(warmup, "_engines", lambda: [engine])
+    warmer = warmup.Warmup(connections=1)
+    monkeypatch.setattr(warmup, "warmer", warmer)
+
+    assert client.get("/healthz").json() == {"status": "ok"}
+    response = client.get("/readyz")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["status"] == warmup.STARTING
+
+    warmer.run()
+    response = client.get("/readyz")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == warmup.READY
+    assert response.json()["connections"] == 1